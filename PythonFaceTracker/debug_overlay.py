@@ -0,0 +1,229 @@
+"""
+Debug Overlay
+Draws face tracking status, head rotation and blendshape bars onto a frame.
+Shared by the OpenCV debug window and the MJPEG preview server.
+"""
+
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+def draw_debug_overlay(frame: np.ndarray, face_data: Optional[Dict], fps: float) -> np.ndarray:
+    """
+    Draw the debug overlay in place
+
+    Args:
+        frame: BGR image to draw on (modified in place)
+        face_data: Output of FaceTracker.process_frame, or None if no face
+        fps: Current tracking FPS
+
+    Returns:
+        The same frame, for convenience
+    """
+    # Draw face detection status
+    status_text = f"FPS: {fps:.1f}"
+    color = (0, 255, 0) if face_data else (0, 0, 255)
+    cv2.putText(frame, status_text, (10, 30),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+    if face_data:
+        bs = face_data['blendshapes']  # Blendshapes dictionary
+        hr = face_data['head_rotation']
+        y_pos = 60
+        line_height = 25
+
+        # Head rotation info
+        cv2.putText(frame, "=== HEAD ROTATION ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+        cv2.putText(frame, f"Yaw:   {hr['yaw']:6.1f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+        cv2.putText(frame, f"Pitch: {hr['pitch']:6.1f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+        cv2.putText(frame, f"Roll:  {hr['roll']:6.1f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height + 10
+
+        # Mouth parameters
+        cv2.putText(frame, "=== MOUTH ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+
+        jaw_open = bs.get('jawOpen', 0.0)
+        cv2.putText(frame, f"JawOpen: {jaw_open:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        # Visual bar for jaw open
+        bar_width = int(jaw_open * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (0, 255, 0), -1)
+        y_pos += line_height
+
+        smile_l = bs.get('mouthSmileLeft', 0.0)
+        smile_r = bs.get('mouthSmileRight', 0.0)
+        smile_avg = (smile_l + smile_r) / 2.0
+        cv2.putText(frame, f"Smile:   {smile_avg:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(smile_avg * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (0, 255, 255), -1)
+        y_pos += line_height
+
+        frown_l = bs.get('mouthFrownLeft', 0.0)
+        frown_r = bs.get('mouthFrownRight', 0.0)
+        frown_avg = (frown_l + frown_r) / 2.0
+        cv2.putText(frame, f"Frown:   {frown_avg:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(frown_avg * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (255, 100, 100), -1)
+        y_pos += line_height
+
+        pucker = bs.get('mouthPucker', 0.0)
+        cv2.putText(frame, f"Pucker:  {pucker:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height + 10
+
+        # Eye blink parameters
+        cv2.putText(frame, "=== EYES ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+
+        blink_l = bs.get('eyeBlinkLeft', 0.0)
+        cv2.putText(frame, f"BlinkL:  {blink_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(blink_l * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (255, 200, 0), -1)
+        y_pos += line_height
+
+        blink_r = bs.get('eyeBlinkRight', 0.0)
+        cv2.putText(frame, f"BlinkR:  {blink_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(blink_r * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (255, 200, 0), -1)
+        y_pos += line_height + 10
+
+        # Eyebrow parameters (LEFT and RIGHT separated)
+        cv2.putText(frame, "=== EYEBROWS ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+
+        # Inner brow (center)
+        brow_inner = bs.get('browInnerUp', 0.0)
+        cv2.putText(frame, f"InnerUp: {brow_inner:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(brow_inner * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (200, 150, 255), -1)
+        y_pos += line_height
+
+        # Left brow
+        brow_outer_l = bs.get('browOuterUpLeft', 0.0)
+        cv2.putText(frame, f"OuterL:  {brow_outer_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(brow_outer_l * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (150, 200, 255), -1)
+        y_pos += line_height
+
+        # Right brow
+        brow_outer_r = bs.get('browOuterUpRight', 0.0)
+        cv2.putText(frame, f"OuterR:  {brow_outer_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(brow_outer_r * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (150, 200, 255), -1)
+        y_pos += line_height
+
+        # Brow down left
+        brow_down_l = bs.get('browDownLeft', 0.0)
+        cv2.putText(frame, f"DownL:   {brow_down_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(brow_down_l * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (100, 150, 200), -1)
+        y_pos += line_height
+
+        # Brow down right
+        brow_down_r = bs.get('browDownRight', 0.0)
+        cv2.putText(frame, f"DownR:   {brow_down_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        bar_width = int(brow_down_r * 100)
+        cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (100, 150, 200), -1)
+        y_pos += line_height + 10
+
+        # Eye look direction (LEFT eye)
+        cv2.putText(frame, "=== EYE LOOK (LEFT) ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+
+        eye_look_up_l = bs.get('eyeLookUpLeft', 0.0)
+        cv2.putText(frame, f"Up:      {eye_look_up_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_look_down_l = bs.get('eyeLookDownLeft', 0.0)
+        cv2.putText(frame, f"Down:    {eye_look_down_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_look_in_l = bs.get('eyeLookInLeft', 0.0)
+        cv2.putText(frame, f"In:      {eye_look_in_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_look_out_l = bs.get('eyeLookOutLeft', 0.0)
+        cv2.putText(frame, f"Out:     {eye_look_out_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height + 10
+
+        # Eye look direction (RIGHT eye)
+        cv2.putText(frame, "=== EYE LOOK (RIGHT) ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+
+        eye_look_up_r = bs.get('eyeLookUpRight', 0.0)
+        cv2.putText(frame, f"Up:      {eye_look_up_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_look_down_r = bs.get('eyeLookDownRight', 0.0)
+        cv2.putText(frame, f"Down:    {eye_look_down_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_look_in_r = bs.get('eyeLookInRight', 0.0)
+        cv2.putText(frame, f"In:      {eye_look_in_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_look_out_r = bs.get('eyeLookOutRight', 0.0)
+        cv2.putText(frame, f"Out:     {eye_look_out_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height + 10
+
+        # Eye squint/wide
+        cv2.putText(frame, "=== EYE SQUINT/WIDE ===", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
+        y_pos += line_height
+
+        eye_squint_l = bs.get('eyeSquintLeft', 0.0)
+        cv2.putText(frame, f"SquintL: {eye_squint_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_squint_r = bs.get('eyeSquintRight', 0.0)
+        cv2.putText(frame, f"SquintR: {eye_squint_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_wide_l = bs.get('eyeWideLeft', 0.0)
+        cv2.putText(frame, f"WideL:   {eye_wide_l:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y_pos += line_height
+
+        eye_wide_r = bs.get('eyeWideRight', 0.0)
+        cv2.putText(frame, f"WideR:   {eye_wide_r:.3f}", (10, y_pos),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    else:
+        cv2.putText(frame, "NO FACE DETECTED", (10, 60),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+
+    return frame
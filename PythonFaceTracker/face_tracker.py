@@ -8,10 +8,13 @@ import numpy as np
 import cv2
 from typing import Optional, Dict, Tuple
 
+from retargeting import Retargeter
+
 
 class FaceTracker:
     def __init__(self, model_path: str, min_detection_confidence: float = 0.5,
-                 min_tracking_confidence: float = 0.5, num_faces: int = 1):
+                 min_tracking_confidence: float = 0.5, num_faces: int = 1,
+                 retargeter: Optional[Retargeter] = None):
         """
         Initialize MediaPipe Face Landmarker
 
@@ -20,8 +23,10 @@ class FaceTracker:
             min_detection_confidence: Minimum confidence for face detection
             min_tracking_confidence: Minimum confidence for face tracking
             num_faces: Maximum number of faces to track
+            retargeter: Optional retargeting stage applied after smoothing
         """
         self.model_path = model_path
+        self.retargeter = retargeter
 
         # MediaPipe Face Landmarker options
         base_options = mp.tasks.BaseOptions(model_asset_path=model_path)
@@ -86,6 +91,10 @@ class FaceTracker:
         self.prev_blendshapes = blendshapes
         self.prev_head_rotation = head_rotation
 
+        # Retarget after smoothing so the EMA history stays in raw ARKit space
+        if self.retargeter is not None:
+            blendshapes = self.retargeter.apply(blendshapes)
+
         return {
             'blendshapes': blendshapes,
             'head_rotation': {
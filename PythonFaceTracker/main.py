@@ -3,14 +3,20 @@ VibeVtuber Face Tracker - Main Entry Point
 Captures webcam feed, processes with MediaPipe, and sends data to Unity via UDP
 """
 
+import time
+
+_PROCESS_START = time.perf_counter()  # t=0 for startup markers, before any heavy import
+
 import argparse
-import cv2
 import json
-import time
 import os
 import sys
-from face_tracker import FaceTracker
-from network_sender import NetworkSender
+from concurrent.futures import ThreadPoolExecutor
+
+from startup_timer import StartupTimer
+
+# cv2, mediapipe and numpy are imported lazily (inside the startup worker
+# threads) so that model creation, camera opening and socket setup overlap.
 
 
 def load_config(config_path: str = "config.json") -> dict:
@@ -33,6 +39,8 @@ def test_camera(index: int, timeout_ms: int = 2000) -> dict:
     Returns:
         dict with camera info if available, None otherwise
     """
+    import cv2
+
     cap = cv2.VideoCapture(index)
     cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms)
 
@@ -162,12 +170,87 @@ def select_camera(config_camera_index: int, max_index: int = 10) -> int:
             return None
 
 
+def create_tracker(config: dict, timer: StartupTimer):
+    """
+    Import MediaPipe and build the face landmarker (runs on a startup worker thread)
+
+    Raises on failure so the caller can clean up the other startup tasks.
+    """
+    from face_tracker import FaceTracker
+    from retargeting import Retargeter
+    timer.mark("mediapipe imported")
+
+    # Load optional retargeting profile
+    retargeter = None
+    profile_path = config.get('retargeting', {}).get('profile', '')
+    if profile_path:
+        retargeter = Retargeter.from_file(profile_path)
+        print(f"[Retargeting] Loaded profile from {profile_path}")
+
+    print("[MediaPipe] Initializing face landmarker...")
+    tracker = FaceTracker(
+        model_path=config['mediapipe']['model_path'],
+        min_detection_confidence=config['mediapipe']['min_detection_confidence'],
+        min_tracking_confidence=config['mediapipe']['min_tracking_confidence'],
+        num_faces=config['mediapipe']['num_faces'],
+        retargeter=retargeter
+    )
+    timer.mark("landmarker created")
+    print("[MediaPipe] Face landmarker initialized successfully")
+    return tracker
+
+
+def open_camera(camera_config: dict, timer: StartupTimer):
+    """
+    Open the webcam and read one frame to warm it up (runs on a startup worker thread)
+
+    Returns:
+        Opened cv2.VideoCapture, or None if the camera could not be opened
+    """
+    import cv2
+    timer.mark("cv2 imported")
+
+    print(f"[Camera] Opening camera {camera_config['index']}...")
+    cap = cv2.VideoCapture(camera_config['index'])
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera_config['width'])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_config['height'])
+    cap.set(cv2.CAP_PROP_FPS, camera_config['fps'])
+
+    if not cap.isOpened():
+        cap.release()
+        return None
+    timer.mark("camera opened")
+
+    # The first read usually blocks until the sensor delivers; do it here so the
+    # main loop starts with a streaming camera
+    cap.read()
+    timer.mark("camera first frame")
+    return cap
+
+
+def create_network(network_config: dict, timer: StartupTimer):
+    """Create the UDP sender (runs on a startup worker thread)"""
+    from network_sender import NetworkSender
+
+    network = NetworkSender(
+        host=network_config['host'],
+        port=network_config['port'],
+        mirror_port=network_config.get('mirror_port', 0)
+    )
+    timer.mark("socket ready")
+    return network
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--no-interactive', action='store_true',
                         help='Skip camera selection prompt, use camera index from config.json')
+    parser.add_argument('--measure-startup', action='store_true',
+                        help='Print a startup report (time to first packet) and exit after the first packet')
     args = parser.parse_args()
 
+    timer = StartupTimer(origin=_PROCESS_START)
+
     print("=" * 70)
     print("VibeVtuber Face Tracker")
     print("=" * 70)
@@ -179,20 +262,7 @@ def main():
     except Exception as e:
         print(f"[Error] Failed to load config: {e}")
         return
-
-    # Select camera
-    if args.no_interactive:
-        selected_camera_index = config['camera']['index']
-        print(f"[Camera] Non-interactive mode: using camera index {selected_camera_index} from config.json")
-    else:
-        selected_camera_index = select_camera(config['camera']['index'], max_index=10)
-
-    if selected_camera_index is None:
-        print("[Info] No camera selected, exiting...")
-        return
-
-    # Update camera index in config
-    config['camera']['index'] = selected_camera_index
+    timer.mark("config loaded")
 
     # Check if model file exists
     model_path = config['mediapipe']['model_path']
@@ -203,42 +273,85 @@ def main():
         print(f"And place it in: {os.path.dirname(model_path)}/")
         return
 
-    # Initialize face tracker
-    print("\n[MediaPipe] Initializing face landmarker...")
-    try:
-        tracker = FaceTracker(
-            model_path=model_path,
-            min_detection_confidence=config['mediapipe']['min_detection_confidence'],
-            min_tracking_confidence=config['mediapipe']['min_tracking_confidence'],
-            num_faces=config['mediapipe']['num_faces']
-        )
-        print("[MediaPipe] Face landmarker initialized successfully")
-    except Exception as e:
-        print(f"[Error] Failed to initialize face tracker: {e}")
-        return
+    # Model creation and socket setup start immediately; the camera opens as
+    # soon as its index is known (right away in non-interactive mode, or in
+    # parallel with the model load while the user picks one interactively).
+    pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+    tracker_future = pool.submit(create_tracker, config, timer)
+    network_future = pool.submit(create_network, config['network'], timer)
 
-    # Initialize network sender
-    network = NetworkSender(
-        host=config['network']['host'],
-        port=config['network']['port']
-    )
+    # Select camera
+    if args.no_interactive:
+        selected_camera_index = config['camera']['index']
+        print(f"[Camera] Non-interactive mode: using camera index {selected_camera_index} from config.json")
+    else:
+        selected_camera_index = select_camera(config['camera']['index'], max_index=10)
 
-    # Initialize webcam
-    print(f"\n[Camera] Opening camera {config['camera']['index']}...")
-    cap = cv2.VideoCapture(config['camera']['index'])
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config['camera']['width'])
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config['camera']['height'])
-    cap.set(cv2.CAP_PROP_FPS, config['camera']['fps'])
+    camera_future = None
+    if selected_camera_index is not None:
+        # Update camera index in config
+        config['camera']['index'] = selected_camera_index
+        camera_future = pool.submit(open_camera, config['camera'], timer)
 
-    if not cap.isOpened():
-        print("[Error] Failed to open camera")
-        tracker.close()
-        network.close()
+    # Collect startup results; whatever did succeed is cleaned up on failure
+    tracker = network = cap = None
+    errors = []
+    try:
+        tracker = tracker_future.result()
+    except Exception as e:
+        errors.append(f"Failed to initialize face tracker: {e}")
+    try:
+        network = network_future.result()
+    except Exception as e:
+        errors.append(f"Failed to create network sender: {e}")
+    if camera_future is not None:
+        try:
+            cap = camera_future.result()
+            if cap is None:
+                errors.append("Failed to open camera")
+        except Exception as e:
+            errors.append(f"Failed to open camera: {e}")
+    pool.shutdown(wait=True)
+
+    if selected_camera_index is None or errors:
+        if selected_camera_index is None:
+            print("[Info] No camera selected, exiting...")
+        for error in errors:
+            print(f"[Error] {error}")
+        if cap is not None:
+            cap.release()
+        if tracker is not None:
+            tracker.close()
+        if network is not None:
+            network.close()
         return
 
+    import cv2
+    from debug_overlay import draw_debug_overlay   # needs cv2 / numpy, loaded by now
+    timer.mark("startup tasks joined")
+
     print("[Camera] Camera opened successfully")
     print(f"[Info] Resolution: {config['camera']['width']}x{config['camera']['height']} @ {config['camera']['fps']}fps")
     print(f"[Info] Sending data to {config['network']['host']}:{config['network']['port']}")
+
+    # Optional MJPEG preview (encodes only while someone is watching)
+    preview = None
+    preview_cfg = config['debug'].get('preview', {})
+    if preview_cfg.get('enabled', False):
+        from preview_server import PreviewServer
+        try:
+            preview = PreviewServer(
+                host=preview_cfg.get('host', '127.0.0.1'),
+                port=preview_cfg.get('port', 8090),
+                fps=preview_cfg.get('fps', 10),
+                width=preview_cfg.get('width', 480),
+                jpeg_quality=preview_cfg.get('jpeg_quality', 70)
+            )
+            preview.start()
+        except OSError as e:
+            print(f"[Warning] Failed to start preview server: {e}")
+            preview = None
+
     print("\nKeyboard Controls:")
     print("  'q' - Quit")
     print("  's' - Toggle debug window")
@@ -253,6 +366,7 @@ def main():
     last_fps_time = time.time()
     frame_count = 0
     fps = 0.0
+    first_packet_sent = False
 
     try:
         while True:
@@ -269,6 +383,14 @@ def main():
             # Send data to Unity
             network.send_face_data(face_data)
 
+            if not first_packet_sent:
+                first_packet_sent = True
+                elapsed_ms = timer.mark("first packet sent")
+                if args.measure_startup:
+                    print(timer.report())
+                    print(f"[Startup] Time to first packet: {elapsed_ms:.1f} ms")
+                    break
+
             # Calculate FPS
             frame_count += 1
             current_time = time.time()
@@ -336,212 +458,13 @@ def main():
                     else:
                         print(f"[Status] FPS: {fps:.1f} | NO FACE")
 
+            # Web preview (copies the frame only when a viewer is connected)
+            if preview:
+                preview.submit(frame, face_data, fps)
+
             # Debug visualization
             if show_window:
-                # Draw face detection status
-                status_text = f"FPS: {fps:.1f}"
-                color = (0, 255, 0) if face_data else (0, 0, 255)
-                cv2.putText(frame, status_text, (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-
-                if face_data:
-                    bs = face_data['blendshapes']  # Blendshapes dictionary
-                    hr = face_data['head_rotation']
-                    y_pos = 60
-                    line_height = 25
-
-                    # Head rotation info
-                    cv2.putText(frame, "=== HEAD ROTATION ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-                    cv2.putText(frame, f"Yaw:   {hr['yaw']:6.1f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-                    cv2.putText(frame, f"Pitch: {hr['pitch']:6.1f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-                    cv2.putText(frame, f"Roll:  {hr['roll']:6.1f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height + 10
-
-                    # Mouth parameters
-                    cv2.putText(frame, "=== MOUTH ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-
-                    jaw_open = bs.get('jawOpen', 0.0)
-                    cv2.putText(frame, f"JawOpen: {jaw_open:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    # Visual bar for jaw open
-                    bar_width = int(jaw_open * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (0, 255, 0), -1)
-                    y_pos += line_height
-
-                    smile_l = bs.get('mouthSmileLeft', 0.0)
-                    smile_r = bs.get('mouthSmileRight', 0.0)
-                    smile_avg = (smile_l + smile_r) / 2.0
-                    cv2.putText(frame, f"Smile:   {smile_avg:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(smile_avg * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (0, 255, 255), -1)
-                    y_pos += line_height
-
-                    frown_l = bs.get('mouthFrownLeft', 0.0)
-                    frown_r = bs.get('mouthFrownRight', 0.0)
-                    frown_avg = (frown_l + frown_r) / 2.0
-                    cv2.putText(frame, f"Frown:   {frown_avg:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(frown_avg * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (255, 100, 100), -1)
-                    y_pos += line_height
-
-                    pucker = bs.get('mouthPucker', 0.0)
-                    cv2.putText(frame, f"Pucker:  {pucker:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height + 10
-
-                    # Eye blink parameters
-                    cv2.putText(frame, "=== EYES ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-
-                    blink_l = bs.get('eyeBlinkLeft', 0.0)
-                    cv2.putText(frame, f"BlinkL:  {blink_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(blink_l * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (255, 200, 0), -1)
-                    y_pos += line_height
-
-                    blink_r = bs.get('eyeBlinkRight', 0.0)
-                    cv2.putText(frame, f"BlinkR:  {blink_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(blink_r * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (255, 200, 0), -1)
-                    y_pos += line_height + 10
-
-                    # Eyebrow parameters (LEFT and RIGHT separated)
-                    cv2.putText(frame, "=== EYEBROWS ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-
-                    # Inner brow (center)
-                    brow_inner = bs.get('browInnerUp', 0.0)
-                    cv2.putText(frame, f"InnerUp: {brow_inner:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(brow_inner * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (200, 150, 255), -1)
-                    y_pos += line_height
-
-                    # Left brow
-                    brow_outer_l = bs.get('browOuterUpLeft', 0.0)
-                    cv2.putText(frame, f"OuterL:  {brow_outer_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(brow_outer_l * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (150, 200, 255), -1)
-                    y_pos += line_height
-
-                    # Right brow
-                    brow_outer_r = bs.get('browOuterUpRight', 0.0)
-                    cv2.putText(frame, f"OuterR:  {brow_outer_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(brow_outer_r * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (150, 200, 255), -1)
-                    y_pos += line_height
-
-                    # Brow down left
-                    brow_down_l = bs.get('browDownLeft', 0.0)
-                    cv2.putText(frame, f"DownL:   {brow_down_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(brow_down_l * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (100, 150, 200), -1)
-                    y_pos += line_height
-
-                    # Brow down right
-                    brow_down_r = bs.get('browDownRight', 0.0)
-                    cv2.putText(frame, f"DownR:   {brow_down_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    bar_width = int(brow_down_r * 100)
-                    cv2.rectangle(frame, (180, y_pos - 15), (180 + bar_width, y_pos - 5), (100, 150, 200), -1)
-                    y_pos += line_height + 10
-
-                    # Eye look direction (LEFT eye)
-                    cv2.putText(frame, "=== EYE LOOK (LEFT) ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_up_l = bs.get('eyeLookUpLeft', 0.0)
-                    cv2.putText(frame, f"Up:      {eye_look_up_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_down_l = bs.get('eyeLookDownLeft', 0.0)
-                    cv2.putText(frame, f"Down:    {eye_look_down_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_in_l = bs.get('eyeLookInLeft', 0.0)
-                    cv2.putText(frame, f"In:      {eye_look_in_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_out_l = bs.get('eyeLookOutLeft', 0.0)
-                    cv2.putText(frame, f"Out:     {eye_look_out_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height + 10
-
-                    # Eye look direction (RIGHT eye)
-                    cv2.putText(frame, "=== EYE LOOK (RIGHT) ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_up_r = bs.get('eyeLookUpRight', 0.0)
-                    cv2.putText(frame, f"Up:      {eye_look_up_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_down_r = bs.get('eyeLookDownRight', 0.0)
-                    cv2.putText(frame, f"Down:    {eye_look_down_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_in_r = bs.get('eyeLookInRight', 0.0)
-                    cv2.putText(frame, f"In:      {eye_look_in_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_look_out_r = bs.get('eyeLookOutRight', 0.0)
-                    cv2.putText(frame, f"Out:     {eye_look_out_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height + 10
-
-                    # Eye squint/wide
-                    cv2.putText(frame, "=== EYE SQUINT/WIDE ===", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 200, 255), 1)
-                    y_pos += line_height
-
-                    eye_squint_l = bs.get('eyeSquintLeft', 0.0)
-                    cv2.putText(frame, f"SquintL: {eye_squint_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_squint_r = bs.get('eyeSquintRight', 0.0)
-                    cv2.putText(frame, f"SquintR: {eye_squint_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_wide_l = bs.get('eyeWideLeft', 0.0)
-                    cv2.putText(frame, f"WideL:   {eye_wide_l:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    y_pos += line_height
-
-                    eye_wide_r = bs.get('eyeWideRight', 0.0)
-                    cv2.putText(frame, f"WideR:   {eye_wide_r:.3f}", (10, y_pos),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-                else:
-                    cv2.putText(frame, "NO FACE DETECTED", (10, 60),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-
+                draw_debug_overlay(frame, face_data, fps)
                 cv2.imshow('VibeVtuber Face Tracker', frame)
 
             # Handle keyboard input
@@ -566,6 +489,8 @@ def main():
         print("[Cleanup] Releasing resources...")
         cap.release()
         cv2.destroyAllWindows()
+        if preview:
+            preview.close()
         tracker.close()
         network.close()
         print("[Cleanup] Done")
@@ -10,20 +10,28 @@ from typing import Dict, Optional
 
 
 class NetworkSender:
-    def __init__(self, host: str = "127.0.0.1", port: int = 11111):
+    def __init__(self, host: str = "127.0.0.1", port: int = 11111,
+                 mirror_port: int = 0, mirror_host: str = "127.0.0.1"):
         """
         Initialize UDP socket for sending face tracking data
 
         Args:
             host: Target IP address (default: localhost)
             port: Target port number
+            mirror_port: Optional second port that receives a copy of every
+                         packet (e.g. the control panel preview tap); 0 disables
+            mirror_host: Target IP address for the mirror copy
         """
         self.host = host
         self.port = port
+        self.mirror = (mirror_host, mirror_port) if mirror_port else None
+        self.seq = 0  # per-stream sequence number, incremented for every packet
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.setblocking(False)  # Non-blocking mode
 
         print(f"[NetworkSender] Initialized UDP sender to {host}:{port}")
+        if self.mirror:
+            print(f"[NetworkSender] Mirroring packets to {mirror_host}:{mirror_port}")
 
     def send_face_data(self, face_data: Optional[Dict]) -> bool:
         """
@@ -40,10 +48,17 @@ class NetworkSender:
             True if sent successfully, False otherwise
         """
         try:
+            # seq / monoTime let receivers measure loss, reordering and jitter.
+            # monoTime is time.perf_counter() (system-wide monotonic clock), so
+            # receivers on the same host can compute one-way delay.
+            self.seq += 1
+
             # Build message payload
             if face_data is None:
                 message = {
                     "timestamp": time.time(),
+                    "seq": self.seq,
+                    "monoTime": time.perf_counter(),
                     "faceDetected": False,
                     "blendshapes": {}
                 }
@@ -57,6 +72,8 @@ class NetworkSender:
 
                 message = {
                     "timestamp": time.time(),
+                    "seq": self.seq,
+                    "monoTime": time.perf_counter(),
                     "faceDetected": True,
                     "blendshapes": blendshapes
                 }
@@ -65,7 +82,16 @@ class NetworkSender:
             json_data = json.dumps(message)
 
             # Send via UDP (fire-and-forget)
-            self.socket.sendto(json_data.encode('utf-8'), (self.host, self.port))
+            packet = json_data.encode('utf-8')
+            self.socket.sendto(packet, (self.host, self.port))
+
+            # Mirror copy reuses the encoded packet; a missing listener must
+            # never affect the primary send
+            if self.mirror:
+                try:
+                    self.socket.sendto(packet, self.mirror)
+                except OSError:
+                    pass
             return True
 
         except Exception as e:
@@ -0,0 +1,193 @@
+"""
+MJPEG Debug Preview Server
+Serves a rate-limited, downscaled, annotated camera preview over HTTP as an
+MJPEG stream, as a headless-friendly alternative to the OpenCV debug window.
+
+The tracking thread only hands over a frame reference (and copies it) when at
+least one viewer is connected and the preview interval has elapsed; resizing,
+annotation and JPEG encoding run on a background thread. With no viewers the
+per-frame cost is a single integer check.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from debug_overlay import draw_debug_overlay
+
+_BOUNDARY = "vibevtuberframe"
+
+_INDEX_HTML = b"""<!DOCTYPE html>
+<html><head><title>VibeVtuber Face Tracker Preview</title></head>
+<body style="margin:0;background:#0f0f1a">
+<img src="/stream.mjpg" style="display:block;margin:auto;max-width:100%">
+</body></html>
+"""
+
+
+class PreviewServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8090, fps: float = 10.0,
+                 width: int = 480, jpeg_quality: int = 70):
+        """
+        Initialize MJPEG preview server
+
+        Args:
+            host: Interface to bind the HTTP server to
+            port: HTTP port
+            fps: Maximum preview frame rate
+            width: Output width in pixels (height keeps the aspect ratio)
+            jpeg_quality: JPEG quality (0-100)
+        """
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / max(0.5, fps)
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+
+        self.viewers = 0
+        self._viewers_lock = threading.Lock()
+        self._last_submit = 0.0
+
+        # Pending raw frame (tracking thread → encoder thread)
+        self._pending = None
+        self._pending_event = threading.Event()
+
+        # Latest encoded JPEG (encoder thread → HTTP handler threads)
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_seq = 0
+        self._jpeg_cond = threading.Condition()
+
+        self._running = False
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def start(self):
+        """Start the HTTP server and encoder threads"""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._running = True
+
+        threading.Thread(target=self._httpd.serve_forever, name="preview-http", daemon=True).start()
+        threading.Thread(target=self._encode_loop, name="preview-encoder", daemon=True).start()
+        print(f"[Preview] MJPEG preview at http://{self.host}:{self.port}/ (stream: /stream.mjpg)")
+
+    def submit(self, frame: np.ndarray, face_data: Optional[Dict], fps: float):
+        """
+        Offer a frame for preview (called from the tracking loop)
+
+        Returns immediately; does nothing unless someone is watching and the
+        preview interval has elapsed.
+        """
+        if self.viewers <= 0:
+            return
+        now = time.perf_counter()
+        if now - self._last_submit < self.interval:
+            return
+        self._last_submit = now
+
+        # Copy so the tracking loop may keep drawing on / reusing its frame
+        self._pending = (frame.copy(), face_data, fps)
+        self._pending_event.set()
+
+    def close(self):
+        """Stop serving and wake up all threads"""
+        self._running = False
+        self._pending_event.set()
+        with self._jpeg_cond:
+            self._jpeg_cond.notify_all()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        print("[Preview] Server stopped")
+
+    def _encode_loop(self):
+        """Background thread: downscale, annotate and JPEG-encode pending frames"""
+        while self._running:
+            self._pending_event.wait()
+            self._pending_event.clear()
+            pending, self._pending = self._pending, None
+            if pending is None:
+                continue
+
+            frame, face_data, fps = pending
+            try:
+                draw_debug_overlay(frame, face_data, fps)
+                h, w = frame.shape[:2]
+                if self.width and w > self.width:
+                    frame = cv2.resize(frame, (self.width, int(h * self.width / w)),
+                                       interpolation=cv2.INTER_AREA)
+                ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            except Exception as e:
+                print(f"[Preview] Encode error: {e}")
+                continue
+            if not ok:
+                continue
+
+            with self._jpeg_cond:
+                self._jpeg = buf.tobytes()
+                self._jpeg_seq += 1
+                self._jpeg_cond.notify_all()
+
+    def _add_viewer(self, delta: int):
+        with self._viewers_lock:
+            self.viewers += delta
+            viewers = self.viewers
+        print(f"[Preview] Viewer {'connected' if delta > 0 else 'disconnected'} ({viewers} watching)")
+
+    def _wait_jpeg(self, last_seq: int, timeout: float = 1.0):
+        """Block until a JPEG newer than last_seq is available; returns (seq, jpeg) or None"""
+        with self._jpeg_cond:
+            if self._jpeg_seq == last_seq:
+                self._jpeg_cond.wait(timeout)
+            if self._jpeg_seq == last_seq or self._jpeg is None:
+                return None
+            return self._jpeg_seq, self._jpeg
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in ("/", "/index.html"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(_INDEX_HTML)))
+                    self.end_headers()
+                    self.wfile.write(_INDEX_HTML)
+                elif self.path.startswith("/stream.mjpg"):
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+
+                server._add_viewer(1)
+                last_seq = 0
+                try:
+                    while server._running:
+                        item = server._wait_jpeg(last_seq)
+                        if item is None:
+                            continue
+                        last_seq, jpeg = item
+                        self.wfile.write(
+                            f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server._add_viewer(-1)
+
+            def log_message(self, fmt, *args):
+                pass  # suppress default HTTP logs
+
+        return _Handler
@@ -0,0 +1,155 @@
+"""
+Blendshape Retargeting
+Applies per-channel response curves and linear channel mixing to smoothed
+ARKit blendshapes before they are sent, so every consumer receives the same
+curated values instead of re-implementing the curves per renderer.
+
+Curves are baked into lookup tables once at load time; each frame is then a
+single matrix-vector product plus one vectorized LUT lookup.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_LUT_SIZE = 256
+
+
+def _bake_curve(spec: dict, xs: np.ndarray) -> np.ndarray:
+    """
+    Evaluate a curve spec on the sample grid xs (0..1).
+
+    Steps run in the same order as Live2DFaceController.ApplyMapping:
+    invert → points / range remap (+ smoothstep) → gamma → gain/offset → clamp.
+    """
+    y = xs.astype(np.float64)
+
+    if spec.get("invert", False):
+        y = 1.0 - y
+
+    points = spec.get("points")
+    if points:
+        px, py = zip(*sorted((float(p[0]), float(p[1])) for p in points))
+        y = np.interp(y, px, py)
+
+    if "input_range" in spec or "output_range" in spec:
+        in_lo, in_hi = spec.get("input_range", (0.0, 1.0))
+        out_lo, out_hi = spec.get("output_range", (0.0, 1.0))
+        span = (in_hi - in_lo) or 1e-6
+        t = np.clip((y - in_lo) / span, 0.0, 1.0)
+        if spec.get("smoothstep", False):
+            t = t * t * (3.0 - 2.0 * t)
+        y = out_lo + t * (out_hi - out_lo)
+
+    gamma = spec.get("gamma")
+    if gamma is not None:
+        y = np.power(np.clip(y, 0.0, None), float(gamma))
+
+    y = y * float(spec.get("gain", 1.0)) + float(spec.get("offset", 0.0))
+
+    clamp = spec.get("clamp", (0.0, 1.0))
+    if clamp is not None:
+        y = np.clip(y, clamp[0], clamp[1])
+
+    return y.astype(np.float32)
+
+
+class Retargeter:
+    def __init__(self, profile: dict, lut_size: int = DEFAULT_LUT_SIZE):
+        """
+        Build a retargeting stage from a profile dictionary
+
+        Profile format:
+            {
+              "curves": {"jawOpen": {"points": [[0, 0], [0.1, 0], [1, 1]]}, ...},
+              "mix":    {"mouthSmileLeft": {"mouthSmileLeft": 0.7, "mouthSmileRight": 0.3}, ...}
+            }
+
+        Channels without a curve pass through unchanged; channels without a
+        mix row keep their own value.
+
+        Args:
+            profile: Parsed profile (see format above)
+            lut_size: Number of samples per baked curve
+        """
+        if lut_size < 2:
+            raise ValueError("lut_size must be at least 2")
+
+        self.curves: Dict[str, dict] = dict(profile.get("curves", {}))
+        self.mix: Dict[str, Dict[str, float]] = dict(profile.get("mix", {}))
+        self.lut_size = lut_size
+
+        # Channel layout is bound lazily to the order MediaPipe reports
+        self._keys: Optional[tuple] = None
+        self._lut: Optional[np.ndarray] = None          # (channels, lut_size)
+        self._mix_matrix: Optional[np.ndarray] = None   # (channels, channels) or None
+        self._rows: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_file(cls, path: str, lut_size: int = DEFAULT_LUT_SIZE) -> "Retargeter":
+        """Load a retargeting profile from a JSON file"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Retargeting profile not found: {path}")
+
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+
+        return cls(profile, lut_size=profile.get("lut_size", lut_size))
+
+    def _bind(self, keys: Sequence[str]):
+        """Bake LUTs and the mixing matrix for a given channel order"""
+        self._keys = tuple(keys)
+        index = {key: i for i, key in enumerate(self._keys)}
+        n = len(self._keys)
+
+        xs = np.linspace(0.0, 1.0, self.lut_size, dtype=np.float32)
+        self._lut = np.tile(xs, (n, 1))
+        for key, spec in self.curves.items():
+            if key in index:
+                self._lut[index[key]] = _bake_curve(spec, xs)
+
+        mix_rows: List[tuple] = [(index[t], sources) for t, sources in self.mix.items() if t in index]
+        if mix_rows:
+            matrix = np.eye(n, dtype=np.float32)
+            for row, sources in mix_rows:
+                matrix[row] = 0.0
+                for source, weight in sources.items():
+                    if source in index:
+                        matrix[row, index[source]] = weight
+            self._mix_matrix = matrix
+        else:
+            self._mix_matrix = None
+
+        self._rows = np.arange(n)
+
+    def apply(self, blendshapes: Dict[str, float]) -> Dict[str, float]:
+        """
+        Retarget a blendshape dictionary
+
+        Args:
+            blendshapes: Smoothed blendshape scores (0.0 - 1.0)
+
+        Returns:
+            New dictionary with the same keys and retargeted values
+        """
+        if not blendshapes:
+            return blendshapes
+
+        keys = tuple(blendshapes)
+        if keys != self._keys:
+            self._bind(keys)
+
+        x = np.fromiter(blendshapes.values(), dtype=np.float32, count=len(keys))
+        if self._mix_matrix is not None:
+            x = self._mix_matrix @ x
+
+        # Linear interpolation between neighbouring LUT samples
+        pos = np.clip(x, 0.0, 1.0) * (self.lut_size - 1)
+        lo = np.minimum(pos.astype(np.intp), self.lut_size - 2)
+        frac = pos - lo
+        y = (self._lut[self._rows, lo] * (1.0 - frac)
+             + self._lut[self._rows, lo + 1] * frac)
+
+        return dict(zip(keys, y.tolist()))
@@ -0,0 +1,56 @@
+"""
+Startup Timer
+Records timestamped startup phase markers (relative to process launch) so the
+time from launch to the first UDP packet can be measured and reported.
+"""
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class StartupTimer:
+    def __init__(self, origin: Optional[float] = None, verbose: bool = True):
+        """
+        Initialize startup timer
+
+        Args:
+            origin: time.perf_counter() value treated as t=0
+                    (default: the moment the timer is created)
+            verbose: Print each marker as it is recorded
+        """
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.verbose = verbose
+        self.marks: List[Tuple[float, str, str]] = []  # (elapsed_ms, thread, phase)
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str) -> float:
+        """Record a phase marker and return elapsed milliseconds since origin"""
+        elapsed_ms = (time.perf_counter() - self.origin) * 1000.0
+        thread = threading.current_thread().name
+        with self._lock:
+            self.marks.append((elapsed_ms, thread, phase))
+        if self.verbose:
+            print(f"[Startup] +{elapsed_ms:8.1f} ms  {phase}")
+        return elapsed_ms
+
+    def elapsed_ms(self, phase: str) -> Optional[float]:
+        """Return the elapsed time of the first marker with the given phase name"""
+        with self._lock:
+            for elapsed, _, name in self.marks:
+                if name == phase:
+                    return elapsed
+        return None
+
+    def report(self) -> str:
+        """Format all markers as a table, sorted by time"""
+        with self._lock:
+            marks = sorted(self.marks)
+
+        lines = ["=" * 70, "Startup Report", "=" * 70]
+        prev = 0.0
+        for elapsed, thread, phase in marks:
+            lines.append(f"  {elapsed:9.1f} ms  (+{elapsed - prev:8.1f})  [{thread:<18}] {phase}")
+            prev = elapsed
+        lines.append("=" * 70)
+        return "\n".join(lines)
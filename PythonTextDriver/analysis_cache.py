@@ -0,0 +1,189 @@
+"""
+Memoization for emotion analysis with in-flight request coalescing.
+
+Keys are (model, normalized text). Entries expire after ttl_s and the table is
+LRU-bounded to max_entries. Concurrent identical requests share a single
+upstream call: the first caller computes, the others wait on its result.
+Failures are propagated to every waiter but never cached.
+
+get_or_compute_async() is the asyncio variant: the computation runs as its
+own task that every caller awaits (shielded), so cancelling one caller —
+including the one that started it — only stops that caller waiting. The
+task is cancelled, and nothing cached, once no caller is left waiting.
+"""
+
+import asyncio
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WS = re.compile(r"\s+")
+
+
+def make_key(model: str, text: str) -> tuple:
+    return model, _WS.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done   = threading.Event()
+        self.value  = None
+        self.error  = None
+
+
+class _AsyncFlight:
+    def __init__(self, task: asyncio.Task):
+        self.task    = task
+        self.waiters = 0
+
+
+class AnalysisCache:
+    """TTL + LRU cache of analysis results with request coalescing."""
+
+    def __init__(self, max_entries: int = 512, ttl_s: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_s       = ttl_s
+
+        self._lock     = threading.Lock()
+        self._entries  = OrderedDict()   # key -> (expires_at, value), oldest first
+        self._inflight = {}              # key -> _InFlight
+        self._ainflight = {}             # key -> _AsyncFlight (async callers)
+
+        self.hits      = 0
+        self.misses    = 0
+        self.coalesced = 0
+        self.expired   = 0
+        self.evictions = 0
+        self.errors    = 0
+
+    def _lookup_locked(self, key):
+        """(hit, value) for a fresh entry; drops an expired one."""
+        item = self._entries.get(key)
+        if item is not None:
+            if item[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, item[1]
+            del self._entries[key]
+            self.expired += 1
+        return False, None
+
+    def _store_locked(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or compute() it once.
+
+        Callers arriving while the same key is being computed wait for that
+        computation instead of starting their own.
+        """
+        with self._lock:
+            hit, value = self._lookup_locked(key)
+            if hit:
+                return value
+
+            flight = self._inflight.get(key)
+            owner  = flight is None
+            if owner:
+                flight = self._inflight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            with self._lock:
+                self._store_locked(key, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    async def get_or_compute_async(self, key, compute):
+        """
+        get_or_compute() for coroutines: compute() returns an awaitable.
+
+        Coalesces with other async callers on the same event loop.
+        """
+        with self._lock:
+            hit, value = self._lookup_locked(key)
+            if hit:
+                return value
+
+            flight = self._ainflight.get(key)
+            if flight is None or flight.task.done():
+                task   = asyncio.get_running_loop().create_task(self._compute_async(key, compute))
+                flight = self._ainflight[key] = _AsyncFlight(task)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+
+        try:
+            # shield: a cancelled caller must not cancel the shared computation
+            return await asyncio.shield(flight.task)
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                orphaned = flight.waiters == 0 and not flight.task.done()
+                if orphaned and self._ainflight.get(key) is flight:
+                    # Unlisted before it unwinds, so a new caller starts afresh
+                    del self._ainflight[key]
+            if orphaned:
+                flight.task.cancel()
+
+    async def _compute_async(self, key, compute):
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            with self._lock:
+                self._store_locked(key, value)
+            return value
+        finally:
+            with self._lock:
+                flight = self._ainflight.get(key)
+                if flight is not None and flight.task is asyncio.current_task():
+                    del self._ainflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            served  = self.hits + self.coalesced
+            lookups = served + self.misses
+            return {
+                "hits":      self.hits,
+                "coalesced": self.coalesced,
+                "misses":    self.misses,
+                "hit_rate":  round(served / lookups, 4) if lookups else 0.0,
+                "expired":   self.expired,
+                "evictions": self.evictions,
+                "errors":    self.errors,
+                "entries":   len(self._entries),
+                "inflight":  len(self._inflight) + len(self._ainflight),
+                "ttl_s":     self.ttl_s,
+            }
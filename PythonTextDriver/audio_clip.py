@@ -0,0 +1,155 @@
+"""
+AudioClip: one utterance's audio, passed by reference from TTS through
+lip-sync, playback and storage.
+
+TTS results used to carry their audio as a base64 WAV string. It was decoded
+for lip-sync, decoded again and re-parsed by soundfile for playback, and
+decoded once more for the cache, so every clip existed in several full copies.
+An AudioClip holds the samples as a NumPy array that is a view into the buffer
+they arrived in (the joined PCM chunks, or WAV bytes read from the cache or a
+session file), plus the sample rate:
+
+  from_pcm()   raw 16-bit PCM (bytes / bytearray / memoryview), no copy
+  from_wav()   16-bit PCM or 32-bit float WAV: samples view the data chunk
+               and the original bytes are kept for wav_bytes()
+  data         the samples' bytes as a memoryview, no copy
+  float32()    float samples for the output engine (the one conversion)
+  wav_parts()  (header, data) or (wav,): write or hash a WAV without joining
+  wav_bytes()  the WAV file as one buffer: the original bytes, or built once
+  to_base64()  only at the HTTP boundary, for clients that ask for audio
+"""
+
+import base64
+import struct
+
+import numpy as np
+
+from wav_utils import wav_header
+
+_FORMAT_PCM        = 1
+_FORMAT_FLOAT      = 3
+_FORMAT_EXTENSIBLE = 0xFFFE
+
+_DTYPES = {(_FORMAT_PCM, 16): "<i2", (_FORMAT_FLOAT, 32): "<f4"}
+
+
+class AudioClip:
+    """Samples ((frames,) mono or (frames, channels); int16 or float32) plus their sample rate."""
+
+    __slots__ = ("samples", "samplerate", "_wav")
+
+    def __init__(self, samples: np.ndarray, samplerate: int, wav=None):
+        self.samples    = samples
+        self.samplerate = int(samplerate)
+        self._wav       = wav      # WAV file the samples view, or one built by wav_bytes()
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_pcm(cls, pcm, samplerate: int, channels: int = 1) -> "AudioClip":
+        """Raw little-endian 16-bit PCM; a trailing partial frame is ignored."""
+        frames  = len(memoryview(pcm).cast("B")) // (2 * channels)
+        samples = np.frombuffer(pcm, dtype="<i2", count=frames * channels)
+        return cls(samples if channels == 1 else samples.reshape(frames, channels), samplerate)
+
+    @classmethod
+    def from_wav(cls, wav) -> "AudioClip":
+        """
+        A RIFF/WAVE file (bytes-like). Raises ValueError for anything but
+        16-bit PCM or 32-bit float.
+        """
+        view = memoryview(wav).cast("B")
+        if len(view) < 12 or view[:4] != b"RIFF" or view[8:12] != b"WAVE":
+            raise ValueError("not a RIFF/WAVE file")
+        pos, fmt = 12, None
+        while pos + 8 <= len(view):
+            chunk_id = bytes(view[pos:pos + 4])
+            size     = struct.unpack_from("<I", view, pos + 4)[0]
+            body     = view[pos + 8:pos + 8 + size]
+            if chunk_id == b"fmt " and len(body) >= 16:
+                tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+                if tag == _FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack_from("<H", body, 24)[0]
+                fmt = (tag, channels, rate, bits)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("data chunk before fmt chunk")
+                tag, channels, rate, bits = fmt
+                dtype = _DTYPES.get((tag, bits))
+                if dtype is None or channels < 1:
+                    raise ValueError(f"unsupported WAV encoding (format {tag}, {bits} bit, {channels} ch)")
+                # Streamed WAVs may declare a bigger data chunk than they hold
+                frames  = len(body) // (channels * bits // 8)
+                samples = np.frombuffer(body, dtype=dtype, count=frames * channels)
+                return cls(samples if channels == 1 else samples.reshape(frames, channels), rate, wav)
+            pos += 8 + size + (size & 1)
+        raise ValueError("no data chunk")
+
+    @classmethod
+    def from_base64(cls, text: str) -> "AudioClip":
+        return cls.from_wav(base64.b64decode(text))
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.samples.ndim == 1 else self.samples.shape[1]
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration_ms(self) -> int:
+        return round(self.frames * 1000 / self.samplerate) if self.samplerate else 0
+
+    @property
+    def data(self) -> memoryview:
+        """The samples' bytes in their stored encoding, without copying."""
+        return memoryview(np.ascontiguousarray(self.samples)).cast("B")
+
+    @property
+    def wav_size(self) -> int:
+        """Size of the WAV file, without building it."""
+        return len(self._wav) if self._wav is not None else 44 + self.samples.nbytes
+
+    def float32(self) -> np.ndarray:
+        """Samples as float32 in [-1, 1] (a view when already float32)."""
+        if self.samples.dtype.kind == "i":
+            return self.samples.astype(np.float32) / 32768.0
+        return self.samples.astype(np.float32, copy=False)
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def wav_parts(self) -> tuple:
+        """The WAV file as consecutive buffers: (wav,) or (header, data)."""
+        if self._wav is not None:
+            return (self._wav,)
+        is_float = self.samples.dtype.kind == "f"
+        header = wav_header(self.samples.nbytes, self.samplerate, self.channels,
+                            32 if is_float else 16, _FORMAT_FLOAT if is_float else _FORMAT_PCM)
+        return header, self.data
+
+    def wav_bytes(self) -> bytes:
+        """The WAV file as one buffer (built on first use and kept)."""
+        if self._wav is None:
+            self._wav = b"".join(self.wav_parts())
+        return self._wav
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.wav_bytes()).decode("ascii")
+
+
+def as_clip(audio) -> AudioClip | None:
+    """An AudioClip from a clip, WAV bytes or a base64 WAV string; None for no audio."""
+    if audio is None or isinstance(audio, AudioClip):
+        return audio
+    if isinstance(audio, str):
+        return AudioClip.from_base64(audio) if audio else None
+    return AudioClip.from_wav(audio) if len(audio) else None
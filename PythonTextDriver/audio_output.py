@@ -0,0 +1,394 @@
+"""
+AudioOutputEngine: one long-lived output stream that every utterance plays on.
+
+Opening a stream per utterance meant a cold device and a 200 ms silence pad
+in front of every line. The engine instead keeps a single sounddevice
+OutputStream open at a fixed rate (OUTPUT_RATE, mono float32) and mixes
+whatever is playing in its callback:
+
+  - play_clip() resamples a decoded clip once, on enqueue, to the device rate
+    (or takes one already resampled by prepare(), e.g. while prefetching)
+  - play_stream() reads a PcmStream and resamples it chunk by chunk
+  - each returns a Voice: when it became audible on the engine's AudioClock,
+    where any offset into it plays, and its start latency (enqueue to
+    audible), so keyframes can be scheduled against the device
+  - a voice enqueued with after=<voice> starts on the exact frame that voice
+    ends, so queued utterances play back-to-back without a gap
+
+Between utterances the callback outputs silence, so a new voice starts at
+the next callback — one block plus the device's output latency.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+    _HAS_SD = True
+except ImportError:
+    _HAS_SD = False
+
+OUTPUT_RATE      = 48000
+OUTPUT_BLOCKSIZE = 256     # frames per callback (5.3 ms at 48 kHz)
+CLOCK_WINDOW     = 16      # callbacks over which the DAC clock origin is filtered
+LATENCY_WINDOW   = 64      # recent start latencies kept for stats
+
+
+class AudioClock:
+    """
+    Maps output frame positions to time.perf_counter(), fed by the output
+    stream callback.
+
+    Each callback reports when its first frame reaches the DAC: PortAudio's
+    outputBufferDacTime (translated from the stream clock to perf_counter)
+    or, when the host API reports none, callback time + output latency.
+    That gives an origin (perf time of frame 0); a callback that runs late
+    can only push the origin later, so the earliest origin over the last
+    CLOCK_WINDOW callbacks is used.
+    """
+
+    def __init__(self, samplerate: int):
+        self.samplerate = samplerate
+        self.started    = threading.Event()
+        self._origins   = deque(maxlen=CLOCK_WINDOW)
+        self._origin    = None
+
+    def update(self, frame: int, time_info, latency: float):
+        """Called at the start of each callback; frame is its first output frame."""
+        now = time.perf_counter()
+        dac_t = None
+        try:
+            if time_info.outputBufferDacTime and time_info.currentTime:
+                dac_t = now + (time_info.outputBufferDacTime - time_info.currentTime)
+        except AttributeError:
+            pass
+        if dac_t is None:
+            dac_t = now + (latency or 0.0)
+        self._origins.append(dac_t - frame / self.samplerate)
+        self._origin = min(self._origins)
+        self.started.set()
+
+    def time_of(self, frame: float) -> float:
+        """perf_counter time at which frame reaches the DAC (clock must have started)."""
+        return self._origin + frame / self.samplerate
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Linear-interpolation resample of mono float32 samples."""
+    samples = np.asarray(samples, dtype=np.float32)
+    if src_rate == dst_rate or not len(samples):
+        return samples
+    n_out = int(round(len(samples) * dst_rate / src_rate))
+    pos = np.arange(n_out) * (src_rate / dst_rate)
+    return np.interp(pos, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _mono(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim > 1 else samples
+
+
+class _ClipSource:
+    """A clip already at the device rate."""
+
+    def __init__(self, samples: np.ndarray):
+        self._samples = samples
+        self._pos     = 0
+
+    @property
+    def done(self) -> bool:
+        return self._pos >= len(self._samples)
+
+    def read(self, n: int) -> np.ndarray:
+        chunk = self._samples[self._pos:self._pos + n]
+        self._pos += len(chunk)
+        return chunk
+
+
+class _PcmStreamSource:
+    """
+    A PcmStream (16-bit PCM at its own rate) resampled to the device rate as
+    it is read. Returns None until the stream's first audio, so the voice
+    starts when sound does; later short reads (underruns) are padded with
+    silence, which the PcmStream accounts as stall.
+    """
+
+    def __init__(self, stream, samplerate: int):
+        self.stream   = stream
+        self._ratio   = stream.samplerate / samplerate
+        self._buf     = np.zeros(0, dtype=np.float32)   # pending input samples
+        self._phase   = 0.0                             # position of the next output in _buf
+        self._started = False
+
+    @property
+    def done(self) -> bool:
+        return self.stream.drained and self._phase + 1 >= len(self._buf)
+
+    def read(self, n: int):
+        need    = int(self._phase + (n - 1) * self._ratio) + 2
+        missing = need - len(self._buf)
+        if missing > 0:
+            data = self.stream.read(missing * self.stream.frame_bytes)
+            if data:
+                x = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+                x = _mono(x.reshape(-1, self.stream.channels))
+                self._buf = np.concatenate([self._buf, x])
+        if not self._started:
+            if len(self._buf) < 2:
+                return None
+            self._started = True
+
+        avail = len(self._buf) - 1 - self._phase
+        m = min(n, int(avail / self._ratio) + 1) if avail >= 0 else 0
+        out = np.zeros(n if not self.stream.drained else m, dtype=np.float32)
+        if m:
+            pos = self._phase + np.arange(m) * self._ratio
+            out[:m] = np.interp(pos, np.arange(len(self._buf)), self._buf)
+            nxt = self._phase + m * self._ratio
+            k = min(int(nxt), len(self._buf))
+            self._buf, self._phase = self._buf[k:], nxt - k
+        return out
+
+
+class Voice:
+    """One utterance in the engine's mix and its timing on the engine clock."""
+
+    def __init__(self, engine: "AudioOutputEngine", source, on_start=None, after: "Voice" = None):
+        self.clock       = engine.clock
+        self.enqueued_t  = time.perf_counter()
+        self.start_frame = None    # engine frame of the first sample
+        self.end_frame   = None    # engine frame after the last sample
+        self.after       = after   # voice this one follows without a gap
+        self.started     = threading.Event()
+        self.finished    = threading.Event()
+        self._source     = source
+        self._on_start   = on_start
+        self._stopped    = False
+
+    @property
+    def start_latency_ms(self):
+        """Enqueue to audible, or None before the voice starts (None when chained: it waited on purpose)."""
+        if self.start_frame is None or self.after is not None:
+            return None
+        return round((self.clock.time_of(self.start_frame) - self.enqueued_t) * 1000.0, 1)
+
+    def time_of(self, offset_s: float) -> float:
+        """perf_counter time at which offset_s into this voice plays (after started)."""
+        return self.clock.time_of(self.start_frame + offset_s * self.clock.samplerate)
+
+    def stop(self):
+        """Drop the voice from the mix at the next callback."""
+        self._stopped = True
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the voice has been mixed and its last sample is audible."""
+        if not self.finished.wait(timeout):
+            return False
+        if self.end_frame is not None and self.clock.started.is_set():
+            delay = self.clock.time_of(self.end_frame) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return True
+
+
+class AudioOutputEngine:
+    """A single always-open output stream mixing every playing Voice."""
+
+    def __init__(self, samplerate: int = OUTPUT_RATE, blocksize: int = OUTPUT_BLOCKSIZE,
+                 device=None):
+        self.samplerate = samplerate
+        self.blocksize  = blocksize
+        self.device     = device
+        self.clock      = AudioClock(samplerate)
+
+        self._lock    = threading.Lock()
+        self._voices  = []
+        self._stream  = None
+        self._frame   = 0
+        self._latency = deque(maxlen=LATENCY_WINDOW)
+
+        self.callbacks  = 0
+        self.underflows = 0
+        self.voices     = 0
+
+    @property
+    def available(self) -> bool:
+        return _HAS_SD
+
+    @property
+    def running(self) -> bool:
+        return self._stream is not None and getattr(self._stream, "active", True)
+
+    def start(self):
+        """Open the stream if it is not running (idempotent; also restarts a failed stream)."""
+        with self._lock:
+            if self.running or not _HAS_SD:
+                return
+            if self._stream is not None:
+                self._close_locked()
+            stream = sd.OutputStream(
+                samplerate=self.samplerate, channels=1, dtype="float32",
+                blocksize=self.blocksize, latency="low", device=self.device,
+                callback=self._callback)
+            try:
+                stream.start()
+            except Exception:
+                stream.close()
+                raise
+            self._stream = stream
+        print(f"[AudioOutput] output stream open: {self.samplerate} Hz, "
+              f"{self.blocksize}-frame blocks, latency {self.output_latency_ms} ms")
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+            voices, self._voices = self._voices, []
+        for voice in voices:
+            voice.finished.set()
+
+    def _close_locked(self):
+        stream, self._stream = self._stream, None
+        if stream is None:
+            return
+        try:
+            stream.stop()
+            stream.close()
+        except Exception as e:
+            print(f"[AudioOutput] close error: {e}")
+
+    @property
+    def output_latency_ms(self):
+        latency = getattr(self._stream, "latency", None)
+        return round(latency * 1000.0, 1) if latency is not None else None
+
+    # -- enqueue -----------------------------------------------------------
+
+    def prepare(self, samples: np.ndarray, samplerate: int) -> np.ndarray:
+        """A decoded clip (float32, mono or frames x channels) as mono at the device rate."""
+        return resample(_mono(np.asarray(samples, dtype=np.float32)), samplerate, self.samplerate)
+
+    def play_clip(self, samples: np.ndarray, samplerate: int = None, on_start=None,
+                  after: Voice = None) -> Voice:
+        """
+        Mix a decoded clip, resampled once here; samplerate None means it
+        came from prepare(). With after, it starts where that voice ends.
+        """
+        if samplerate is not None:
+            samples = self.prepare(samples, samplerate)
+        return self._add(Voice(self, _ClipSource(samples), on_start, after))
+
+    def play_stream(self, stream, on_start=None, after: Voice = None) -> Voice:
+        """Mix a PcmStream while it is still being filled."""
+        return self._add(Voice(self, _PcmStreamSource(stream, self.samplerate), on_start, after))
+
+    def _add(self, voice: Voice) -> Voice:
+        self.start()
+        if not self.running:
+            # No callback would ever mix (or finish) the voice
+            raise RuntimeError("audio output unavailable (sounddevice not installed)")
+        with self._lock:
+            self._voices.append(voice)
+            self.voices += 1
+        return voice
+
+    # -- callback ----------------------------------------------------------
+
+    def _callback(self, outdata, frames, time_info, status):
+        frame = self._frame
+        self.clock.update(frame, time_info, getattr(self._stream, "latency", 0.0))
+        self.callbacks += 1
+        if getattr(status, "output_underflow", False):
+            self.underflows += 1
+
+        mix = np.zeros(frames, dtype=np.float32)
+        with self._lock:
+            voices = list(self._voices)
+        done = []
+        for voice in voices:     # in enqueue order, so a voice's predecessor comes first
+            if voice._stopped:
+                voice.end_frame = frame if voice.start_frame is not None else None
+                done.append(voice)
+                continue
+            offset = 0
+            if voice.start_frame is None and voice.after is not None:
+                if voice.after.end_frame is None and not voice.after.finished.is_set():
+                    continue
+                offset = min(max((voice.after.end_frame or frame) - frame, 0), frames)
+            chunk = voice._source.read(frames - offset)
+            if chunk is not None and voice.start_frame is None:
+                voice.start_frame = frame + offset
+                if voice.start_latency_ms is not None:
+                    self._latency.append(voice.start_latency_ms)
+                voice.started.set()
+                if voice._on_start is not None:
+                    voice._on_start(voice)
+            if chunk is not None:
+                mix[offset:offset + len(chunk)] += chunk
+            if voice._source.done:
+                voice.end_frame = frame + offset + (len(chunk) if chunk is not None else 0)
+                done.append(voice)
+
+        np.clip(mix, -1.0, 1.0, out=mix)
+        outdata[:, 0] = mix
+        self._frame = frame + frames
+
+        if done:
+            with self._lock:
+                self._voices = [v for v in self._voices if v not in done]
+            for voice in done:
+                voice.finished.set()
+
+    # -- stats -------------------------------------------------------------
+
+    def expected_start_latency_ms(self) -> float:
+        """Mean recent start latency, or one block plus output latency before any voice."""
+        if self._latency:
+            return round(sum(self._latency) / len(self._latency), 1)
+        return round(self.blocksize * 1000.0 / self.samplerate + (self.output_latency_ms or 0.0), 1)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latency)
+        return {
+            "available":         self.available,
+            "running":           self.running,
+            "samplerate":        self.samplerate,
+            "blocksize":         self.blocksize,
+            "output_latency_ms": self.output_latency_ms,
+            "active_voices":     len(self._voices),
+            "voices":            self.voices,
+            "callbacks":         self.callbacks,
+            "underflows":        self.underflows,
+            "start_latency_ms": {
+                "last": self._latency[-1] if self._latency else None,
+                "mean": self.expected_start_latency_ms() if latencies else None,
+                "p95":  latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+                "max":  latencies[-1] if latencies else None,
+            },
+        }
+
+
+_engine = AudioOutputEngine()
+
+
+def output_engine() -> AudioOutputEngine:
+    """The process-wide engine (opened on first use or configure_output_engine())."""
+    return _engine
+
+
+def configure_output_engine(samplerate: int = OUTPUT_RATE, blocksize: int = OUTPUT_BLOCKSIZE,
+                            device=None) -> AudioOutputEngine:
+    """
+    Replace the process-wide engine with new settings and open it. A device
+    that cannot be opened is logged, not raised: the engine stays stopped
+    and the next voice retries the open.
+    """
+    global _engine
+    _engine.close()
+    _engine = AudioOutputEngine(samplerate, blocksize, device)
+    try:
+        _engine.start()
+    except Exception as e:
+        print(f"[AudioOutput] could not open the output device: {e}")
+    return _engine
@@ -0,0 +1,206 @@
+"""
+ISI TTS session manager: background token refresh and a concurrency cap.
+
+Tokens are fetched once at startup (prefetch) and then refreshed by a
+daemon thread ahead of expiry, so no synthesis request waits on the
+token round trip; only the very first call made before the prefetch
+completes blocks for it. A failed refresh keeps the old token (while valid)
+and retries with backoff.
+
+aslot() bounds how many synthesizer connections run at once; callers over the
+cap queue up to a timeout instead of opening more gateway connections.
+
+The gateway closes its WebSocket after each task, so connections themselves
+cannot be opened ahead of time; the token is the part of the setup moved off
+the critical path.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import nls.token
+
+# ISI tokens last 24 h; getToken() does not return the expiry
+TOKEN_TTL_S        = 24 * 3600
+TOKEN_REFRESH_S    = 10 * 60     # refresh this long before expiry
+RETRY_MIN_S        = 5.0
+RETRY_MAX_S        = 300.0
+MAX_CONCURRENT     = 4
+SLOT_TIMEOUT_S     = 30.0
+
+
+class IsiSessionManager:
+    """Token lifecycle and synthesis slots for one AccessKey pair."""
+
+    def __init__(self, ak_id: str, ak_secret: str, max_concurrent: int = MAX_CONCURRENT):
+        self.ak_id     = ak_id
+        self.ak_secret = ak_secret
+        self.max_concurrent = max_concurrent
+
+        self._token        = ""
+        self._expiry       = 0.0
+        self._token_lock   = threading.Lock()
+        self._token_ready  = threading.Condition(self._token_lock)
+        self._fetching     = False
+        self._stop         = threading.Event()
+        self._wake         = threading.Event()
+        self._thread       = None
+
+        self._aslots       = None   # asyncio.Semaphore, created on the loop
+        self._stats_lock   = threading.Lock()
+        self.inflight      = 0
+        self.queued        = 0
+        self.syntheses     = 0
+        self.slot_waits    = 0      # calls that found every slot busy
+        self.slot_wait_ms  = 0.0
+        self.refreshes     = 0
+        self.refresh_errors = 0
+        self.blocking_fetches = 0   # token fetched inside a request (cold start)
+        self.last_error    = ""
+
+    # ------------------------------------------------------------------
+    # Token
+    # ------------------------------------------------------------------
+
+    def _valid(self) -> bool:
+        return bool(self._token) and time.time() < self._expiry - 60
+
+    def _fetch(self) -> str:
+        """Fetch a token; concurrent callers wait for the single fetch in progress."""
+        with self._token_ready:
+            while self._fetching:
+                self._token_ready.wait()
+            if self._valid() and time.time() < self._expiry - TOKEN_REFRESH_S:
+                return self._token
+            self._fetching = True
+
+        token, error = "", None
+        try:
+            print("[ISI TTS] fetching new token via AccessKey…")
+            token = nls.token.getToken(self.ak_id, self.ak_secret)
+            if not token:
+                raise RuntimeError("getToken returned no token")
+        except Exception as e:
+            error = e
+
+        with self._token_ready:
+            self._fetching = False
+            if error is None:
+                self._token  = token
+                self._expiry = time.time() + TOKEN_TTL_S
+                self.refreshes += 1
+                print(f"[ISI TTS] token obtained (refresh in ~{(TOKEN_TTL_S - TOKEN_REFRESH_S) / 3600:.1f}h): {token[:8]}…")
+            else:
+                self.refresh_errors += 1
+                self.last_error = str(error)
+            self._token_ready.notify_all()
+
+        if error is not None:
+            raise error
+        return token
+
+    async def atoken(self) -> str:
+        """Current token; fetches only when none is valid yet (the blocking SDK call runs off-loop)."""
+        with self._token_lock:
+            if self._valid():
+                return self._token
+        with self._stats_lock:
+            self.blocking_fetches += 1
+        return await asyncio.to_thread(self._fetch)
+
+    def start(self):
+        """Start the background refresh thread (prefetches immediately)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refresh_loop, name="isi-token", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _refresh_loop(self):
+        backoff = RETRY_MIN_S
+        while not self._stop.is_set():
+            try:
+                self._fetch()
+                backoff = RETRY_MIN_S
+                delay = max(1.0, self._expiry - TOKEN_REFRESH_S - time.time())
+            except Exception as e:
+                print(f"[ISI TTS] token refresh failed (retry in {backoff:g}s): {e}")
+                delay = backoff
+                backoff = min(RETRY_MAX_S, backoff * 2)
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Concurrency
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def aslot(self, timeout: float = SLOT_TIMEOUT_S):
+        """Hold one of max_concurrent synthesis slots; raises TimeoutError when none frees up."""
+        if self._aslots is None:
+            self._aslots = asyncio.Semaphore(self.max_concurrent)
+        t0 = time.perf_counter()
+        if self._aslots.locked():
+            with self._stats_lock:
+                self.slot_waits += 1
+                self.queued += 1
+            try:
+                await asyncio.wait_for(self._aslots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"ISI 并发已满（{self.max_concurrent}），等待超时") from None
+            finally:
+                with self._stats_lock:
+                    self.queued -= 1
+                    self.slot_wait_ms += (time.perf_counter() - t0) * 1000.0
+        else:
+            await self._aslots.acquire()
+
+        with self._stats_lock:
+            self.inflight += 1
+            self.syntheses += 1
+        try:
+            yield
+        finally:
+            with self._stats_lock:
+                self.inflight -= 1
+            self._aslots.release()
+
+    def stats(self) -> dict:
+        with self._token_lock:
+            expires_in = round(self._expiry - time.time()) if self._token else None
+        with self._stats_lock:
+            return {
+                "token_valid":      expires_in is not None and expires_in > 60,
+                "token_expires_in_s": expires_in,
+                "refreshes":        self.refreshes,
+                "refresh_errors":   self.refresh_errors,
+                "blocking_fetches": self.blocking_fetches,
+                "max_concurrent":   self.max_concurrent,
+                "inflight":         self.inflight,
+                "queued":           self.queued,
+                "syntheses":        self.syntheses,
+                "slot_waits":       self.slot_waits,
+                "avg_slot_wait_ms": round(self.slot_wait_ms / self.slot_waits, 1) if self.slot_waits else 0.0,
+                "last_error":       self.last_error,
+            }
+
+
+_managers: dict[tuple, IsiSessionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def session_manager(ak_id: str, ak_secret: str) -> IsiSessionManager:
+    """Process-wide manager for an AccessKey pair; a replaced pair's manager is stopped."""
+    with _managers_lock:
+        manager = _managers.get((ak_id, ak_secret))
+        if manager is None:
+            for key in list(_managers):
+                _managers.pop(key).stop()
+            manager = _managers[(ak_id, ak_secret)] = IsiSessionManager(ak_id, ak_secret)
+            manager.start()
+        return manager
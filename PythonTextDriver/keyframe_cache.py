@@ -0,0 +1,259 @@
+"""
+Lip-sync keyframe cache keyed by input content and mapping-table version.
+
+Entries are addressed by (kind, version, digest):
+  kind     which producer made them ("rhubarb", "native", "phonemes")
+  version  table_version() of every table/parameter the producer's output
+           depends on, e.g. _SHAPE_BS for Rhubarb, _VISEME_TABLE for phonemes
+  digest   content_hash() of the input (WAV bytes, phoneme timings)
+
+The first lookup of a kind with a new version drops that kind's entries for
+other versions, in memory and on disk, so editing _VISEME_TABLE invalidates
+the phoneme entries but leaves Rhubarb results alone.
+
+Two tiers, both LRU by entry count:
+  - memory: (KeyframeTrack, duration_ms); tracks are columnar and share
+            their producer's ShapeTable
+  - disk:   <kind>-<version>-<digest>.json holding KeyframeTrack.to_json(),
+            only when a directory is set; access order survives restarts
+            via file mtimes
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from keyframe_track import KeyframeTrack
+
+
+def content_hash(*parts) -> str:
+    """Digest of the concatenated parts (any bytes-like objects; nothing is joined)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()[:32]
+
+
+def table_version(*tables) -> str:
+    """Short fingerprint of JSON-serializable tables/parameters."""
+    raw = json.dumps(tables, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class KeyframeCache:
+    """Two-tier (memory + optional disk) LRU cache of lip-sync keyframes."""
+
+    def __init__(self, directory: str | None = None, max_entries: int = 1024, max_disk_entries: int = 8192):
+        self.directory        = directory
+        self.max_entries      = max_entries
+        self.max_disk_entries = max_disk_entries
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock     = threading.Lock()
+        self._mem      = OrderedDict()   # name -> (track, duration_ms), oldest first
+        self._disk     = OrderedDict()   # name -> None (oldest first)
+        self._versions = {}              # kind -> current version
+
+        self.hits_memory = 0
+        self.hits_disk   = 0
+        self.misses      = 0
+        self.stores      = 0
+        self.evictions   = 0
+        self.invalidated = 0
+
+        if directory:
+            self._load_index()
+
+    @staticmethod
+    def _name(kind: str, version: str, digest: str) -> str:
+        return f"{kind}-{version}-{digest}"
+
+    # -- disk layout -------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _load_index(self):
+        found = []
+        for fname in os.listdir(self.directory):
+            if fname.endswith(".json"):
+                try:
+                    found.append((os.path.getmtime(os.path.join(self.directory, fname)), fname[:-5]))
+                except OSError:
+                    continue
+        for _, name in sorted(found):
+            self._disk[name] = None
+
+    def _read_disk(self, name: str):
+        path = self._path(name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            os.utime(path, (now, now))   # persist LRU order
+            return KeyframeTrack.from_json(data["track"]), data["duration_ms"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_disk(self, name: str, entry: tuple):
+        track, duration_ms = entry
+        path = self._path(name)
+        tmp  = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"duration_ms": duration_ms, "track": track.to_json()}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _remove_disk(self, names: list):
+        for name in names:
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    # -- versions ----------------------------------------------------------
+
+    def _check_version(self, kind: str, version: str):
+        """On a kind's first lookup with a new version, drop its other versions."""
+        if self._versions.get(kind) == version:
+            return
+        prefix, keep = f"{kind}-", f"{kind}-{version}-"
+        with self._lock:
+            if self._versions.get(kind) == version:
+                return
+            self._versions[kind] = version
+            stale_mem  = [n for n in self._mem if n.startswith(prefix) and not n.startswith(keep)]
+            stale_disk = [n for n in self._disk if n.startswith(prefix) and not n.startswith(keep)]
+            for name in stale_mem:
+                del self._mem[name]
+            for name in stale_disk:
+                del self._disk[name]
+            self.invalidated += len(set(stale_mem) | set(stale_disk))
+        if stale_disk:
+            print(f"[KeyframeCache] {kind} mapping changed — dropped {len(stale_disk)} cached entries")
+            self._remove_disk(stale_disk)
+
+    # -- public API --------------------------------------------------------
+
+    def get_memory(self, kind: str, version: str, digest: str):
+        """(track, duration_ms) from the memory tier only, or None."""
+        self._check_version(kind, version)
+        name = self._name(kind, version, digest)
+        with self._lock:
+            entry = self._mem.get(name)
+            if entry is None:
+                if name not in self._disk:
+                    self.misses += 1
+                return None
+            self._mem.move_to_end(name)
+            if name in self._disk:
+                self._disk.move_to_end(name)
+            self.hits_memory += 1
+        return entry
+
+    def on_disk(self, kind: str, version: str, digest: str) -> bool:
+        return self._name(kind, version, digest) in self._disk
+
+    def get(self, kind: str, version: str, digest: str):
+        """(track, duration_ms) or None; a disk hit is promoted to memory."""
+        hit = self.get_memory(kind, version, digest)
+        if hit is not None:
+            return hit
+        name = self._name(kind, version, digest)
+        with self._lock:
+            on_disk = name in self._disk
+        if not on_disk:
+            return None
+
+        entry = self._read_disk(name)
+        with self._lock:
+            if entry is None:
+                self._disk.pop(name, None)
+                self.misses += 1
+                return None
+            if name in self._disk:
+                self._disk.move_to_end(name)
+            self._remember(name, entry)
+            self.hits_disk += 1
+        return entry
+
+    async def get_async(self, kind: str, version: str, digest: str):
+        """
+        get() for event-loop callers: a memory lookup runs inline; a disk read,
+        or the stale-version cleanup of a kind's first lookup, runs in a thread.
+        """
+        if self._versions.get(kind) == version:
+            hit = self.get_memory(kind, version, digest)
+            if hit is not None or not self.on_disk(kind, version, digest):
+                return hit
+        return await asyncio.to_thread(self.get, kind, version, digest)
+
+    def _remember(self, name: str, entry: tuple):
+        self._mem[name] = entry
+        self._mem.move_to_end(name)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def put(self, kind: str, version: str, digest: str, track: KeyframeTrack, duration_ms: int,
+            persist: bool = True):
+        """Store a track; persist=False keeps cheap-to-recompute entries off disk."""
+        entry = (track, duration_ms)
+        self._check_version(kind, version)
+        name = self._name(kind, version, digest)
+        with self._lock:
+            self._remember(name, entry)
+            self.stores += 1
+        if not (persist and self.directory):
+            return
+
+        try:
+            self._write_disk(name, entry)
+        except OSError as e:
+            print(f"[KeyframeCache] write failed: {e}")
+            return
+        evict = []
+        with self._lock:
+            self._disk[name] = None
+            self._disk.move_to_end(name)
+            while len(self._disk) > self.max_disk_entries:
+                evict.append(self._disk.popitem(last=False)[0])
+            self.evictions += len(evict)
+        self._remove_disk(evict)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits    = self.hits_memory + self.hits_disk
+            lookups = hits + self.misses
+            return {
+                "hits":           hits,
+                "hits_memory":    self.hits_memory,
+                "hits_disk":      self.hits_disk,
+                "misses":         self.misses,
+                "hit_rate":       round(hits / lookups, 4) if lookups else 0.0,
+                "stores":         self.stores,
+                "evictions":      self.evictions,
+                "invalidated":    self.invalidated,
+                "memory_entries": len(self._mem),
+                "disk_entries":   len(self._disk),
+                "versions":       dict(self._versions),
+            }
+
+
+_cache = KeyframeCache()
+
+
+def keyframe_cache() -> KeyframeCache:
+    """The process-wide cache (memory-only until configure_keyframe_cache())."""
+    return _cache
+
+
+def configure_keyframe_cache(directory: str | None, max_entries: int = 1024,
+                             max_disk_entries: int = 8192) -> KeyframeCache:
+    """Replace the process-wide cache, e.g. to add disk persistence at startup."""
+    global _cache
+    _cache = KeyframeCache(directory, max_entries, max_disk_entries)
+    return _cache
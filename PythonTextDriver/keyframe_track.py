@@ -0,0 +1,251 @@
+"""
+Columnar lip-sync keyframe tracks.
+
+A KeyframeTrack holds an utterance's keyframes as parallel NumPy arrays
+instead of a list of {"time_ms", "blendshapes": {...}} dicts:
+
+  times    int32    keyframe times (ms)
+  shapes   uint8    index into a ShapeTable of mouth poses
+  weights  float32  optional per-keyframe scale of the pose (None = 1.0)
+
+Producers share one ShapeTable per mapping (Rhubarb shapes, phoneme
+visemes), so a keyframe costs 5 bytes rather than a dict per keyframe.
+slice() returns views into the same arrays; to_keyframes() rebuilds the
+dict format for code that still expects it, and to_json() / from_json()
+give a compact base64 form for sessions and caches.
+
+keyframe_items() iterates (time_ms, blendshapes) pairs from either
+representation, so players accept both.
+"""
+
+import base64
+
+import numpy as np
+
+# TextDrivenController releases the mouth after 300 ms without data
+MAX_HOLD_MS = 250
+
+
+class ShapeTable:
+    """
+    Immutable table of mouth poses over a fixed set of channels.
+
+    pose(i) returns a shared dict: callers must copy it before mutating.
+    """
+
+    __slots__ = ("labels", "channels", "matrix", "_poses", "_index")
+
+    def __init__(self, poses, labels=None):
+        """poses: dict label -> {channel: value}, or a list of pose dicts."""
+        if isinstance(poses, dict):
+            labels, poses = list(poses), list(poses.values())
+        if len(poses) > 256:
+            raise ValueError(f"ShapeTable holds at most 256 poses, got {len(poses)}")
+        channels = []
+        for pose in poses:
+            for name in pose:
+                if name not in channels:
+                    channels.append(name)
+
+        self.labels   = tuple(labels) if labels is not None else None
+        self.channels = tuple(channels)
+        self.matrix   = np.array([[pose.get(c, 0.0) for c in channels] for pose in poses],
+                                 dtype=np.float32).reshape(len(poses), len(channels))
+        self.matrix.setflags(write=False)
+        self._poses   = tuple(dict(pose) for pose in poses)
+        self._index   = {}
+        for i, pose in enumerate(self._poses):
+            self._index.setdefault(_pose_key(pose), i)
+
+    def __len__(self) -> int:
+        return len(self._poses)
+
+    def pose(self, i: int) -> dict:
+        return self._poses[i]
+
+    def find(self, pose: dict):
+        """Index of an identical pose, or None."""
+        return self._index.get(_pose_key(pose))
+
+    def to_json(self) -> dict:
+        return {"channels": list(self.channels),
+                "poses":    [[pose.get(c, 0.0) for c in self.channels] for pose in self._poses],
+                "labels":   list(self.labels) if self.labels is not None else None}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ShapeTable":
+        channels = data["channels"]
+        poses = [dict(zip(channels, row)) for row in data["poses"]]
+        return cls(poses, data.get("labels"))
+
+
+def _pose_key(pose: dict) -> tuple:
+    return tuple(sorted((k, round(float(v), 6)) for k, v in pose.items()))
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def _unb64(text: str, dtype) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype=dtype)
+
+
+class KeyframeTrack:
+    """Keyframes as parallel arrays over a shared ShapeTable."""
+
+    __slots__ = ("times", "shapes", "weights", "table")
+
+    def __init__(self, times, shapes, table: ShapeTable, weights=None):
+        self.times   = np.asarray(times, dtype=np.int32)
+        self.shapes  = np.asarray(shapes, dtype=np.uint8)
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float32)
+        self.table   = table
+        if len(self.times) != len(self.shapes):
+            raise ValueError("times and shapes differ in length")
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def empty(cls, table: ShapeTable) -> "KeyframeTrack":
+        return cls(np.zeros(0, np.int32), np.zeros(0, np.uint8), table)
+
+    @classmethod
+    def from_keyframes(cls, keyframes: list, table: ShapeTable = None) -> "KeyframeTrack":
+        """
+        Build from the dict format. Poses are looked up in table; without a
+        table (or for poses it lacks) a table of the distinct poses is built.
+        """
+        indices = [table.find(kf["blendshapes"]) for kf in keyframes] if table is not None else None
+        if indices is None or None in indices:
+            poses, seen, indices = [], {}, []
+            for kf in keyframes:
+                key = _pose_key(kf["blendshapes"])
+                if key not in seen:
+                    seen[key] = len(poses)
+                    poses.append(kf["blendshapes"])
+                indices.append(seen[key])
+            table = ShapeTable(poses)
+        return cls([kf["time_ms"] for kf in keyframes], indices, table)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "KeyframeTrack":
+        weights = data.get("weights")
+        return cls(_unb64(data["times"], "<i4"), _unb64(data["shapes"], np.uint8),
+                   ShapeTable.from_json(data["table"]),
+                   None if weights is None else _unb64(weights, "<f4"))
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, KeyframeTrack):
+            return NotImplemented
+        return (np.array_equal(self.times, other.times)
+                and np.array_equal(self.values(), other.values())
+                and self.table.channels == other.table.channels)
+
+    @property
+    def end_ms(self) -> int:
+        return int(self.times[-1]) if len(self.times) else 0
+
+    def blendshapes(self, i: int) -> dict:
+        """Pose of keyframe i (shared when unweighted: copy before mutating)."""
+        pose = self.table.pose(self.shapes[i])
+        if self.weights is None or self.weights[i] == 1.0:
+            return pose
+        w = float(self.weights[i])
+        return {k: v * w for k, v in pose.items()}
+
+    def items(self):
+        """Yield (time_ms, blendshapes) in order."""
+        for i, t in enumerate(self.times.tolist()):
+            yield t, self.blendshapes(i)
+
+    def values(self) -> np.ndarray:
+        """(n, channels) matrix of blendshape values."""
+        out = self.table.matrix[self.shapes]
+        return out * self.weights[:, None] if self.weights is not None else out
+
+    # ------------------------------------------------------------------
+    # Transformations
+    # ------------------------------------------------------------------
+
+    def slice(self, start_ms: int, end_ms: int = None) -> "KeyframeTrack":
+        """Keyframes with start_ms <= time_ms < end_ms; arrays are views, not copies."""
+        lo = int(np.searchsorted(self.times, start_ms, side="left"))
+        hi = len(self.times) if end_ms is None else int(np.searchsorted(self.times, end_ms, side="left"))
+        return KeyframeTrack(self.times[lo:hi], self.shapes[lo:hi], self.table,
+                             None if self.weights is None else self.weights[lo:hi])
+
+    def dedup(self, max_hold_ms: int | None = MAX_HOLD_MS) -> "KeyframeTrack":
+        """
+        Run-length dedup: drop keyframes that repeat the previous pose.
+
+        A repeat is kept when more than max_hold_ms have passed since the
+        last kept keyframe, so the receiver keeps getting data during long
+        holds; None drops every repeat.
+        """
+        n = len(self.times)
+        if n < 2:
+            return self
+        same = self.shapes[1:] == self.shapes[:-1]
+        if self.weights is not None:
+            same &= self.weights[1:] == self.weights[:-1]
+        if not same.any():
+            return self
+        keep = np.ones(n, dtype=bool)
+        keep[1:] = ~same
+        if max_hold_ms is not None:
+            last = int(self.times[0])
+            for i in np.flatnonzero(same).tolist():
+                i += 1
+                if keep[i - 1]:
+                    last = int(self.times[i - 1])
+                if self.times[i] - last > max_hold_ms:
+                    keep[i] = True
+                    last = int(self.times[i])
+        return KeyframeTrack(self.times[keep], self.shapes[keep], self.table,
+                             None if self.weights is None else self.weights[keep])
+
+    def shifted(self, offset_ms: int) -> "KeyframeTrack":
+        return KeyframeTrack(self.times + np.int32(offset_ms), self.shapes, self.table, self.weights)
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def to_keyframes(self) -> list[dict]:
+        """The dict format, with a fresh blendshapes dict per keyframe."""
+        return [{"time_ms": t, "blendshapes": dict(bs)} for t, bs in self.items()]
+
+    def to_json(self) -> dict:
+        return {
+            "format":  "track/1",
+            "table":   self.table.to_json(),
+            "times":   _b64(self.times.astype("<i4", copy=False)),
+            "shapes":  _b64(self.shapes),
+            "weights": None if self.weights is None else _b64(self.weights.astype("<f4", copy=False)),
+        }
+
+
+def as_track(keyframes, table: ShapeTable = None) -> KeyframeTrack:
+    """A KeyframeTrack from a track, its to_json() dict, or a keyframe dict list."""
+    if isinstance(keyframes, KeyframeTrack):
+        return keyframes
+    if isinstance(keyframes, dict) and keyframes.get("format") == "track/1":
+        return KeyframeTrack.from_json(keyframes)
+    return KeyframeTrack.from_keyframes(list(keyframes or []), table)
+
+
+def keyframe_items(keyframes):
+    """(time_ms, blendshapes) pairs from a KeyframeTrack or a keyframe dict list."""
+    if isinstance(keyframes, KeyframeTrack):
+        return keyframes.items()
+    return ((kf["time_ms"], kf["blendshapes"]) for kf in keyframes)
@@ -0,0 +1,178 @@
+"""
+Fixed-rate lip-sync curves from keyframe tracks.
+
+Keyframes are step functions at irregular phoneme / cue boundaries. This
+stage turns a KeyframeTrack into a curve sampled at a fixed rate (60 Hz by
+default) that can be played or exported as-is:
+
+  1. Coarticulation: each keyframe's pose is pulled toward the mean of its
+     neighbours, more strongly the shorter it is held
+     (pull = coarticulation * exp(-held_ms / coarticulation_ms)), so a
+     40 ms viseme between two others is blended instead of snapped to.
+  2. Attack / release: every channel follows its (coarticulated) target
+     with a first-order envelope whose time constant depends on direction
+     — attack_ms when rising, release_ms when falling (time to ~95%).
+  3. Resampling: the envelope has a closed form per keyframe segment, so
+     only the segment start values are computed sequentially (one step per
+     keyframe); every output sample is then evaluated with NumPy at once.
+
+Parameters are set globally and overridden per blendshape channel:
+
+  {"rate_hz": 60, "attack_ms": 60, "release_ms": 90,
+   "coarticulation": 0.35, "coarticulation_ms": 90,
+   "channels": {"mouthFunnel": {"coarticulation": 0.5}}}
+"""
+
+import base64
+import copy
+
+import numpy as np
+
+from keyframe_track import KeyframeTrack
+
+CURVE_RATE_HZ = 60
+
+DEFAULT_CURVE_PARAMS = {
+    "rate_hz":           CURVE_RATE_HZ,
+    "attack_ms":         60,     # rising: ms to reach ~95% of the target
+    "release_ms":        90,     # falling: ms to reach ~95% of the target
+    "coarticulation":    0.35,   # max pull toward the neighbouring poses (0..1)
+    "coarticulation_ms": 90,     # keyframes held this long get pull / e
+    "channels": {
+        # The jaw follows syllables closely; lip rounding spreads across them
+        "jawOpen":     {"attack_ms": 50, "release_ms": 80},
+        "mouthFunnel": {"coarticulation": 0.5, "coarticulation_ms": 120},
+        "mouthPucker": {"coarticulation": 0.5, "coarticulation_ms": 120},
+    },
+}
+
+_CHANNEL_KEYS = ("attack_ms", "release_ms", "coarticulation", "coarticulation_ms")
+
+# An envelope is within 5% of its target after 3 time constants
+_TAU_PER_MS = 1.0 / 3.0
+
+
+def curve_params(overrides: dict | None = None) -> dict:
+    """DEFAULT_CURVE_PARAMS with config overrides merged in (channels merged per key)."""
+    params = copy.deepcopy(DEFAULT_CURVE_PARAMS)
+    for key, value in (overrides or {}).items():
+        if key == "channels":
+            for channel, values in (value or {}).items():
+                params["channels"].setdefault(channel, {}).update(values)
+        elif key in params:
+            params[key] = value
+    return params
+
+
+def _channel_arrays(params: dict, channels: tuple) -> dict:
+    """Per-channel float64 arrays of every _CHANNEL_KEYS parameter."""
+    per_channel = params.get("channels", {})
+    return {key: np.array([float(per_channel.get(c, {}).get(key, params[key])) for c in channels])
+            for key in _CHANNEL_KEYS}
+
+
+class LipCurve:
+    """Blendshape values sampled every 1000 / rate_hz ms from time 0."""
+
+    __slots__ = ("rate_hz", "channels", "values")
+
+    def __init__(self, rate_hz: float, channels, values):
+        self.rate_hz  = float(rate_hz)
+        self.channels = tuple(channels)
+        self.values   = np.asarray(values, dtype=np.float32).reshape(-1, len(self.channels))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def times_ms(self) -> np.ndarray:
+        return np.arange(len(self.values)) * (1000.0 / self.rate_hz)
+
+    @property
+    def duration_ms(self) -> float:
+        return (len(self.values) - 1) * 1000.0 / self.rate_hz if len(self.values) else 0.0
+
+    def items(self):
+        """Yield (time_ms, blendshapes) per sample, for SpeechPlayer."""
+        step = 1000.0 / self.rate_hz
+        for i, row in enumerate(np.round(self.values.astype(np.float64), 4).tolist()):
+            yield round(i * step, 1), dict(zip(self.channels, row))
+
+    def to_keyframes(self) -> list[dict]:
+        return [{"time_ms": t, "blendshapes": bs} for t, bs in self.items()]
+
+    def to_json(self) -> dict:
+        """Row-major little-endian float32 values, base64-encoded."""
+        return {
+            "format":   "curve/1",
+            "rate_hz":  self.rate_hz,
+            "channels": list(self.channels),
+            "frames":   len(self.values),
+            "values":   base64.b64encode(self.values.astype("<f4").tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "LipCurve":
+        values = np.frombuffer(base64.b64decode(data["values"]), dtype="<f4")
+        return cls(data["rate_hz"], data["channels"], values)
+
+
+def _coarticulate(values: np.ndarray, held_ms: np.ndarray, p: dict) -> np.ndarray:
+    """Pull each keyframe toward the mean of its neighbours, by how briefly it is held."""
+    if len(values) < 2:
+        return values
+    prev = np.vstack([values[:1], values[:-1]])
+    nxt  = np.vstack([values[1:], values[-1:]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pull = p["coarticulation"] * np.exp(-held_ms[:, None] / p["coarticulation_ms"])
+    pull = np.nan_to_num(np.clip(pull, 0.0, 1.0))
+    return values + pull * ((prev + nxt) * 0.5 - values)
+
+
+def resample_track(track: KeyframeTrack, params: dict | None = None,
+                   end_ms: float | None = None) -> LipCurve:
+    """
+    Curve of a track at params["rate_hz"] (curve_params() defaults).
+
+    The mouth starts from rest (all channels 0). end_ms is where the last
+    keyframe stops being held; by default the curve runs until its release
+    has settled.
+    """
+    params   = params or curve_params()
+    rate_hz  = float(params.get("rate_hz") or CURVE_RATE_HZ)
+    channels = track.table.channels
+    if not len(track):
+        return LipCurve(rate_hz, channels, np.zeros((0, len(channels))))
+
+    p      = _channel_arrays(params, channels)
+    times  = track.times.astype(np.float64)
+    values = track.values().astype(np.float64)
+    if end_ms is None:
+        end_ms = times[-1] + float(p["release_ms"].max())
+    end_ms = max(float(end_ms), float(times[-1]))
+
+    held_ms = np.diff(times, append=end_ms)
+    targets = _coarticulate(values, held_ms, p)
+
+    # Segment start values: one sequential step per keyframe, vectorized over channels
+    tau_attack  = np.maximum(p["attack_ms"] * _TAU_PER_MS, 1e-3)
+    tau_release = np.maximum(p["release_ms"] * _TAU_PER_MS, 1e-3)
+    decay_attack  = np.exp(-held_ms[:, None] / tau_attack)
+    decay_release = np.exp(-held_ms[:, None] / tau_release)
+    rising = np.empty(targets.shape, dtype=bool)
+    starts = np.empty_like(targets)
+    y = np.zeros(len(channels))
+    for i in range(len(targets)):
+        up = targets[i] >= y
+        rising[i], starts[i] = up, y
+        y = targets[i] + (y - targets[i]) * np.where(up, decay_attack[i], decay_release[i])
+
+    # Every sample at once from the closed form of its segment
+    t    = np.arange(int(end_ms * rate_hz / 1000.0) + 1) * (1000.0 / rate_hz)
+    seg  = np.searchsorted(times, t, side="right") - 1
+    live = seg >= 0
+    out  = np.zeros((len(t), len(channels)))
+    s    = seg[live]
+    dt   = (t[live] - times[s])[:, None]
+    tau  = np.where(rising[s], tau_attack, tau_release)
+    out[live] = targets[s] + (starts[s] - targets[s]) * np.exp(-dt / tau)
+    return LipCurve(rate_hz, channels, np.clip(out, 0.0, 1.0))
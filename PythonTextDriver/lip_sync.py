@@ -3,8 +3,20 @@ Lip sync module: maps ISI TTS phonemes to Live2D mouth blendshape keyframes.
 
 ISI phoneme format: "initial_final" e.g. "j_in", "w_an", "zh_ong"
 or bare syllables like "a", "o" for vowel-only sounds.
+
+phonemes_to_track() builds a columnar KeyframeTrack over VISEME_SHAPES;
+phonemes_to_keyframes() is the same in the dict-list format. Results are
+memoized in keyframe_cache (kind "phonemes", memory only) under a version of
+the tables below, so editing a table invalidates just these entries.
 """
 
+import json
+
+import numpy as np
+
+from keyframe_cache import content_hash, keyframe_cache, table_version
+from keyframe_track import KeyframeTrack, ShapeTable
+
 
 # Vowel detection: check each candidate in priority order (first match wins).
 # The check is for substrings in the phoneme's final (after underscore).
@@ -31,6 +43,15 @@ _VISEME_TABLE = {
 
 _CLOSED = _VISEME_TABLE[""]
 
+# A gap longer than this between phonemes closes the mouth
+_CLOSE_GAP_MS = 30
+
+_CACHE_VERSION = table_version(_VOWEL_CHECKS, _VISEME_TABLE, _CLOSE_GAP_MS)
+
+# Shared by every phoneme track; labels are the _VISEME_TABLE vowel keys
+VISEME_SHAPES = ShapeTable(_VISEME_TABLE)
+_VOWEL_INDEX  = {vowel: i for i, vowel in enumerate(VISEME_SHAPES.labels)}
+
 
 def extract_dominant_vowel(phoneme: str) -> str:
     """
@@ -54,12 +75,32 @@ def viseme_for_vowel(vowel: str) -> dict:
     return dict(_VISEME_TABLE.get(vowel, _CLOSED))
 
 
-def phonemes_to_keyframes(phoneme_flat: list) -> list:
+def _phoneme_frames(ph: dict, next_begin) -> list:
+    """
+    (time_ms, vowel) frames for one phoneme: its viseme at begin_ms, plus a
+    closing frame at end_ms when there is a visible gap (> _CLOSE_GAP_MS) to
+    next_begin, or unconditionally when next_begin is None (the very last
+    phoneme).
+    """
+    begin_ms = ph.get("begin_ms", 0)
+    end_ms   = ph.get("end_ms", begin_ms)
+
+    frames = [(begin_ms, extract_dominant_vowel(ph.get("phoneme", "")))]
+    if next_begin is None or (next_begin > end_ms and (next_begin - end_ms) > _CLOSE_GAP_MS):
+        frames.append((end_ms, ""))
+    return frames
+
+
+def _phoneme_keyframes(ph: dict, next_begin) -> list:
+    return [{"time_ms": t, "blendshapes": viseme_for_vowel(vowel)}
+            for t, vowel in _phoneme_frames(ph, next_begin)]
+
+
+def phonemes_to_track(phoneme_flat: list) -> KeyframeTrack:
     """
-    Convert ISI phoneme_flat list to animation keyframes.
+    Convert ISI phoneme_flat list to an animation track over VISEME_SHAPES.
 
     Each input item has: char, phoneme, tone, begin_ms, end_ms.
-    Each output keyframe: { "time_ms": int, "blendshapes": dict }.
 
     Strategy:
       - At begin_ms: target viseme for this phoneme
@@ -67,25 +108,65 @@ def phonemes_to_keyframes(phoneme_flat: list) -> list:
         a closing frame so the mouth returns to neutral between words.
     """
     if not phoneme_flat:
-        return []
+        return KeyframeTrack.empty(VISEME_SHAPES)
 
-    keyframes = []
+    cache  = keyframe_cache()
+    digest = content_hash(json.dumps(
+        [(ph.get("phoneme", ""), ph.get("begin_ms", 0), ph.get("end_ms")) for ph in phoneme_flat]
+    ).encode("utf-8"))
+    hit = cache.get_memory("phonemes", _CACHE_VERSION, digest)
+    if hit is not None:
+        return hit[0]
 
+    frames = []
     for i, ph in enumerate(phoneme_flat):
-        phoneme_str = ph.get("phoneme", "")
-        begin_ms    = ph.get("begin_ms", 0)
-        end_ms      = ph.get("end_ms", begin_ms)
+        is_last = (i == len(phoneme_flat) - 1)
+        frames += _phoneme_frames(ph, None if is_last else phoneme_flat[i + 1]["begin_ms"])
 
-        vowel = extract_dominant_vowel(phoneme_str)
-        bs    = viseme_for_vowel(vowel)
+    times = np.array([t for t, _ in frames], dtype=np.int32)
+    order = np.argsort(times, kind="stable")
+    track = KeyframeTrack(times[order],
+                          np.array([_VOWEL_INDEX.get(v, _VOWEL_INDEX[""]) for _, v in frames], np.uint8)[order],
+                          VISEME_SHAPES)
+    cache.put("phonemes", _CACHE_VERSION, digest, track, track.end_ms, persist=False)
+    return track
 
-        keyframes.append({"time_ms": begin_ms, "blendshapes": dict(bs)})
 
-        # Insert closing frame when there is a visible gap to the next phoneme,
-        # or unconditionally after the very last phoneme.
-        is_last    = (i == len(phoneme_flat) - 1)
-        next_begin = phoneme_flat[i + 1]["begin_ms"] if not is_last else end_ms
-        if is_last or (next_begin > end_ms and (next_begin - end_ms) > 30):
-            keyframes.append({"time_ms": end_ms, "blendshapes": dict(_CLOSED)})
+def phonemes_to_keyframes(phoneme_flat: list) -> list:
+    """
+    phonemes_to_track() in the dict-list format.
+
+    Each output keyframe: { "time_ms": int, "blendshapes": dict }.
+    """
+    return phonemes_to_track(phoneme_flat).to_keyframes()
+
+
+class IncrementalKeyframes:
+    """
+    Builds keyframes from phonemes that arrive in batches while TTS streams.
+
+    The last phoneme of every batch is held back until the next batch (or
+    finish()) so its closing frame is decided with the same look-ahead as
+    phonemes_to_keyframes(); concatenating all returned lists yields the
+    same keyframes as converting the full phoneme list at once.
+    """
 
-    return sorted(keyframes, key=lambda k: k["time_ms"])
+    def __init__(self):
+        self._pending = None
+
+    def feed(self, phonemes: list) -> list:
+        """Add a batch of phonemes; return the keyframes that are now final."""
+        items = ([self._pending] if self._pending else []) + list(phonemes)
+        if not items:
+            return []
+        self._pending = items[-1]
+
+        keyframes = []
+        for ph, nxt in zip(items, items[1:]):
+            keyframes += _phoneme_keyframes(ph, nxt["begin_ms"])
+        return sorted(keyframes, key=lambda k: k["time_ms"])
+
+    def finish(self) -> list:
+        """Flush the held-back phoneme (input is complete)."""
+        pending, self._pending = self._pending, None
+        return _phoneme_keyframes(pending, None) if pending else []
@@ -5,7 +5,7 @@ Analyzes text emotion using Qwen API and returns structured results.
 
 HTTP server (default port 7778):
   POST /speak   { "text": "..." }  → { ok, emotion, intensity, blendshapes }
-  GET  /status  → { "ok": true }
+  GET  /status  → { "ok": true, "analysis_cache": {hits, misses, …} }
 """
 
 import json
@@ -14,6 +14,7 @@ import traceback
 from http.server import BaseHTTPRequestHandler
 from socketserver import ThreadingTCPServer
 
+from analysis_cache import AnalysisCache
 from text_analyzer import TextAnalyzer
 
 
@@ -52,7 +53,7 @@ class _Handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
             if self.path == "/status":
-                self._json(200, {"ok": True})
+                self._json(200, {"ok": True, "analysis_cache": _analyzer.cache.stats()})
             else:
                 self._json(404, {"error": "not found"})
         except Exception:
@@ -88,6 +89,7 @@ def main():
         model=qwen.get("model", "qwen-turbo"),
         base_url=qwen.get("base_url",
                            "https://dashscope.aliyuncs.com/compatible-mode/v1"),
+        cache=AnalysisCache(),
     )
 
     srv = config.get("server", {})
@@ -0,0 +1,346 @@
+"""
+PlaybackQueue: serializes utterances onto one SpeechPlayer.
+
+Without it every /api/speak-animate or replay call started its own
+playback: audio overlapped on the device and lip-sync datagrams from
+different utterances interleaved on port 11112. The queue plays one item
+at a time on a worker thread:
+
+  - Items are ordered by priority (higher first), then submission order.
+  - interrupt=True is barge-in: the current item is cut (its keyframes stop
+    and a reset frame is sent) and the new item plays next; clear=True also
+    drops everything still queued.
+  - While an item plays, the next one is prefetched — resampled to the
+    device rate — and started on the output engine chained after the current
+    voice, so it begins on the exact frame the current one ends. No reset
+    frame is sent between chained items, only when the queue runs dry or
+    an item is interrupted.
+  - Every state change is reported to on_change(state()) (the control panel
+    broadcasts it over its WebSocket).
+
+Streamed items (a PcmStream still being filled) take part like clips but
+cannot be prefetched; they start as soon as their audio arrives. Their
+ring buffer only drains once they play, so callers should stream only
+when the queue is idle or the item interrupts (see busy).
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+from speech_player import SpeechPlayer, stream_report
+
+PRIORITY_NORMAL = 0
+HISTORY_SIZE    = 20
+
+_ids = itertools.count(1)
+
+
+class PlaybackItem:
+    """One queued utterance; result resolves to its playback stats when it ends."""
+
+    def __init__(self, kind: str, payload: tuple, label: str = "", priority: int = PRIORITY_NORMAL,
+                 meta: dict = None):
+        self.id         = f"p{next(_ids)}"
+        self.kind       = kind          # "clip" or "stream"
+        self.label      = label
+        self.priority   = priority
+        self.meta       = meta or {}
+        self.state      = "queued"      # queued → prefetched → chained → playing → done/interrupted/dropped
+        self.created_t  = time.perf_counter()
+        self.started_t  = None
+        self.result     = Future()
+        self._payload   = payload
+        self._prepared  = None
+        self._playback  = None
+
+    def snapshot(self) -> dict:
+        now = time.perf_counter()
+        return {
+            "id":         self.id,
+            "kind":       self.kind,
+            "label":      self.label,
+            "priority":   self.priority,
+            "state":      self.state,
+            "waited_ms":  round(((self.started_t or now) - self.created_t) * 1000.0),
+            **self.meta,
+        }
+
+
+class PlaybackQueue:
+    """Priority queue of utterances with barge-in and gapless prefetch."""
+
+    def __init__(self, player: SpeechPlayer, on_change=None):
+        self.player     = player
+        self.on_change  = on_change
+        self._cond      = threading.Condition()
+        self._queue     = []       # waiting items, kept sorted
+        self._current   = None     # playing item
+        self._next      = None     # item chained after _current on the engine
+        self._history   = []       # recently finished items (snapshots)
+        self._closed    = False
+        self._thread    = threading.Thread(target=self._run, name="playback-queue", daemon=True)
+        self._thread.start()
+
+    # -- submission --------------------------------------------------------
+
+    def submit_clip(self, audio, keyframes, emotion_bs, label: str = "",
+                    priority: int = PRIORITY_NORMAL, interrupt: bool = False, clear: bool = False,
+                    meta: dict = None) -> PlaybackItem:
+        """Queue an AudioClip with its keyframes (see SpeechPlayer.prepare / start)."""
+        item = PlaybackItem("clip", (audio, keyframes, emotion_bs), label, priority, meta)
+        return self._submit(item, interrupt, clear)
+
+    def submit_stream(self, stream, keyframe_queue, emotion_bs, label: str = "",
+                      priority: int = PRIORITY_NORMAL, interrupt: bool = False, clear: bool = False,
+                      meta: dict = None) -> PlaybackItem:
+        """Queue a PcmStream with its keyframe queue (see SpeechPlayer.start_stream)."""
+        item = PlaybackItem("stream", (stream, keyframe_queue, emotion_bs), label, priority, meta)
+        return self._submit(item, interrupt, clear)
+
+    def _submit(self, item: PlaybackItem, interrupt: bool, clear: bool) -> PlaybackItem:
+        dropped = []
+        with self._cond:
+            if interrupt:
+                dropped = self._interrupt_locked(clear)
+                # Barge-in plays next, ahead of the unchained item and any priority
+                self._queue.insert(0, item)
+            else:
+                if self._next is not None and item.priority > self._next.priority:
+                    self._unchain_locked()
+                self._insert_locked(item)
+            self._cond.notify_all()
+        self._drop(dropped)
+        self._changed()
+        return item
+
+    def interrupt(self, clear: bool = False):
+        """Barge-in without a new item: cut the current one (and with clear, the queue)."""
+        with self._cond:
+            dropped = self._interrupt_locked(clear)
+            self._cond.notify_all()
+        self._drop(dropped)
+        self._changed()
+
+    def cancel(self, item_id: str) -> bool:
+        """Drop a queued item, or interrupt it if it is playing."""
+        with self._cond:
+            if self._current is not None and self._current.id == item_id:
+                self._interrupt_locked(False)
+                self._cond.notify_all()
+                found = []
+            else:
+                if self._next is not None and self._next.id == item_id:
+                    self._unchain_locked()
+                found = [i for i in self._queue if i.id == item_id]
+                self._queue = [i for i in self._queue if i.id != item_id]
+                if not found:
+                    return False
+        self._drop(found)
+        self._changed()
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            dropped = self._interrupt_locked(True)
+            self._cond.notify_all()
+        self._drop(dropped)
+        self._thread.join(timeout=2.0)
+
+    # -- state -------------------------------------------------------------
+
+    @property
+    def busy(self) -> bool:
+        """True while something is playing or waiting to play."""
+        with self._cond:
+            return self._current is not None or bool(self._queue)
+
+    def state(self) -> dict:
+        with self._cond:
+            playing = [self._current] if self._current is not None else []
+            waiting = ([self._next] if self._next is not None else []) + self._queue
+            return {
+                "current": playing[0].snapshot() if playing else None,
+                "queue":   [i.snapshot() for i in waiting],
+                "history": list(self._history),
+            }
+
+    def _changed(self):
+        if self.on_change is not None:
+            try:
+                self.on_change(self.state())
+            except Exception as e:
+                print(f"[PlaybackQueue] on_change error: {e}")
+
+    # -- queue operations (caller holds _cond) -----------------------------
+
+    def _insert_locked(self, item: PlaybackItem):
+        pos = len(self._queue)
+        while pos > 0 and self._queue[pos - 1].priority < item.priority:
+            pos -= 1
+        self._queue.insert(pos, item)
+
+    def _unchain_locked(self):
+        """Take back a chained item that has not started and requeue it at the front of its priority."""
+        item = self._next
+        if item is None or item._playback.voice.started.is_set():
+            return
+        self._next = None
+        item._playback.stop()
+        item._playback.finish(reset=False)
+        item._playback = None
+        item.state     = "prefetched" if item._prepared is not None else "queued"
+        pos = 0
+        while pos < len(self._queue) and self._queue[pos].priority > item.priority:
+            pos += 1
+        self._queue.insert(pos, item)
+
+    def _interrupt_locked(self, clear: bool) -> list:
+        self._unchain_locked()
+        # A chained item still in _next has already taken over from _current;
+        # a _current still being started is stopped by _run once it has its Playback
+        for item in (self._current, self._next):
+            if item is not None:
+                item.state = "interrupted"
+                if item._playback is not None:
+                    item._playback.stop()
+        dropped, self._queue = (self._queue, []) if clear else ([], self._queue)
+        return dropped
+
+    def _drop(self, items: list):
+        for item in items:
+            item.state = "dropped"
+            if item.kind == "stream":
+                item._payload[0].abort()
+            self._remember(item)
+            if not item.result.done():
+                item.result.set_result(None)
+
+    def _remember(self, item: PlaybackItem):
+        with self._cond:
+            self._history.insert(0, item.snapshot())
+            del self._history[HISTORY_SIZE:]
+
+    # -- worker ------------------------------------------------------------
+
+    def _prepare(self, item: PlaybackItem):
+        if item.kind == "clip" and item._prepared is None:
+            item._prepared = self.player.prepare(item._payload[0])
+            if item.state == "queued":
+                item.state = "prefetched"
+
+    def _start(self, item: PlaybackItem, after=None) -> bool:
+        """
+        Start an item on the engine (chained after a voice); False if it had
+        no playable audio or could not be started (e.g. the device failed to
+        open), so the worker drops it and carries on with the queue.
+        """
+        try:
+            if item.kind == "clip":
+                self._prepare(item)
+                if item._prepared is None:
+                    return False
+                _, keyframes, emotion_bs = item._payload
+                item._playback = self.player.start(item._prepared, keyframes, emotion_bs, after)
+            else:
+                stream, keyframe_queue, emotion_bs = item._payload
+                item._playback = self.player.start_stream(stream, keyframe_queue, emotion_bs, after)
+        except Exception as e:
+            print(f"[PlaybackQueue] could not start {item.id} ({item.label}): {e}")
+            item._playback = None
+            if item.kind == "stream":
+                item._payload[0].abort()
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                item = self._current = self._queue.pop(0)
+            if not self._start(item):
+                with self._cond:
+                    self._current = None
+                self._finish_item(item, None)
+                self._changed()
+                continue
+            with self._cond:
+                item.started_t = time.perf_counter()
+                if item.state == "interrupted":
+                    item._playback.stop()
+                else:
+                    item.state = "playing"
+            self._changed()
+            self._play_chain()
+
+    def _play_chain(self):
+        """Play _current and every item chained after it, until the queue runs dry."""
+        while True:
+            current = self._current
+            voice   = current._playback.voice
+            engine  = self.player.engine
+
+            # Prefetch the next item and chain it after the current voice
+            while not voice.finished.wait(timeout=0.02):
+                if not engine.running:
+                    # The stream died under the voice: no callback will finish it.
+                    # close() releases every voice; the next item reopens the stream.
+                    print("[PlaybackQueue] output stream stopped during playback")
+                    engine.close()
+                    continue
+                with self._cond:
+                    candidate = self._queue[0] if self._next is None and self._queue else None
+                if candidate is None:
+                    continue
+                try:
+                    self._prepare(candidate)
+                except Exception as e:
+                    # _start retries the prepare, and drops the item if it fails again
+                    print(f"[PlaybackQueue] prefetch of {candidate.id} failed: {e}")
+                with self._cond:
+                    if (self._next is not None or not self._queue or self._queue[0] is not candidate
+                            or current.state != "playing" or voice.finished.is_set()):
+                        continue
+                    self._queue.pop(0)
+                    if not self._start(candidate, after=voice):
+                        self._finish_item(candidate, None)
+                        continue
+                    self._next, candidate.state = candidate, "chained"
+                self._changed()
+
+            with self._cond:
+                nxt, self._next = self._next, None
+                interrupted = current.state == "interrupted"
+                if nxt is not None:
+                    self._current, nxt.started_t = nxt, time.perf_counter()
+                    if nxt.state == "chained":
+                        nxt.state = "playing"
+                else:
+                    self._current = None
+            if nxt is None:
+                # Nothing follows: wait until the last sample is audible, then reset
+                current._playback.wait(timeout=5.0)
+                self._finish_item(current, current._playback.finish(reset=True))
+                self._changed()
+                return
+            # The next voice is already running; wrap the previous one up alongside it
+            threading.Thread(target=self._finish_async, args=(current, interrupted), daemon=True).start()
+            self._changed()
+
+    def _finish_async(self, item: PlaybackItem, interrupted: bool):
+        item._playback.wait(timeout=5.0)
+        self._finish_item(item, item._playback.finish(reset=interrupted))
+
+    def _finish_item(self, item: PlaybackItem, stats):
+        if item.state in ("playing", "chained", "queued", "prefetched"):
+            item.state = "done" if stats is not None else "dropped"
+        if item.kind == "stream" and stats is not None:
+            stats = stream_report(item._payload[0], stats)
+        self._remember(item)
+        if not item.result.done():
+            item.result.set_result(stats)
@@ -15,12 +15,27 @@ Rhubarb mouth shapes → Live2D mapping:
   F  F / V (teeth-lip)     jawOpen=0.15
   G  L / tongue             jawOpen=0.30
   H  relaxed open           jawOpen=0.35
+
+Calls go through RhubarbService, which caps concurrent processes at the CPU
+count (further calls queue), writes the input WAV to tmpfs (XDG_RUNTIME_DIR
+or /dev/shm, else the default temp dir) and reads the cues from stdout.
+Rhubarb picks the decoder from the file extension, so the input cannot be
+piped through stdin or an anonymous memfd.
 """
 
+import asyncio
 import json
 import os
 import subprocess
 import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from audio_clip import as_clip
+from keyframe_cache import content_hash, keyframe_cache, table_version
+from keyframe_track import KeyframeTrack, ShapeTable
 
 _RHUBARB = os.path.join(os.path.dirname(__file__), "rhubarb")
 
@@ -38,70 +53,402 @@ _SHAPE_BS: dict[str, dict[str, float]] = {
 }
 _SILENT = _SHAPE_BS["X"]
 
+# Shared by every Rhubarb / native-analyzer track (X is index 0)
+SHAPE_TABLE = ShapeTable(_SHAPE_BS)
+_SHAPE_INDEX = {label: i for i, label in enumerate(SHAPE_TABLE.labels)}
+
+# Cached keyframes depend on the shape mapping and the recognizer
+_CACHE_VERSION = table_version(_SHAPE_BS, "phonetic")
+
+
+def shape_track(cues) -> KeyframeTrack:
+    """(start_ms, shape) mouth cues → KeyframeTrack over SHAPE_TABLE (unknown shapes → X)."""
+    cues = list(cues)
+    return KeyframeTrack([start_ms for start_ms, _ in cues],
+                         [_SHAPE_INDEX.get(shape, 0) for _, shape in cues], SHAPE_TABLE)
+
+
+def shape_keyframes(cues) -> list[dict]:
+    """(start_ms, shape) mouth cues → {"time_ms", "blendshapes"} keyframes."""
+    return shape_track(cues).to_keyframes()
+
+
+def _command(binary: str, wav_path: str) -> list:
+    # No -o: the JSON goes to stdout, so there is no output file to read back
+    return [
+        binary,
+        "--recognizer", "phonetic",   # language-agnostic
+        "--exportFormat", "json",
+        "--quiet",
+        wav_path,
+    ]
+
+
+def _parse_cues(output: bytes) -> tuple[list[tuple[int, str]], int] | tuple[None, int]:
+    """Rhubarb JSON output → ([(start_ms, shape)], duration_ms)."""
+    try:
+        data = json.loads(output)
+    except Exception as e:
+        print(f"[Rhubarb] failed to parse output: {e}")
+        return None, 0
+
+    cues        = data.get("mouthCues", [])
+    duration_ms = int(data.get("metadata", {}).get("duration", 0) * 1000)
+    return [(int(round(cue["start"] * 1000)), cue.get("value", "X")) for cue in cues], duration_ms
+
+
+def _scratch_dir() -> str | None:
+    """A memory-backed directory for input WAVs (tmpfs), or None for the default temp dir."""
+    for path in (os.environ.get("XDG_RUNTIME_DIR"), "/dev/shm"):
+        if path and os.path.isdir(path) and os.access(path, os.W_OK):
+            return path
+    return None
+
+
+class _Slots:
+    """
+    FIFO counting semaphore shared by threads and event loops.
 
-def extract_keyframes(wav_bytes: bytes, timeout: int = 30) -> tuple[list[dict], int] | tuple[None, int]:
+    Each waiter is a concurrent.futures.Future, so a thread blocks on
+    result() and a coroutine awaits asyncio.wrap_future(); release() hands
+    the slot straight to the oldest waiter that is still waiting.
     """
-    Analyse WAV audio with Rhubarb and return (keyframes, duration_ms).
 
-    keyframes: list of {"time_ms": int, "blendshapes": dict}
-                one entry per mouth-cue start time.
-                Rhubarb covers the full audio with consecutive cues
-                (X for silence, A-H for speech), so the last cue naturally
-                closes the mouth.
+    def __init__(self, count: int):
+        self._free    = count
+        self._lock    = threading.Lock()
+        self._waiters = deque()
 
-    Returns (None, 0) on any failure so the caller can fall back gracefully.
+    def acquire_future(self) -> Future:
+        fut = Future()
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                fut.set_running_or_notify_cancel()
+                fut.set_result(None)
+            else:
+                self._waiters.append(fut)
+        return fut
+
+    def abandon(self, fut: Future):
+        """Give up waiting; a slot granted in the meantime is released."""
+        if not fut.cancel():
+            self.release()
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                fut = self._waiters.popleft()
+                if fut.set_running_or_notify_cancel():
+                    fut.set_result(None)
+                    return
+            self._free += 1
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+
+class RhubarbService:
     """
-    if not os.path.isfile(_RHUBARB):
-        print(f"[Rhubarb] binary not found at {_RHUBARB}")
-        return None, 0
+    Bounded Rhubarb execution: at most max_workers processes run at once
+    (default: CPU count) and further calls queue in arrival order. Input
+    WAVs are written to tmpfs where available and the JSON result is read
+    from stdout, so a burst of requests costs no disk I/O.
+
+    Records queue wait, spawn, analysis and parse time per call.
+    """
+
+    def __init__(self, binary: str = _RHUBARB, max_workers: int | None = None):
+        self.binary      = binary
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.scratch_dir = _scratch_dir()
+        self._slots      = _Slots(self.max_workers)
+
+        self._stats_lock = threading.Lock()
+        self.calls       = 0
+        self.failures    = 0
+        self.timeouts    = 0
+        self.inflight    = 0
+        self.peak_inflight = 0
+        self._totals     = {"queue_ms": 0.0, "spawn_ms": 0.0, "analysis_ms": 0.0, "parse_ms": 0.0}
+        self.last_timings: dict = {}
+
+    @property
+    def available(self) -> bool:
+        return os.path.isfile(self.binary)
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        wav_path  = os.path.join(tmpdir, "audio.wav")
-        json_path = os.path.join(tmpdir, "cues.json")
+    def _started(self):
+        with self._stats_lock:
+            self.calls    += 1
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
 
-        with open(wav_path, "wb") as f:
-            f.write(wav_bytes)
+    def _finished(self, timings: dict, outcome: str = "ok"):
+        with self._stats_lock:
+            self.inflight -= 1
+            if outcome == "timeout":
+                self.timeouts += 1
+            elif outcome != "ok":
+                self.failures += 1
+            for key, value in timings.items():
+                self._totals[key] += value
+            self.last_timings = {k: round(v, 1) for k, v in timings.items()}
 
+    def _write_input(self, wav) -> str:
+        """wav: WAV bytes, or a tuple of buffers forming one (AudioClip.wav_parts())."""
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="rhubarb-", dir=self.scratch_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(wav if isinstance(wav, tuple) else (wav,))
+        return path
+
+    @staticmethod
+    def _remove(path: str):
         try:
-            proc = subprocess.run(
-                [
-                    _RHUBARB,
-                    "--recognizer", "phonetic",   # language-agnostic
-                    "--exportFormat", "json",
-                    "--quiet",
-                    "-o", json_path,
-                    wav_path,
-                ],
-                capture_output=True,
-                timeout=timeout,
-            )
-        except subprocess.TimeoutExpired:
-            print(f"[Rhubarb] timed out after {timeout}s")
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _parse(self, output: bytes, timings: dict):
+        t0 = time.perf_counter()
+        cues, duration_ms = _parse_cues(output)
+        timings["parse_ms"] = (time.perf_counter() - t0) * 1000.0
+        return cues, duration_ms
+
+    # ------------------------------------------------------------------
+    # Blocking
+    # ------------------------------------------------------------------
+
+    def extract_cues(self, wav, timeout: float = 30) -> tuple[list, int] | tuple[None, int]:
+        """
+        ([(start_ms, shape)], duration_ms), or (None, 0) on any failure.
+        wav is WAV bytes or a tuple of buffers forming one.
+        """
+        if not self.available:
+            print(f"[Rhubarb] binary not found at {self.binary}")
             return None, 0
-        except FileNotFoundError as e:
-            print(f"[Rhubarb] cannot execute binary: {e}")
+
+        t0  = time.perf_counter()
+        fut = self._slots.acquire_future()
+        try:
+            fut.result(timeout)
+        except FutureTimeoutError:
+            self._slots.abandon(fut)
+            print(f"[Rhubarb] no worker free after {timeout}s ({self._slots.waiting} queued)")
             return None, 0
 
-        if proc.returncode != 0:
-            err = proc.stderr.decode(errors="replace").strip()
-            print(f"[Rhubarb] exit {proc.returncode}: {err}")
+        timings = {"queue_ms": (time.perf_counter() - t0) * 1000.0}
+        self._started()
+        outcome, path = "error", None
+        try:
+            path = self._write_input(wav)
+            t1 = time.perf_counter()
+            try:
+                proc = subprocess.Popen(_command(self.binary, path),
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except OSError as e:
+                print(f"[Rhubarb] cannot execute binary: {e}")
+                return None, 0
+            t2 = time.perf_counter()
+            timings["spawn_ms"] = (t2 - t1) * 1000.0
+            try:
+                stdout, stderr = proc.communicate(timeout=max(0.1, timeout - (t2 - t0)))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                outcome = "timeout"
+                print(f"[Rhubarb] timed out after {timeout}s")
+                return None, 0
+            timings["analysis_ms"] = (time.perf_counter() - t2) * 1000.0
+
+            if proc.returncode != 0:
+                print(f"[Rhubarb] exit {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+                return None, 0
+            cues, duration_ms = self._parse(stdout, timings)
+            if cues is not None:
+                outcome = "ok"
+            return cues, duration_ms
+        finally:
+            if path:
+                self._remove(path)
+            self._finished(timings, outcome)
+            self._slots.release()
+
+    # ------------------------------------------------------------------
+    # asyncio
+    # ------------------------------------------------------------------
+
+    async def extract_cues_async(self, wav, timeout: float = 30) -> tuple[list, int] | tuple[None, int]:
+        """extract_cues() as an asyncio subprocess; cancelling the caller kills the process."""
+        if not self.available:
+            print(f"[Rhubarb] binary not found at {self.binary}")
             return None, 0
 
+        loop = asyncio.get_running_loop()
+        t0   = loop.time()
+        fut  = self._slots.acquire_future()
         try:
-            with open(json_path, encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"[Rhubarb] failed to parse output: {e}")
+            await asyncio.wait_for(asyncio.wrap_future(fut), timeout)
+        except asyncio.TimeoutError:
+            self._slots.abandon(fut)
+            print(f"[Rhubarb] no worker free after {timeout}s ({self._slots.waiting} queued)")
             return None, 0
+        except asyncio.CancelledError:
+            self._slots.abandon(fut)
+            raise
 
-    cues     = data.get("mouthCues", [])
-    duration_ms = int(data.get("metadata", {}).get("duration", 0) * 1000)
+        timings = {"queue_ms": (loop.time() - t0) * 1000.0}
+        self._started()
+        outcome, path = "error", None
+        try:
+            path = self._write_input(wav)
+            t1 = loop.time()
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *_command(self.binary, path),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except OSError as e:
+                print(f"[Rhubarb] cannot execute binary: {e}")
+                return None, 0
+            t2 = loop.time()
+            timings["spawn_ms"] = (t2 - t1) * 1000.0
+
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), max(0.1, timeout - (t2 - t0)))
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                outcome = "timeout"
+                print(f"[Rhubarb] timed out after {timeout}s")
+                return None, 0
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                outcome = "cancelled"
+                raise
+            timings["analysis_ms"] = (loop.time() - t2) * 1000.0
+
+            if proc.returncode != 0:
+                print(f"[Rhubarb] exit {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+                return None, 0
+            cues, duration_ms = self._parse(stdout, timings)
+            if cues is not None:
+                outcome = "ok"
+            return cues, duration_ms
+        finally:
+            if path:
+                self._remove(path)
+            self._finished(timings, outcome)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            done = self.calls - self.inflight
+            return {
+                "available":     self.available,
+                "input_dir":     self.scratch_dir or tempfile.gettempdir(),
+                "max_workers":   self.max_workers,
+                "inflight":      self.inflight,
+                "queued":        self._slots.waiting,
+                "peak_inflight": self.peak_inflight,
+                "calls":         self.calls,
+                "failures":      self.failures,
+                "timeouts":      self.timeouts,
+                **{f"avg_{k}": round(v / done, 1) if done else 0.0 for k, v in self._totals.items()},
+                "last":          self.last_timings,
+            }
+
+
+_service: RhubarbService | None = None
+_service_lock = threading.Lock()
+
+
+def rhubarb_service() -> RhubarbService:
+    """Process-wide Rhubarb service for the bundled binary."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RhubarbService()
+        return _service
+
+
+def _clip_input(audio):
+    """(WAV parts, digest) of an AudioClip or WAV bytes, or (None, None) when unreadable."""
+    try:
+        clip = as_clip(audio)
+    except ValueError:
+        clip = None
+    if clip is None:
+        # Rhubarb decodes more than AudioClip does; hand it the bytes as they are
+        return ((audio,), content_hash(audio)) if isinstance(audio, (bytes, bytearray)) and audio else (None, None)
+    parts = clip.wav_parts()
+    return parts, content_hash(*parts)
+
+
+def extract_track(audio, timeout: int = 30) -> tuple[KeyframeTrack, int] | tuple[None, int]:
+    """
+    Analyse audio (an AudioClip or WAV bytes) with Rhubarb and return
+    (track, duration_ms).
+
+    The track has one keyframe per mouth-cue start time over SHAPE_TABLE.
+    Rhubarb covers the full audio with consecutive cues (X for silence,
+    A-H for speech), so the last cue naturally closes the mouth.
+
+    Identical audio is answered from keyframe_cache (kind "rhubarb").
+    Returns (None, 0) on any failure so the caller can fall back gracefully.
+    """
+    wav, digest = _clip_input(audio)
+    if wav is None:
+        return None, 0
+    cache = keyframe_cache()
+    hit = cache.get("rhubarb", _CACHE_VERSION, digest)
+    if hit is not None:
+        return hit
+
+    cues, duration_ms = rhubarb_service().extract_cues(wav, timeout)
+    if cues is None:
+        return None, 0
+    track = shape_track(cues)
+    cache.put("rhubarb", _CACHE_VERSION, digest, track, duration_ms)
+    return track, duration_ms
+
+
+async def extract_track_async(audio, timeout: int = 30) -> tuple[KeyframeTrack, int] | tuple[None, int]:
+    """
+    extract_track() as an asyncio subprocess: no thread is held while
+    Rhubarb runs or waits for a worker, and cancelling the caller kills the
+    process. Only the cache's disk work leaves the loop.
+    """
+    wav, digest = _clip_input(audio)
+    if wav is None:
+        return None, 0
+    cache = keyframe_cache()
+    hit = await cache.get_async("rhubarb", _CACHE_VERSION, digest)
+    if hit is not None:
+        return hit
+
+    cues, duration_ms = await rhubarb_service().extract_cues_async(wav, timeout)
+    if cues is None:
+        return None, 0
+    track = shape_track(cues)
+    asyncio.get_running_loop().run_in_executor(
+        None, cache.put, "rhubarb", _CACHE_VERSION, digest, track, duration_ms)
+    return track, duration_ms
+
+
+def extract_keyframes(audio, timeout: int = 30) -> tuple[list[dict], int] | tuple[None, int]:
+    """extract_track() in the {"time_ms", "blendshapes"} dict-list format."""
+    track, duration_ms = extract_track(audio, timeout)
+    return (track.to_keyframes(), duration_ms) if track is not None else (None, 0)
 
-    keyframes = []
-    for cue in cues:
-        shape    = cue.get("value", "X")
-        start_ms = int(round(cue["start"] * 1000))
-        bs       = dict(_SHAPE_BS.get(shape, _SILENT))
-        keyframes.append({"time_ms": start_ms, "blendshapes": bs})
 
-    return keyframes, duration_ms
+async def extract_keyframes_async(audio, timeout: int = 30) -> tuple[list[dict], int] | tuple[None, int]:
+    """extract_track_async() in the dict-list format."""
+    track, duration_ms = await extract_track_async(audio, timeout)
+    return (track.to_keyframes(), duration_ms) if track is not None else (None, 0)
@@ -0,0 +1,189 @@
+"""
+Chunked speech pipeline: sentence-by-sentence synthesis with lookahead.
+
+synthesize_chunked_async() drives an async TTS engine once per text chunk and
+presents the result as a single streaming synthesis (same on_audio /
+on_phonemes callbacks and result dict as the control panel's engines):
+
+  - chunk 0 streams straight through, so playback starts after the first
+    sentence instead of after the last;
+  - up to `lookahead` further chunks are synthesized concurrently while
+    earlier chunks play, buffered until their turn;
+  - PCM is emitted strictly in order into the caller's single PcmStream, so
+    the handoff between sentences is gapless, and phoneme times are shifted
+    by the audio duration of the preceding chunks.
+"""
+
+import asyncio
+import time
+
+from audio_clip import AudioClip
+
+
+class _ChunkJob:
+    """One chunk's synthesis, run as a task and buffering its callbacks until it is consumed."""
+
+    def __init__(self, index: int, text: str):
+        self.index   = index
+        self.text    = text
+        self.result  = None
+        self.t_start = None
+        self.task    = None
+        self._items  = asyncio.Queue()
+
+    def start(self, synthesize):
+        self.task = asyncio.ensure_future(self._run(synthesize))
+
+    async def _run(self, synthesize):
+        self.t_start = time.time()
+
+        async def on_audio(pcm):
+            self._items.put_nowait(("audio", pcm))
+
+        async def on_phonemes(phonemes):
+            self._items.put_nowait(("phonemes", phonemes))
+
+        try:
+            self.result = await synthesize(self.text, on_audio, on_phonemes)
+        except Exception as e:
+            self.result = {"ok": False, "error": str(e)}
+        finally:
+            self._items.put_nowait(None)
+
+    async def items(self):
+        """Yield ("audio", bytes) / ("phonemes", list) in arrival order until done."""
+        while True:
+            item = await self._items.get()
+            if item is None:
+                return
+            yield item
+
+
+def _shift(phonemes: list, offset_ms: float) -> list:
+    offset = int(round(offset_ms))
+    return [dict(ph, begin_ms=ph["begin_ms"] + offset, end_ms=ph["end_ms"] + offset)
+            for ph in phonemes]
+
+
+class _Assembly:
+    """Concatenates chunk results in order into one engine-style result."""
+
+    def __init__(self, chunks: list, sample_rate: int, lookahead: int, streamed: bool):
+        self.t0            = time.time()
+        self.sample_rate   = sample_rate
+        self.lookahead     = lookahead
+        self.streamed      = streamed
+        self.bytes_per_ms  = sample_rate * 2 / 1000.0
+        self.pcm_parts     = []
+        self.phoneme_flat  = []
+        self.chunk_info    = []
+        self.offset_ms     = 0.0
+        self.first_chunk_t = None
+        self.request_info  = {"chunks": len(chunks), "lookahead": lookahead,
+                              "text_length": sum(len(c) for c in chunks)}
+
+    def audio(self, pcm: bytes):
+        if self.first_chunk_t is None:
+            self.first_chunk_t = time.time()
+        self.pcm_parts.append(pcm)
+
+    def phonemes(self, phonemes: list) -> list:
+        """Shift a chunk's phonemes onto the utterance timeline (returned for on_phonemes)."""
+        shifted = _shift(phonemes, self.offset_ms)
+        self.phoneme_flat.extend(shifted)
+        return shifted
+
+    def error(self, job: _ChunkJob) -> dict:
+        error = (job.result or {}).get("error", "TTS 合成失败")
+        return {"ok": False, "error": f"第 {job.index + 1} 句合成失败: {error}",
+                "request": self.request_info, "elapsed_s": round(time.time() - self.t0, 3)}
+
+    def chunk_done(self, job: _ChunkJob, chunk_bytes: int):
+        audio_ms = chunk_bytes / self.bytes_per_ms
+        self.chunk_info.append({"text": job.text, "audio_ms": round(audio_ms),
+                                "elapsed_s": round(time.time() - job.t_start, 3)})
+        self.offset_ms += audio_ms
+
+    def result(self) -> dict:
+        t0 = self.t0
+        audio = AudioClip.from_pcm(b"".join(self.pcm_parts), self.sample_rate)
+        print(f"[Pipeline] {len(self.chunk_info)} chunks, lookahead {self.lookahead}, "
+              f"{self.offset_ms / 1000:.1f}s audio in {time.time() - t0:.2f}s")
+        return {
+            "ok":            True,
+            "request":       self.request_info,
+            "audio":         audio,
+            "audio_size":    audio.wav_size,
+            "phoneme_flat":  self.phoneme_flat,
+            "phoneme_count": len(self.phoneme_flat),
+            "elapsed_s":     round(time.time() - t0, 3),
+            "first_chunk_s": round(self.first_chunk_t - t0, 3) if self.first_chunk_t else None,
+            "streamed":      self.streamed,
+            "chunks":        self.chunk_info,
+        }
+
+
+async def synthesize_chunked_async(chunks: list, synthesize, sample_rate: int,
+                                   on_audio=None, on_phonemes=None, lookahead: int = 1) -> dict:
+    """
+    Synthesize text chunks in order with `lookahead` chunks in flight ahead.
+
+    Parameters:
+      chunks      — texts, e.g. from text_chunker.split_sentences()
+      synthesize  — coroutine function(text, on_audio, on_phonemes) -> engine
+                    result dict; must deliver 16-bit mono PCM at sample_rate
+      on_audio    — coroutine function(pcm_bytes), receives all chunks' audio in order
+      on_phonemes — coroutine function(phoneme_list), times relative to the whole utterance
+      lookahead   — chunks synthesized ahead of the one being consumed
+
+    Lookahead chunks run as tasks on the caller's loop; they are cancelled
+    when the caller is cancelled or a chunk fails.
+
+    Returns a dict compatible with the engines' results, plus:
+      chunks      list  [{text, audio_ms, elapsed_s}, ...]
+    """
+    lookahead = max(0, int(lookahead))
+    jobs = [_ChunkJob(i, text) for i, text in enumerate(chunks)]
+    out  = _Assembly(chunks, sample_rate, lookahead, on_audio is not None)
+    if not jobs:
+        return {"ok": False, "error": "没有可合成的文本", "request": out.request_info}
+
+    async def emit_phonemes(phonemes):
+        shifted = out.phonemes(phonemes)
+        if on_phonemes is not None and shifted:
+            await on_phonemes(shifted)
+
+    try:
+        for job in jobs[:lookahead + 1]:
+            job.start(synthesize)
+
+        for job in jobs:
+            chunk_bytes = 0
+            streamed_phonemes = False
+            async for kind, value in job.items():
+                if kind == "audio":
+                    out.audio(value)
+                    chunk_bytes += len(value)
+                    if on_audio is not None:
+                        await on_audio(value)
+                elif value:
+                    streamed_phonemes = True
+                    await emit_phonemes(value)
+
+            result = job.result or {}
+            if not result.get("ok"):
+                return out.error(job)
+            if not streamed_phonemes:
+                # Engine had no live timestamps (e.g. estimated CosyVoice timings)
+                await emit_phonemes(result.get("phoneme_flat", []))
+            out.chunk_done(job, chunk_bytes)
+
+            nxt = job.index + lookahead + 1
+            if nxt < len(jobs):
+                jobs[nxt].start(synthesize)
+    finally:
+        for job in jobs:
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    return out.result()
@@ -3,137 +3,774 @@ SpeechPlayer: plays TTS audio locally via sounddevice while sending timed
 UDP blendshape frames to Unity on port 11112.
 
 Alignment strategy:
-  - Prepend AUDIO_PAD_MS ms of silence to the WAV so the device buffer
-    is warm before the first phoneme arrives.
-  - keyframe send time = T0 + AUDIO_PAD_MS/1000 + keyframe.time_ms/1000
-  - T0 is recorded immediately after sounddevice.play() is called.
-  - time.perf_counter() gives sub-millisecond precision; localhost UDP
-    adds < 1 ms latency, so total alignment error is typically < 5 ms.
+  - Audio plays as a Voice on the process-wide AudioOutputEngine
+    (audio_output.py): one output stream kept open and warm, so no silence
+    pad is needed. Every callback feeds the engine's AudioClock with the
+    time its first frame reaches the DAC (time_info.outputBufferDacTime,
+    or callback time + reported output latency).
+  - keyframe send time = clock time of the voice's first frame
+    + keyframe.time_ms, so alignment follows the device rather than the
+    moment playback was requested.
+  - Keyframe senders sleep until SCHEDULE_SPIN_MS before the send time and
+    busy-wait the rest, avoiding OS sleep overshoot; the error of every
+    send is recorded (ScheduleStats) and printed after each utterance.
+    Datagrams are serialized before the voice starts (encode_keyframes), so
+    only seq / monoTime / scheduledTime are formatted in the timing loop.
+
+Track protocol (protocol="track", playback.lipsync_protocol):
+  - Instead of one datagram per keyframe in real time, the whole track is
+    sent as soon as the voice starts — before its first frame is audible —
+    as a few "lip_track" datagrams (encode_track) stamped with startTime,
+    the perf_counter time of time_ms 0. The renderer maps it onto its own
+    clock (arrival time - monoTime) and samples the track locally, so
+    sender jitter and GC pauses no longer move the mouth.
+  - While the track plays the sender only re-announces startTime
+    ("lip_clock") when the AudioClock estimate moves, and the final reset
+    carries the trackId so it cannot cut a chained successor's track.
+  - Streams send each keyframe batch as further parts of an open-ended
+    track; inserted stalls are announced as a later startTime.
+  tools/lip_track_receiver.py is the reference receiver.
+
+Streaming (start_stream):
+  - Raw PCM chunks from the TTS callback (ISI or CosyVoice) are written to a
+    PcmStream ring buffer and pulled by the engine's output callback while
+    synthesis continues; a jitter buffer is filled before playback starts.
+  - keyframe send time = clock time of the first real audio frame
+    + inserted stall + time_ms, on the same AudioClock.
 """
 
+import asyncio
 import base64
 import io
+import itertools
 import json
+import queue
 import socket
 import threading
 import time
+from concurrent.futures import Future
+
+import numpy as np
 
+from audio_clip import AudioClip, as_clip
+from audio_output import AudioOutputEngine, output_engine
+from keyframe_track import as_track
+from lip_curve import LipCurve
+
+# Only needed for WAV encodings AudioClip does not read (not 16-bit PCM / float)
 try:
-    import numpy as np
-    import sounddevice as sd
     import soundfile as sf
-    _HAS_AUDIO = True
+    _HAS_SF = True
 except ImportError:
-    _HAS_AUDIO = False
+    _HAS_SF = False
 
-UDP_HOST     = "127.0.0.1"
-UDP_PORT     = 11112
-AUDIO_PAD_MS = 200   # ms of silence prepended for device warm-up
+UDP_HOST = "127.0.0.1"
+UDP_PORT = 11112
 
+STREAM_RING_MS          = 10000   # PCM ring capacity between TTS and device
+STREAM_PREBUFFER_MS     = 120     # jitter buffer filled before playback starts
+STREAM_MAX_PREBUFFER_MS = 400     # prebuffer ceiling after repeated underruns
+STREAM_LATE_DROP_MS     = 100     # streamed keyframes later than this are skipped
 
-def _prepend_silence(audio_bytes: bytes, pad_ms: int) -> tuple:
-    """
-    Prepend pad_ms milliseconds of silence to a WAV byte buffer.
+SCHEDULE_SPIN_MS     = 2.0   # final stretch before a send is busy-waited, not slept
+SCHEDULE_MAX_SLEEP_S = 0.05  # sleeps are capped so targets follow clock updates
 
-    Returns (padded_ndarray, samplerate).
-    """
-    buf = io.BytesIO(audio_bytes)
-    with sf.SoundFile(buf) as f:
-        samplerate = f.samplerate
-        channels   = f.channels
-        data       = f.read(dtype="float32")
+LIPSYNC_PROTOCOLS  = ("stream", "track")
+TRACK_PACKET_BYTES = 1400    # lip_track parts fit one Ethernet frame (no IP fragments)
+TRACK_RESYNC_MS    = 1.0     # re-announce startTime when the clock estimate moves this much
+TRACK_RESYNC_S     = 0.1     # how often a track sender re-reads the clock
 
-    pad_samples = int(samplerate * pad_ms / 1000)
-    if channels > 1:
-        silence = np.zeros((pad_samples, channels), dtype="float32")
-    else:
-        silence = np.zeros((pad_samples,), dtype="float32")
+# Per-stream sequence number shared by every datagram sent to UDP_PORT
+_seq = itertools.count(1)
+_track_ids = itertools.count(1)
 
-    padded = np.concatenate([silence, data])
-    return padded, samplerate
+# Pre-serialized datagram heads: only these fields are formatted at send time
+_LIP_SYNC_HEAD  = b'{"type":"lip_sync","seq":%d,"monoTime":%.6f,"scheduledTime":%.6f,"blendshapes":'
+_LIP_TRACK_HEAD = b'{"type":"lip_track","seq":%d,"monoTime":%.6f,"startTime":%.6f,'
+_LIP_CLOCK_HEAD = b'{"type":"lip_clock","seq":%d,"monoTime":%.6f,"startTime":%.6f,'
 
 
-def _send_udp(sock: socket.socket, payload: dict):
-    """Send a JSON payload as a single UDP datagram to Unity."""
-    msg = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+def _sendto(sock: socket.socket, msg: bytes, addr: tuple):
     try:
-        sock.sendto(msg, (UDP_HOST, UDP_PORT))
+        sock.sendto(msg, addr)
     except Exception as e:
         print(f"[SpeechPlayer] UDP send error: {e}")
 
 
-class SpeechPlayer:
-    """Plays audio locally and sends timed UDP frames to Unity."""
+def _send_udp(sock: socket.socket, payload: dict, addr: tuple = (UDP_HOST, UDP_PORT)):
+    """
+    Send a JSON payload as a single UDP datagram to Unity.
 
-    def play(self, audio_b64: str, keyframes: list, emotion_bs: dict) -> None:
-        """
-        Play audio locally and send timed blendshape frames to Unity.
+    Every datagram is stamped with "seq" (per-stream sequence number) and
+    "monoTime" (time.perf_counter() at send) so that loss, reordering and
+    delivery jitter can be measured (see tools/udp_probe.py). Returns the
+    monoTime stamped on the datagram.
+    """
+    payload = dict(payload, seq=next(_seq), monoTime=time.perf_counter())
+    _sendto(sock, json.dumps(payload, ensure_ascii=False).encode("utf-8"), addr)
+    return payload["monoTime"]
+
+
+def _send_encoded(sock: socket.socket, head: bytes, tail: bytes, addr: tuple, *fields) -> float:
+    """Send a pre-serialized datagram, head % (seq, monoTime, *fields) + tail; returns monoTime."""
+    mono_t = time.perf_counter()
+    _sendto(sock, head % (next(_seq), mono_t, *fields) + tail, addr)
+    return mono_t
+
+
+class EncodedKeyframes(list):
+    """lip_sync keyframes serialized ahead of time: (time_ms, datagram tail) pairs."""
+
+
+def encode_keyframes(keyframes) -> EncodedKeyframes:
+    """
+    Serialize a KeyframeTrack, LipCurve or list of {time_ms, blendshapes}
+    for _send_keyframes, so no json.dumps runs inside the timing loop.
+    """
+    if isinstance(keyframes, EncodedKeyframes):
+        return keyframes
+    # KeyframeTrack / LipCurve .items() yield (time_ms, blendshapes) pairs
+    pairs = (keyframes.items() if hasattr(keyframes, "items")
+             else ((kf["time_ms"], kf["blendshapes"]) for kf in keyframes))
+    return EncodedKeyframes(
+        (time_ms, json.dumps(blendshapes, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"}")
+        for time_ms, blendshapes in pairs)
+
+
+def _track_columns(keyframes) -> tuple:
+    """(channels, times int32 ms, (n, channels) values) of a track, curve or keyframe list."""
+    if isinstance(keyframes, LipCurve):
+        return keyframes.channels, np.rint(keyframes.times_ms()).astype(np.int32), keyframes.values
+    track = as_track(keyframes)
+    return track.table.channels, track.times, track.values()
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def encode_track(keyframes, track_id: int, first_part: int = 0, open_ended: bool = False) -> tuple:
+    """
+    Serialize a whole keyframe track as "lip_track" datagram tails (sent
+    after _LIP_TRACK_HEAD). Returns ([(first time_ms, tail), ...], end_ms).
+
+    Each part is self-contained — trackId, part, parts (0 while a stream's
+    track is still growing), channels, times (base64 little-endian int32 ms)
+    and values (base64 uint8, value * 255, row-major) — and the rows are
+    split by time so no datagram exceeds TRACK_PACKET_BYTES.
+    """
+    channels, times, values = _track_columns(keyframes)
+    times = np.asarray(times, dtype="<i4")
+    quant = np.clip(np.rint(np.asarray(values, dtype=np.float32) * 255.0), 0, 255).astype(np.uint8)
+
+    def tail(part: int, parts: int, lo: int, hi: int) -> bytes:
+        body = {"trackId": track_id, "part": part, "parts": parts, "channels": list(channels),
+                "times": _b64(times[lo:hi]), "values": _b64(quant[lo:hi])}
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":"))[1:].encode("utf-8")
+
+    # Header with worst-case numbers, then 4/3 base64 bytes per int32 time and uint8 value
+    fixed = len(_LIP_TRACK_HEAD % (2 ** 31, 1e9, 1e9)) + len(tail(first_part + 9999, 9999, 0, 0)) + 8
+    rows  = max(1, (TRACK_PACKET_BYTES - fixed) * 3 // 4 // (4 + len(channels)))
+    starts = list(range(0, len(times), rows)) or [0]
+    parts  = 0 if open_ended else len(starts)
+    tails  = [(int(times[lo]) if lo < len(times) else 0, tail(first_part + i, parts, lo, lo + rows))
+              for i, lo in enumerate(starts)]
+    return tails, int(times[-1]) if len(times) else 0
+
+
+class ScheduleStats:
+    """
+    Per-keyframe schedule error (send time - target time) for one utterance;
+    with the track protocol, how far ahead of the audio each part was sent.
+    """
+
+    def __init__(self):
+        self.errors_ms = []
+        self.dropped   = 0     # streamed keyframes skipped as too late
+        self.leads_ms  = []    # lip_track parts: due time of their first keyframe - send time
+        self.resyncs   = 0     # lip_clock re-announcements
+
+    def record(self, target_t: float, sent_t: float):
+        self.errors_ms.append((sent_t - target_t) * 1000.0)
+
+    def record_lead(self, due_t: float, sent_t: float):
+        self.leads_ms.append((due_t - sent_t) * 1000.0)
+
+    def stats(self) -> dict:
+        out = {"keyframes": len(self.errors_ms), "dropped": self.dropped}
+        if self.leads_ms:
+            out.update(track_parts=len(self.leads_ms),
+                       min_lead_ms=round(min(self.leads_ms), 3),
+                       resyncs=self.resyncs)
+        if not self.errors_ms:
+            return out
+        errors = sorted(abs(e) for e in self.errors_ms)
+        return {
+            **out,
+            "mean_ms":   round(sum(self.errors_ms) / len(errors), 3),
+            "p95_ms":    round(errors[min(len(errors) - 1, int(len(errors) * 0.95))], 3),
+            "max_ms":    round(errors[-1], 3),
+        }
+
+
+def _wait_until(target, cancel: threading.Event = None):
+    """
+    Wait until target() (perf_counter seconds, re-evaluated so clock updates
+    are followed): sleep until SCHEDULE_SPIN_MS before it, then busy-wait.
+    Returns the final target, or None if cancel was set while sleeping.
+    """
+    spin_s = SCHEDULE_SPIN_MS / 1000.0
+    while True:
+        if cancel is not None and cancel.is_set():
+            return None
+        target_t = target()
+        delay = target_t - time.perf_counter()
+        if delay <= spin_s:
+            break
+        time.sleep(min(delay - spin_s, SCHEDULE_MAX_SLEEP_S))
+    while time.perf_counter() < target_t:
+        pass
+    return target_t
+
+
+def _report_schedule(schedule: ScheduleStats) -> dict:
+    stats = schedule.stats()
+    if stats.get("track_parts"):
+        print(f"[SpeechPlayer] lip track sent in {stats['track_parts']} parts, "
+              f"at least {stats['min_lead_ms']} ms ahead of their audio, {stats['resyncs']} clock updates")
+    if stats["keyframes"]:
+        print(f"[SpeechPlayer] keyframe schedule error: mean {stats['mean_ms']} ms, "
+              f"p95 {stats['p95_ms']} ms, max {stats['max_ms']} ms over {stats['keyframes']} keyframes"
+              + (f", {stats['dropped']} dropped late" if stats["dropped"] else ""))
+    return stats
+
+
+def _send_keyframes(sock: socket.socket, keyframes, start, addr: tuple = (UDP_HOST, UDP_PORT),
+                    schedule: ScheduleStats = None, cancel: threading.Event = None):
+    """
+    Send lip-sync keyframes on time.perf_counter's clock (until cancel is set).
+
+    keyframes is a KeyframeTrack, a LipCurve, a list of
+    {time_ms, blendshapes} or (better, done before T0) their
+    encode_keyframes(). start is the perf_counter time of time_ms 0, or
+    a function time_ms -> perf_counter time (e.g. from an AudioClock). Each
+    datagram carries "scheduledTime", the intended send time, so the
+    keyframe-schedule error is monoTime - scheduledTime; schedule records it.
+    """
+    target_of = start if callable(start) else (lambda ms: start + ms / 1000.0)
+    for time_ms, tail in encode_keyframes(keyframes):
+        target_t = _wait_until(lambda: target_of(time_ms), cancel)
+        if target_t is None:
+            return
+        sent_t = _send_encoded(sock, _LIP_SYNC_HEAD, tail, addr, target_t)
+        if schedule is not None:
+            schedule.record(target_t, sent_t)
+
+
+class _TrackClock:
+    """Announces a track's start time and re-announces it when start() moves."""
+
+    def __init__(self, sock: socket.socket, track_id: int, start, addr: tuple,
+                 schedule: ScheduleStats = None):
+        self.sock     = sock
+        self.start    = start
+        self.addr     = addr
+        self.schedule = schedule
+        self.start_t  = start()
+        self._tail    = b'"trackId":%d}' % track_id
+
+    def send_parts(self, tails: list):
+        for first_ms, tail in tails:
+            sent_t = _send_encoded(self.sock, _LIP_TRACK_HEAD, tail, self.addr, self.start_t)
+            if self.schedule is not None:
+                self.schedule.record_lead(self.start_t + first_ms / 1000.0, sent_t)
+
+    def resync(self):
+        start_t = self.start()
+        if abs(start_t - self.start_t) * 1000.0 < TRACK_RESYNC_MS:
+            return
+        self.start_t = start_t
+        _send_encoded(self.sock, _LIP_CLOCK_HEAD, self._tail, self.addr, start_t)
+        if self.schedule is not None:
+            self.schedule.resyncs += 1
+
+    def hold(self, end_ms: float, cancel: threading.Event = None):
+        """Keep the start time current until end_ms has played (or cancel)."""
+        cancel = cancel or threading.Event()
+        while True:
+            remaining = self.start_t + end_ms / 1000.0 - time.perf_counter()
+            if remaining <= 0 or cancel.wait(min(remaining, TRACK_RESYNC_S)):
+                return
+            self.resync()
+
+
+def _send_track(sock: socket.socket, track_id: int, tails: list, end_ms: float, start,
+                addr: tuple = (UDP_HOST, UDP_PORT), schedule: ScheduleStats = None,
+                cancel: threading.Event = None):
+    """
+    Send an encode_track()d track at once, stamped with start() (perf_counter
+    time of time_ms 0, called now and re-read until end_ms has played); the
+    receiver samples it on its own clock.
+    """
+    clock = _TrackClock(sock, track_id, start, addr, schedule)
+    clock.send_parts(tails)
+    clock.hold(end_ms, cancel)
+
+
+class PcmStream:
+    """
+    Ring buffer of raw 16-bit PCM between a TTS callback thread (producer)
+    and the audio output callback (consumer), with jitter-buffer behaviour:
+
+      - Playback starts only once prebuffer_ms of audio is buffered (or the
+        input is complete), absorbing network jitter between chunks.
+      - On underrun the callback plays silence, counts the event and
+        re-buffers; the prebuffer target grows (up to max_prebuffer_ms) so a
+        jittery connection settles on a deeper buffer.
+      - stall_s accumulates the silence inserted after playback started, so
+        keyframe timing can follow the audio rather than the wall clock.
+
+    feed() blocks while the ring is full (back-pressure on the producer);
+    afeed() is the asyncio variant that awaits instead of blocking the loop.
+    read() never waits on the producer.
+    """
+
+    def __init__(self, samplerate: int, channels: int = 1,
+                 prebuffer_ms: float = STREAM_PREBUFFER_MS,
+                 max_prebuffer_ms: float = STREAM_MAX_PREBUFFER_MS,
+                 ring_ms: float = STREAM_RING_MS, t_request: float = None):
+        self.samplerate  = samplerate
+        self.channels    = channels
+        self.frame_bytes = 2 * channels
+        self.t_request   = t_request if t_request is not None else time.perf_counter()
+
+        self.prebuffer_ms     = prebuffer_ms
+        self.max_prebuffer_ms = max(prebuffer_ms, max_prebuffer_ms)
+
+        self._ring  = bytearray(self._ms_to_bytes(ring_ms))
+        self._rpos  = 0      # read index
+        self._size  = 0      # bytes currently buffered
+        self._cond  = threading.Condition()
+        self._closed    = False
+        self._aborted   = False
+        self._buffering = True
+
+        self.started       = threading.Event()   # first real audio handed to the device
+        self.first_audio_t = None                # perf_counter when it becomes audible
+        self.clock             = None            # AudioClock of the output engine
+        self.first_audio_frame = None            # engine frame of the first real audio
+        self.underruns     = 0
+        self.stall_s       = 0.0                 # silence inserted after start (seconds)
+        self.bytes_in      = 0
+
+    def _ms_to_bytes(self, ms: float) -> int:
+        frames = int(self.samplerate * ms / 1000.0)
+        return max(1, frames) * self.frame_bytes
+
+    # -- producer ----------------------------------------------------------
+
+    def _write_locked(self, view: memoryview) -> int:
+        """Copy as much of view as fits into the ring (caller holds _cond)."""
+        cap   = len(self._ring)
+        n     = min(len(view), cap - self._size)
+        wpos  = (self._rpos + self._size) % cap
+        first = min(n, cap - wpos)
+        self._ring[wpos:wpos + first] = view[:first]
+        self._ring[:n - first] = view[first:n]
+        self._size    += n
+        self.bytes_in += n
+        return n
 
-        This method blocks until audio playback is complete.
-        Call from a background executor thread to avoid blocking the
-        FastAPI event loop.
+    def feed(self, pcm: bytes, timeout: float = 5.0):
+        """Write a PCM chunk (producer side). Raises TimeoutError if the ring stays full."""
+        view = memoryview(pcm)
+        cap  = len(self._ring)
+        while len(view) and not self._aborted:
+            with self._cond:
+                if not self._cond.wait_for(lambda: self._size < cap or self._aborted, timeout):
+                    raise TimeoutError("PCM ring buffer full")
+                if self._aborted:
+                    return
+                n = self._write_locked(view)
+            view = view[n:]
 
-        Args:
-            audio_b64:   Base64-encoded WAV bytes from ISI TTS.
-            keyframes:   List of {time_ms, blendshapes} from lip_sync.
-            emotion_bs:  Emotion blendshapes dict (mouthSmileLeft, etc.)
-                         from TextAnalyzer. Sent immediately at T0.
+    async def afeed(self, pcm: bytes, timeout: float = 5.0, poll_s: float = 0.02):
+        """feed() for asyncio producers: yields to the loop while the ring is full."""
+        view     = memoryview(pcm)
+        deadline = time.perf_counter() + timeout
+        while len(view) and not self._aborted:
+            with self._cond:
+                n = self._write_locked(view) if not self._aborted else 0
+            if n:
+                view     = view[n:]
+                deadline = time.perf_counter() + timeout
+                continue
+            if time.perf_counter() > deadline:
+                raise TimeoutError("PCM ring buffer full")
+            await asyncio.sleep(poll_s)
+
+    def close(self):
+        """Mark the end of input; playback stops once the ring is drained."""
+        with self._cond:
+            self._closed = True
+
+    def abort(self):
+        """Drop all buffered and future audio."""
+        with self._cond:
+            self._aborted = True
+            self._closed  = True
+            self._size    = 0
+            self._cond.notify_all()
+
+    # -- consumer ----------------------------------------------------------
+
+    @property
+    def drained(self) -> bool:
+        return self._closed and self._size == 0
+
+    @property
+    def ttfa_ms(self):
+        """Time from request to first audible sample, or None if not started."""
+        if self.first_audio_t is None:
+            return None
+        return round((self.first_audio_t - self.t_request) * 1000.0, 1)
+
+    def read(self, nbytes: int) -> bytes:
+        """
+        Read up to nbytes (whole frames) for the output callback.
+
+        Returns b"" while (re-)buffering. A short read after playback has
+        started is an underrun: it is counted and the stream re-buffers.
         """
-        if not _HAS_AUDIO:
-            print("[SpeechPlayer] sounddevice/soundfile/numpy not installed — skipping audio")
+        with self._cond:
+            if self._buffering:
+                target = min(self._ms_to_bytes(self.prebuffer_ms), len(self._ring))
+                if self._size < target and not self._closed:
+                    if self.started.is_set():
+                        self.stall_s += nbytes / self.frame_bytes / self.samplerate
+                    return b""
+                self._buffering = False
+
+            n = min(nbytes, self._size)
+            n -= n % self.frame_bytes
+            cap   = len(self._ring)
+            first = min(n, cap - self._rpos)
+            data  = bytes(self._ring[self._rpos:self._rpos + first]) + bytes(self._ring[:n - first])
+            self._rpos  = (self._rpos + n) % cap
+            self._size -= n
+            self._cond.notify_all()
+
+            if n < nbytes and not self._closed and self.started.is_set():
+                self.underruns += 1
+                self.stall_s   += (nbytes - n) / self.frame_bytes / self.samplerate
+                self.prebuffer_ms = min(self.max_prebuffer_ms, self.prebuffer_ms * 1.5)
+                self._buffering = True
+            return data
+
+    def audio_time(self, offset_s: float) -> float:
+        """perf_counter time at which audio offset_s into the stream plays (after started)."""
+        frame = self.first_audio_frame + (self.stall_s + offset_s) * self.clock.samplerate
+        return self.clock.time_of(frame)
+
+    def stats(self) -> dict:
+        return {
+            "ttfa_ms":      self.ttfa_ms,
+            "underruns":    self.underruns,
+            "stall_ms":     round(self.stall_s * 1000.0, 1),
+            "prebuffer_ms": round(self.prebuffer_ms, 1),
+            "audio_ms":     round(self.bytes_in / self.frame_bytes / self.samplerate * 1000.0),
+        }
+
+
+def _send_streamed_keyframes(sock: socket.socket, stream: PcmStream,
+                             keyframe_queue: queue.Queue, addr: tuple,
+                             schedule: ScheduleStats = None, cancel: threading.Event = None):
+    """
+    Send keyframe batches from keyframe_queue (None = end, or cancel) against the
+    stream's audio position on its AudioClock: first audio frame plus any
+    silence inserted by underruns. Targets are re-evaluated while waiting,
+    so an underrun pushes them back. Keyframes already more than
+    STREAM_LATE_DROP_MS late (e.g. fallback timings that only became
+    available after synthesis) are dropped instead of being sent in a burst.
+    Each batch is serialized as it arrives, before its first send time.
+    """
+    while not stream.started.wait(timeout=0.1):
+        if stream.drained:
+            return
+    late_s = STREAM_LATE_DROP_MS / 1000.0
+    while True:
+        try:
+            batch = keyframe_queue.get(timeout=0.1)
+        except queue.Empty:
+            if cancel is not None and cancel.is_set():
+                return
+            continue
+        if batch is None:
             return
+        for time_ms, tail in encode_keyframes(batch):
+            offset   = time_ms / 1000.0
+            target_t = _wait_until(lambda: stream.audio_time(offset), cancel)
+            if target_t is None:
+                return
+            if time.perf_counter() - target_t > late_s:
+                if schedule is not None:
+                    schedule.dropped += 1
+                continue
+            sent_t = _send_encoded(sock, _LIP_SYNC_HEAD, tail, addr, target_t)
+            if schedule is not None:
+                schedule.record(target_t, sent_t)
 
-        if not audio_b64:
-            print("[SpeechPlayer] no audio data provided")
+
+def _send_streamed_track(sock: socket.socket, stream: PcmStream, keyframe_queue: queue.Queue,
+                         track_id: int, addr: tuple, schedule: ScheduleStats = None,
+                         cancel: threading.Event = None):
+    """
+    Track protocol for a PcmStream: each keyframe batch goes out as further
+    parts of an open-ended lip_track as soon as it arrives, and startTime
+    follows the stream's audio position, so stalls are re-announced.
+    """
+    while not stream.started.wait(timeout=0.1):
+        if stream.drained:
+            return
+    clock = _TrackClock(sock, track_id, lambda: stream.audio_time(0.0), addr, schedule)
+    part, end_ms = 0, 0
+    while True:
+        try:
+            batch = keyframe_queue.get(timeout=TRACK_RESYNC_S)
+        except queue.Empty:
+            if cancel is not None and cancel.is_set():
+                return
+            clock.resync()
+            continue
+        if batch is None:
+            break
+        if batch:
+            tails, batch_end = encode_track(batch, track_id, part, open_ended=True)
+            clock.send_parts(tails)
+            part, end_ms = part + len(tails), max(end_ms, batch_end)
+    clock.hold(end_ms, cancel)
+
+
+class _EmotionLink:
+    """
+    Delivers emotion blendshapes for one utterance: immediately for a dict,
+    or when a pending Future resolves — but only while the utterance is still
+    playing, so a late result never lands after the reset frame.
+    """
+
+    def __init__(self, sock: socket.socket, addr: tuple, emotion):
+        self._sock = sock
+        self._addr = addr
+        self._lock = threading.Lock()
+        self._open = True
+        if isinstance(emotion, Future):
+            emotion.add_done_callback(self._resolved)
+        elif emotion:
+            self._send(emotion)
+
+    def _resolved(self, fut: Future):
+        if fut.cancelled() or fut.exception() is not None:
             return
+        if fut.result():
+            self._send(fut.result())
+
+    def _send(self, blendshapes: dict):
+        with self._lock:
+            if self._open:
+                _send_udp(self._sock, {"type": "text_emotion", "blendshapes": blendshapes}, self._addr)
+
+    def close(self):
+        with self._lock:
+            self._open = False
+
+
+class Playback:
+    """
+    One utterance started on the output engine: its Voice, plus a thread
+    that sends the emotion and lip-sync keyframes once the voice starts
+    (for a chained voice, only when the previous utterance has ended).
+
+    stop() cuts it short (barge-in); finish() waits for the sender, sends the
+    reset frame unless another utterance follows, and returns its stats.
+    """
 
-        raw_wav = base64.b64decode(audio_b64)
+    def __init__(self, player: "SpeechPlayer", voice, send, emotion_bs, track_id: int = None):
+        self.voice    = voice
+        self.track_id = track_id     # lip_track id with the track protocol
+        self.schedule = ScheduleStats()
+        self.cancel   = threading.Event()
+        self._player  = player
+        self._sock    = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._emotion = None
+        self._thread  = threading.Thread(target=self._run, args=(send, emotion_bs), daemon=True)
+        self._thread.start()
 
+    def _run(self, send, emotion_bs):
+        while not self.voice.started.wait(timeout=0.05):
+            if self.voice.finished.is_set() or self.cancel.is_set():
+                return
+        self._emotion = _EmotionLink(self._sock, self._player.addr, emotion_bs)
+        send(self._sock, self.schedule, self.cancel)
+
+    @property
+    def stopped(self) -> bool:
+        return self.cancel.is_set()
+
+    def stop(self):
+        self.cancel.set()
+        self.voice.stop()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self.voice.wait(timeout)
+
+    def finish(self, reset: bool = True) -> dict:
+        # Wait for the last keyframe to be sent before closing the socket
+        # (prevents [Errno 9] and out-of-order resets)
+        self._thread.join(timeout=2.0)
+        if self._emotion is not None:
+            self._emotion.close()
+        if reset:
+            # Send reset frame so Unity reverts to face-capture mode
+            self._player._send_reset(self._sock, self.track_id)
+        self._sock.close()
+        stats = _report_schedule(self.schedule)
+        stats["start_latency_ms"] = self.voice.start_latency_ms
+        stats["interrupted"]      = self.stopped
+        return stats
+
+
+def stream_report(stream: PcmStream, schedule: dict) -> dict:
+    """stream.stats() plus the keyframe ScheduleStats; logs time-to-first-audio."""
+    stats = stream.stats()
+    if stats["ttfa_ms"] is not None:
+        print(f"[SpeechPlayer] time-to-first-audio {stats['ttfa_ms']} ms, "
+              f"underruns {stats['underruns']} ({stats['stall_ms']} ms stalled), "
+              f"prebuffer {stats['prebuffer_ms']} ms")
+    stats["schedule"] = schedule
+    return stats
+
+
+class SpeechPlayer:
+    """
+    Plays audio locally and sends timed UDP frames to Unity, per keyframe
+    (protocol "stream") or as one up-front track (protocol "track").
+    """
+
+    def __init__(self, host: str = UDP_HOST, port: int = UDP_PORT,
+                 engine: AudioOutputEngine = None, protocol: str = "stream"):
+        self.addr     = (host, port)
+        self._engine  = engine
+        self.protocol = protocol
+
+    @property
+    def protocol(self) -> str:
+        return self._protocol
+
+    @protocol.setter
+    def protocol(self, value: str):
+        if value not in LIPSYNC_PROTOCOLS:
+            raise ValueError(f"unknown lip-sync protocol {value!r} (expected one of {LIPSYNC_PROTOCOLS})")
+        self._protocol = value
+
+    @property
+    def engine(self) -> AudioOutputEngine:
+        return self._engine or output_engine()
+
+    @property
+    def available(self) -> bool:
+        return self.engine.available
+
+    def prepare(self, audio):
+        """
+        Resample audio (an AudioClip, WAV bytes or a base64 WAV string) to
+        the engine rate, ready for start(); None when there is nothing
+        playable. Safe to call ahead of time (prefetch).
+        """
         try:
-            padded_audio, samplerate = _prepend_silence(raw_wav, AUDIO_PAD_MS)
+            clip = as_clip(audio)
+        except ValueError as e:
+            clip = self._decode_other(audio, e)
+        if clip is None or not clip.frames:
+            print("[SpeechPlayer] no audio data provided")
+            return None
+        return self.engine.prepare(clip.float32(), clip.samplerate)
+
+    @staticmethod
+    def _decode_other(audio, error: ValueError) -> AudioClip | None:
+        """soundfile fallback for WAV encodings AudioClip cannot view."""
+        if not _HAS_SF or not isinstance(audio, (bytes, bytearray)):
+            print(f"[SpeechPlayer] WAV decode error: {error}")
+            return None
+        try:
+            with sf.SoundFile(io.BytesIO(audio)) as f:
+                return AudioClip(f.read(dtype="float32"), f.samplerate)
         except Exception as e:
             print(f"[SpeechPlayer] WAV decode error: {e}")
-            return
+            return None
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        pad_s = AUDIO_PAD_MS / 1000.0
+    def start(self, prepared, keyframes, emotion_bs, after=None) -> Playback:
+        """
+        Start a prepare()d clip on the engine and return its Playback; with
+        after (a Voice) it starts exactly where that voice ends. Keyframe
+        time_ms 0 is the voice's first frame. The datagrams are serialized
+        here, before the voice is started.
+        """
+        track_id = None
+        if self.protocol == "track":
+            track_id = next(_track_ids)
+            tails, end_ms = encode_track(keyframes, track_id)
 
-        try:
-            # Send emotion blendshapes immediately (before audio starts)
-            if emotion_bs:
-                _send_udp(sock, {"type": "text_emotion", "blendshapes": emotion_bs})
-
-            # Start audio playback and mark T0
-            sd.play(padded_audio, samplerate)
-            t0 = time.perf_counter()
-
-            # Send lip-sync keyframes from a background thread
-            def _sender():
-                for kf in keyframes:
-                    target_t = t0 + pad_s + kf["time_ms"] / 1000.0
-                    delay = target_t - time.perf_counter()
-                    if delay > 0:
-                        time.sleep(delay)
-                    _send_udp(sock, {"type": "lip_sync", "blendshapes": kf["blendshapes"]})
-
-            sender_thread = threading.Thread(target=_sender, daemon=True)
-            sender_thread.start()
-
-            # Block until audio finishes, then wait for last keyframe to be sent
-            # before closing the socket (prevents [Errno 9] and out-of-order resets)
-            sd.wait()
-            sender_thread.join(timeout=2.0)
-
-        finally:
-            # Always send reset frame so Unity reverts to face-capture mode
-            reset_bs = {
-                "jawOpen":         0.0,
-                "mouthFunnel":     0.0,
-                "mouthPucker":     0.0,
-                "mouthSmileLeft":  0.0,
-                "mouthSmileRight": 0.0,
-                "mouthFrownLeft":  0.0,
-                "mouthFrownRight": 0.0,
-            }
-            _send_udp(sock, {"type": "reset", "blendshapes": reset_bs})
-            sock.close()
+            def send(sock, schedule, cancel):
+                _send_track(sock, track_id, tails, end_ms, lambda: voice.time_of(0.0),
+                            self.addr, schedule, cancel)
+        else:
+            encoded = encode_keyframes(keyframes)
+
+            def send(sock, schedule, cancel):
+                _send_keyframes(sock, encoded, lambda ms: voice.time_of(ms / 1000.0),
+                                self.addr, schedule, cancel)
+
+        voice = self.engine.play_clip(prepared, after=after)
+        return Playback(self, voice, send, emotion_bs, track_id)
+
+    def start_stream(self, stream: PcmStream, keyframe_queue: queue.Queue, emotion_bs,
+                     after=None) -> Playback:
+        """
+        Start a PcmStream on the engine while it is still being filled and
+        return its Playback. keyframe_queue holds keyframe lists (times
+        relative to the start of the audio), terminated by None.
+        """
+        stream.clock = self.engine.clock
+
+        def on_start(voice):
+            # Runs in the output callback when the first real audio is mixed
+            stream.first_audio_frame = voice.start_frame
+            stream.first_audio_t     = voice.time_of(0.0)
+            stream.started.set()
+
+        voice = self.engine.play_stream(stream, on_start, after=after)
+        track_id = next(_track_ids) if self.protocol == "track" else None
+
+        def send(sock, schedule, cancel):
+            if track_id is not None:
+                _send_streamed_track(sock, stream, keyframe_queue, track_id, self.addr, schedule, cancel)
+            else:
+                _send_streamed_keyframes(sock, stream, keyframe_queue, self.addr, schedule, cancel)
+
+        return Playback(self, voice, send, emotion_bs, track_id)
+
+    def _send_reset(self, sock: socket.socket, track_id: int = None):
+        reset_bs = {
+            "jawOpen":         0.0,
+            "mouthFunnel":     0.0,
+            "mouthPucker":     0.0,
+            "mouthSmileLeft":  0.0,
+            "mouthSmileRight": 0.0,
+            "mouthFrownLeft":  0.0,
+            "mouthFrownRight": 0.0,
+        }
+        payload = {"type": "reset", "blendshapes": reset_bs}
+        if track_id is not None:
+            # Only drops tracks up to this one, not a successor already sent
+            payload["trackId"] = track_id
+        _send_udp(sock, payload, self.addr)
@@ -1,9 +1,17 @@
 """
 Analyze text emotion using Qwen API (OpenAI-compatible mode).
+
+An optional AnalysisCache memoizes results per (model, normalized text) and
+coalesces concurrent identical requests into one API call. A long-lived,
+shared OpenAI client may be injected so keep-alive connections are reused
+across analyzer instances. analyze_async() runs the same request on an
+AsyncOpenAI client, for callers on an event loop.
 """
 
 import json
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from analysis_cache import AnalysisCache, make_key
 
 SYSTEM_PROMPT = """你是一个虚拟人表情分析助手。分析输入文本的情感，只返回JSON，不要其他文字：
 {
@@ -49,31 +57,69 @@ EMOTION_BLENDSHAPES = {
 
 class TextAnalyzer:
     def __init__(self, api_key: str, model: str = "qwen-turbo",
-                 base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+                 base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1",
+                 cache: AnalysisCache = None, client: OpenAI = None,
+                 async_client: AsyncOpenAI = None):
+        self.client = client or OpenAI(api_key=api_key, base_url=base_url)
+        self.async_client = async_client
         self.model = model
+        self.cache = cache
+
+    def _request(self, text: str) -> dict:
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": text},
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=100,
+        )
+
+    def _query(self, text: str) -> dict:
+        """One Qwen round trip; returns the raw {emotion, intensity} JSON (raises on error)."""
+        resp = self.client.chat.completions.create(**self._request(text))
+        return json.loads(resp.choices[0].message.content)
+
+    async def _aquery(self, text: str) -> dict:
+        resp = await self.async_client.chat.completions.create(**self._request(text))
+        return json.loads(resp.choices[0].message.content)
 
     def analyze(self, text: str) -> dict:
         """
         Analyze text and return:
           {emotion, intensity, blendshapes}
-        Falls back to neutral on any error.
+        Falls back to neutral on any error (fallbacks are not cached).
+        """
+        try:
+            if self.cache is not None:
+                result = self.cache.get_or_compute(make_key(self.model, text),
+                                                   lambda: self._query(text))
+            else:
+                result = self._query(text)
+        except Exception as e:
+            print(f"[TextAnalyzer] Qwen error: {e}")
+            result = {"emotion": "neutral", "intensity": 0.5}
+        return self._to_result(result)
+
+    async def analyze_async(self, text: str) -> dict:
+        """
+        analyze() on the async client (requires async_client). Cancellation
+        propagates to the HTTP request; other errors fall back to neutral.
         """
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": text},
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=100,
-            )
-            result = json.loads(resp.choices[0].message.content)
+            if self.cache is not None:
+                result = await self.cache.get_or_compute_async(make_key(self.model, text),
+                                                               lambda: self._aquery(text))
+            else:
+                result = await self._aquery(text)
         except Exception as e:
             print(f"[TextAnalyzer] Qwen error: {e}")
             result = {"emotion": "neutral", "intensity": 0.5}
+        return self._to_result(result)
 
+    @staticmethod
+    def _to_result(result: dict) -> dict:
         emotion = result.get("emotion", "neutral")
         if emotion not in EMOTION_BLENDSHAPES:
             emotion = "neutral"
@@ -0,0 +1,70 @@
+"""
+Sentence chunking for long texts.
+
+Splits text into sentence-sized chunks so TTS can synthesize (and playback
+can start with) the first sentence while the rest is still being generated.
+Boundaries reuse the punctuation weights in tts_cosyvoice.PAUSE_W:
+
+  - a mark with weight >= SENTENCE_BREAK_W (。！？.!?…) or a newline ends a chunk
+  - once a chunk reaches max_chars, any weighted mark (，；、…) ends it
+  - a chunk with no punctuation at all is cut hard at 2 × max_chars
+"""
+
+from tts_cosyvoice import PAUSE_W
+
+SENTENCE_BREAK_W = 1.5
+
+# Closing quotes / brackets that belong to the sentence they follow
+_CLOSERS = set('"\'”’」』）)】》')
+
+
+def _is_decimal_point(text: str, i: int) -> bool:
+    return (text[i] == '.' and 0 < i < len(text) - 1
+            and text[i - 1].isdigit() and text[i + 1].isdigit())
+
+
+def split_sentences(text: str, max_chars: int = 80) -> list:
+    """
+    Split text into speakable chunks (see module docstring).
+
+    Punctuation-only fragments are merged into the preceding chunk, so every
+    returned chunk contains something to say.
+    """
+    chunks  = []
+    current = []
+    i, n = 0, len(text)
+
+    def flush():
+        chunk = "".join(current).strip()
+        current.clear()
+        if not chunk:
+            return
+        if chunks and not any(c.strip() and c not in PAUSE_W and c not in _CLOSERS for c in chunk):
+            chunks[-1] += chunk
+        else:
+            chunks.append(chunk)
+
+    while i < n:
+        c = text[i]
+        current.append(c)
+        i += 1
+
+        if c == "\n":
+            flush()
+            continue
+
+        weight = PAUSE_W.get(c, 0.0)
+        if weight and _is_decimal_point(text, i - 1):
+            weight = 0.0
+
+        if weight >= SENTENCE_BREAK_W or (weight and len(current) >= max_chars):
+            # Keep runs like "！！" / "……" / "。」" with the sentence they end
+            while i < n and (text[i] in PAUSE_W or text[i] in _CLOSERS):
+                current.append(text[i])
+                i += 1
+            flush()
+        elif len(current) >= 2 * max_chars:
+            flush()
+
+    flush()
+    return chunks
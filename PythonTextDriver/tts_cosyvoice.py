@@ -10,22 +10,34 @@ Protocol:
   3. task-started  → continue-task (text) + finish-task
   4. result-generated → binary PCM chunks
   5. task-finished   → words array with begin_time / end_time per character
-  6. Build proper WAV from raw PCM, convert words → phoneme_flat
+  6. Wrap the raw PCM in an AudioClip, convert words → phoneme_flat
+
+This module holds the protocol (_SynthesisTask) and the text / timestamp
+helpers. The sockets themselves are pooled and driven by the control panel's
+CosyVoiceEngine (control-panel/modules/engines.py), which reuses a socket for
+the next run-task instead of closing it after task-finished.
+
+Streaming: when on_audio is given, every binary PCM frame (SAMPLE_RATE,
+16-bit mono) is handed to the callback as it arrives, and on_phonemes
+receives newly timestamped words from result-generated events, so playback
+can start with the first frame. The AudioClip and phoneme_flat are still
+returned.
 """
 
-import base64
-import json
-import struct
 import time
 import uuid
+from concurrent.futures import Future
 
-import websocket  # websocket-client (installed as dashscope dependency)
+from audio_clip import AudioClip
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
-_WS_URL = "wss://dashscope.aliyuncs.com/api-ws/v1/inference"
+WS_URL = "wss://dashscope.aliyuncs.com/api-ws/v1/inference"
+
+# Upper bound for one run-task exchange (connect excluded)
+TASK_TIMEOUT_S = 60.0
 
 _KNOWN_MODELS = [
     "cosyvoice-v3.5-plus",
@@ -41,6 +53,17 @@ _SAMPLE_RATE = 22050
 _CHANNELS    = 1
 _BITS        = 16
 
+SAMPLE_RATE = _SAMPLE_RATE   # public alias for streaming consumers
+
+# Weight of each punctuation mark as a fraction of one character slot.
+# Used for pause estimation here and for sentence splitting (text_chunker).
+PAUSE_W = {
+    '、': 0.5, '：': 0.5, '·': 0.3,
+    '，': 0.8, '；': 0.8, ',': 0.8, ';': 0.8,
+    '。': 1.5, '！': 1.5, '？': 1.5, '.': 1.5, '!': 1.5, '?': 1.5,
+    '…': 2.0, '—': 1.0,
+}
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -62,14 +85,6 @@ def _estimate_phoneme_flat(text: str, pcm_bytes: bytes) -> list:
     proportional silent gaps at punctuation positions so the mouth closes
     naturally during pauses.
     """
-    # Weight of each punctuation mark as a fraction of one character slot
-    PAUSE_W = {
-        '、': 0.5, '：': 0.5, '·': 0.3,
-        '，': 0.8, '；': 0.8, ',': 0.8, ';': 0.8,
-        '。': 1.5, '！': 1.5, '？': 1.5, '.': 1.5, '!': 1.5, '?': 1.5,
-        '…': 2.0, '—': 1.0,
-    }
-
     # Build a weighted sequence of ('speech', char) | ('pause', weight)
     items = []
     for c in text:
@@ -117,82 +132,58 @@ def _estimate_phoneme_flat(text: str, pcm_bytes: bytes) -> list:
     return result
 
 
-def _build_wav(pcm_bytes: bytes,
-               sample_rate: int = _SAMPLE_RATE,
-               channels: int   = _CHANNELS,
-               bits: int       = _BITS) -> bytes:
-    """Wrap raw PCM bytes in a standard 44-byte WAV/RIFF header."""
-    data_size  = len(pcm_bytes)
-    byte_rate  = sample_rate * channels * bits // 8
-    block_align = channels * bits // 8
-    header = struct.pack(
-        "<4sI4s4sIHHIIHH4sI",
-        b"RIFF", 36 + data_size,
-        b"WAVE",
-        b"fmt ", 16,
-        1,                   # PCM audio format
-        channels,
-        sample_rate,
-        byte_rate,
-        block_align,
-        bits,
-        b"data", data_size,
-    )
-    return header + pcm_bytes
+def _words_to_phonemes(words: list) -> list:
+    """Convert CosyVoice word timestamps to phoneme_flat entries."""
+    return [
+        {
+            "char":     w.get("text", ""),
+            "phoneme":  "e",
+            "begin_ms": w.get("begin_time", 0),
+            "end_ms":   w.get("end_time",   0),
+        }
+        for w in words
+        if w.get("end_time", 0) > w.get("begin_time", 0)
+    ]
 
 
 # ---------------------------------------------------------------------------
-# Public API
+# Synthesis task (one run-task exchange on an AsyncCosyVoiceSession)
 # ---------------------------------------------------------------------------
 
-def synthesize(text: str, voice_id: str, api_key: str) -> dict:
-    """
-    Synthesize text with a CosyVoice custom voice via WebSocket API.
-
-    Returns dict compatible with tts_isi.synthesize():
-      ok              bool
-      audio_base64    str    WAV, base64-encoded
-      audio_size      int
-      phoneme_flat    list   [{char, phoneme, begin_ms, end_ms}, ...]
-      phoneme_count   int
-      elapsed_s       float
-      request         dict
-      error           str    (only on failure)
-    """
-    t0 = time.time()
-    model     = _extract_model(voice_id)
-    task_id   = str(uuid.uuid4())
-    request_info = {
-        "voice_id": voice_id, "model": model,
-        "text": text, "text_length": len(text),
-    }
-
-    if not api_key:
-        return {"ok": False, "error": "Qwen API Key 未配置", "request": request_info}
-
-    pcm_chunks: list[bytes] = []
-    words: list[dict]       = []
-    error_msg: list[str]    = [None]   # list so closures can mutate
-
-    # ------------------------------------------------------------------
-    # WebSocket callbacks
-    # ------------------------------------------------------------------
-
-    def _on_open(ws):
-        run_task = {
-            "header": {
-                "action": "run-task",
-                "task_id": task_id,
-                "streaming": "duplex",
-            },
+class _SynthesisTask:
+    """Collects PCM frames and word timestamps for one task_id."""
+
+    def __init__(self, text: str, voice_id: str, model: str, on_audio=None, on_phonemes=None):
+        self.text        = text
+        self.voice_id    = voice_id
+        self.model       = model
+        self.task_id     = str(uuid.uuid4())
+        self.on_audio    = on_audio
+        self.on_phonemes = on_phonemes
+
+        self.pcm_chunks: list[bytes] = []
+        self.words: list[dict]       = []
+        self.error: str | None       = None
+        self.started                 = False   # task-started received
+        self.dropped                 = False   # connection failed under the task
+        self.first_chunk_t           = None
+        self.finished                = Future()
+        self._seen_words: set        = set()   # (begin_time, text) — events repeat words
+
+    def _header(self, action: str) -> dict:
+        return {"action": action, "task_id": self.task_id, "streaming": "duplex"}
+
+    def run_task_message(self) -> dict:
+        return {
+            "header": self._header("run-task"),
             "payload": {
                 "task_group": "audio",
                 "task":       "tts",
                 "function":   "SpeechSynthesizer",
-                "model":      model,
+                "model":      self.model,
                 "parameters": {
                     "text_type":              "PlainText",
-                    "voice":                  voice_id,
+                    "voice":                  self.voice_id,
                     "format":                 "pcm",
                     "sample_rate":            _SAMPLE_RATE,
                     "word_timestamp_enabled": True,
@@ -200,131 +191,121 @@ def synthesize(text: str, voice_id: str, api_key: str) -> dict:
                 "input": {},
             },
         }
-        ws.send(json.dumps(run_task))
 
-    def _on_message(ws, message):
-        # Binary frames = raw PCM audio
-        if isinstance(message, bytes):
-            pcm_chunks.append(message)
-            return
+    @property
+    def retryable(self) -> bool:
+        """The connection failed before the server accepted the task."""
+        return self.dropped and not self.started
+
+    def _finish(self, error: str = None):
+        if error and not self.error:
+            self.error = error
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+    def _collect_words(self, event_words):
+        # result-generated repeats the words of the current sentence; keep new ones
+        fresh = []
+        for w in event_words:
+            key = (w.get("begin_time", 0), w.get("text", ""))
+            if key not in self._seen_words:
+                self._seen_words.add(key)
+                fresh.append(w)
+        self.words.extend(fresh)
+        if self.on_phonemes is not None and fresh:
+            phonemes = _words_to_phonemes(fresh)
+            if phonemes:
+                try:
+                    self.on_phonemes(phonemes)
+                except Exception as e:
+                    print(f"[CosyVoice] on_phonemes callback error: {e}")
 
-        # Text frames = JSON control events
-        try:
-            data  = json.loads(message)
-        except Exception:
-            return
+    # ------------------------------------------------------------------
+    # AsyncCosyVoiceSession handler interface
+    # ------------------------------------------------------------------
 
-        event = data.get("header", {}).get("event", "")
+    def on_audio_frame(self, data: bytes):
+        # Binary frames = raw PCM audio
+        if self.first_chunk_t is None:
+            self.first_chunk_t = time.time()
+        self.pcm_chunks.append(data)
+        if self.on_audio is not None:
+            try:
+                self.on_audio(data)
+            except Exception as e:
+                print(f"[CosyVoice] on_audio callback error: {e}")
+
+    def on_event(self, session, event: str, data: dict):
+        words = (data.get("payload", {})
+                     .get("output", {})
+                     .get("sentence", {})
+                     .get("words", []))
 
         if event == "task-started":
-            # Send the text to synthesize
-            ws.send(json.dumps({
-                "header": {
-                    "action": "continue-task",
-                    "task_id": task_id,
-                    "streaming": "duplex",
-                },
-                "payload": {"input": {"text": text}},
-            }))
-            # Signal end of input immediately (short text = single message)
-            ws.send(json.dumps({
-                "header": {
-                    "action": "finish-task",
-                    "task_id": task_id,
-                    "streaming": "duplex",
-                },
-                "payload": {"input": {}},
-            }))
+            self.started = True
+            # Send the text, then signal end of input immediately
+            # (short text = single message)
+            session.send({"header": self._header("continue-task"),
+                          "payload": {"input": {"text": self.text}}})
+            session.send({"header": self._header("finish-task"),
+                          "payload": {"input": {}}})
 
         elif event == "result-generated":
-            # Audio data arrives as binary frames (handled above).
-            # This text event just marks a generation checkpoint — ignore.
-            pass
+            # Audio data arrives as binary frames; the event itself may carry
+            # word timestamps for the current sentence.
+            self._collect_words(words)
 
         elif event == "task-finished":
-            w = (data.get("payload", {})
-                     .get("output", {})
-                     .get("sentence", {})
-                     .get("words", []))
-            words.extend(w)
-            ws.close()
+            self._collect_words(words)
+            self._finish()
 
         elif event == "task-failed":
             hdr = data.get("header", {})
-            error_msg[0] = (
-                hdr.get("message") or
-                hdr.get("status_text") or
-                "task-failed (no message)"
-            )
-            ws.close()
-
-    def _on_error(ws, error):
-        # Only record if we don't already have a richer task-failed message
-        if not error_msg[0]:
-            error_msg[0] = str(error)
+            self._finish(hdr.get("message") or hdr.get("status_text") or "task-failed (no message)")
 
-    # ------------------------------------------------------------------
-    # Run WebSocket (blocking)
-    # ------------------------------------------------------------------
-    ws_app = websocket.WebSocketApp(
-        _WS_URL,
-        header={"Authorization": f"Bearer {api_key}"},
-        on_open=_on_open,
-        on_message=_on_message,
-        on_error=_on_error,
-    )
-    ws_app.run_forever()
+    def on_disconnect(self, message: str):
+        self.dropped = True
+        self._finish(message)
 
     # ------------------------------------------------------------------
-    # Error handling
-    # ------------------------------------------------------------------
-    if error_msg[0]:
-        return {
-            "ok":       False,
-            "error":    error_msg[0],
-            "request":  request_info,
-            "elapsed_s": round(time.time() - t0, 3),
-        }
-
-    if not pcm_chunks:
-        return {
-            "ok":       False,
-            "error":    "合成完成但未收到音频数据",
-            "request":  request_info,
-            "elapsed_s": round(time.time() - t0, 3),
-        }
 
-    # ------------------------------------------------------------------
-    # Build WAV from raw PCM
-    # ------------------------------------------------------------------
-    pcm_bytes = b"".join(pcm_chunks)
-    wav_bytes = _build_wav(pcm_bytes)
+    def result(self, t0: float, request_info: dict) -> dict:
+        if self.error:
+            return {
+                "ok":       False,
+                "error":    self.error,
+                "request":  request_info,
+                "elapsed_s": round(time.time() - t0, 3),
+            }
 
-    # ------------------------------------------------------------------
-    # Lip-sync: return phoneme_flat so server.py can run Rhubarb or fall back.
-    # word_timestamp_enabled gives character-level timestamps when supported;
-    # _estimate_phoneme_flat is the last-resort uniform distribution.
-    # ------------------------------------------------------------------
-    if words:
-        phoneme_flat = [
-            {
-                "char":     w.get("text", ""),
-                "phoneme":  "e",
-                "begin_ms": w.get("begin_time", 0),
-                "end_ms":   w.get("end_time",   0),
+        if not self.pcm_chunks:
+            return {
+                "ok":       False,
+                "error":    "合成完成但未收到音频数据",
+                "request":  request_info,
+                "elapsed_s": round(time.time() - t0, 3),
             }
-            for w in words
-            if w.get("end_time", 0) > w.get("begin_time", 0)
-        ]
-    else:
-        phoneme_flat = _estimate_phoneme_flat(text, pcm_bytes)
-
-    return {
-        "ok":            True,
-        "request":       request_info,
-        "audio_base64":  base64.b64encode(wav_bytes).decode(),
-        "audio_size":    len(wav_bytes),
-        "phoneme_flat":  phoneme_flat,
-        "phoneme_count": len(phoneme_flat),
-        "elapsed_s":     round(time.time() - t0, 3),
-    }
+
+        # One join of the PCM frames; the clip views it
+        pcm_bytes = b"".join(self.pcm_chunks)
+        audio     = AudioClip.from_pcm(pcm_bytes, _SAMPLE_RATE, _CHANNELS)
+
+        # Lip-sync: return phoneme_flat so server.py can run Rhubarb or fall back.
+        # word_timestamp_enabled gives character-level timestamps when supported;
+        # _estimate_phoneme_flat is the last-resort uniform distribution.
+        if self.words:
+            phoneme_flat = _words_to_phonemes(sorted(self.words, key=lambda w: w.get("begin_time", 0)))
+        else:
+            phoneme_flat = _estimate_phoneme_flat(self.text, pcm_bytes)
+
+        return {
+            "ok":            True,
+            "request":       request_info,
+            "audio":         audio,
+            "audio_size":    audio.wav_size,
+            "phoneme_flat":  phoneme_flat,
+            "phoneme_count": len(phoneme_flat),
+            "elapsed_s":     round(time.time() - t0, 3),
+            "first_chunk_s": round(self.first_chunk_t - t0, 3) if self.first_chunk_t else None,
+            "streamed":      self.on_audio is not None,
+        }
@@ -0,0 +1,311 @@
+"""
+Native audio → mouth-shape analyzer (in-process Rhubarb replacement).
+
+Classifies 16-bit PCM into the same A–H / X mouth shapes that Rhubarb emits
+(see rhubarb_lipsync._SHAPE_BS), without spawning a process or writing temp
+files. Every step is vectorized over frames with NumPy:
+
+  1. 25 ms Hann-windowed frames every 10 ms
+  2. per frame: RMS level (dBFS), zero-crossing rate, spectral centroid and
+     the share of energy below 1 kHz / above 3 kHz
+  3. level relative to the running peak, so quiet and loud voices classify
+     alike; silence / unvoiced (fricative) / voiced split, then vowel
+     openness from level and centroid
+  4. a 5-frame majority filter and a 40 ms minimum cue length
+
+  Shape  When                                   Typical sounds
+  X      below the silence gate                 pauses
+  A      weak, low-centroid voicing             M / B / P closure, nasals
+  B      unvoiced, very high centroid;          S / T / K, EE / I
+         voiced with a high centroid
+  C      unvoiced, mid-high centroid            SH / CH / Q / X (pinyin)
+  D      loud voicing, centroid ≥ 800 Hz        "a" — wide open
+  E      energy concentrated below 1 kHz        "o" / "u" — rounded
+  F      weak unvoiced noise                    F / H
+  G      weak voicing                           L / R / tongue
+  H      moderate voicing                       relaxed open vowels
+
+The analysis is causal apart from the 2-frame look-ahead of the majority
+filter, so VisemeAnalyzer.feed() can run on PCM chunks as a TTS engine
+streams them; analyze() is feed() over the whole buffer plus flush(), so
+both modes return identical cues.
+
+Cues are (start_ms, shape) tuples, consecutive and covering the whole audio
+like Rhubarb's mouthCues; the last one is always X at the end of the audio.
+"""
+
+import asyncio
+
+import numpy as np
+
+from keyframe_cache import content_hash, keyframe_cache, table_version
+from keyframe_track import KeyframeTrack
+from rhubarb_lipsync import _SHAPE_BS, shape_track
+from audio_clip import as_clip
+
+SHAPES = "XABCDEFGH"
+
+FRAME_MS       = 25
+HOP_MS         = 10
+SMOOTH_FRAMES  = 5      # majority filter width (odd)
+MIN_CUE_FRAMES = 4      # shorter runs are absorbed into the current cue
+
+SILENCE_DBFS   = -55.0  # absolute gate
+SILENCE_REL_DB = -38.0  # gate relative to the running peak
+PEAK_FLOOR_DB  = -30.0  # initial peak, so a quiet lead-in is not over-amplified
+UNVOICED_ZCR_HZ = 3000.0
+UNVOICED_HIGH   = 0.45  # share of energy above 3 kHz
+
+# Bump when the rules in VisemeAnalyzer._classify change
+RULES_VERSION = 1
+
+_X, _A, _B, _C, _D, _E, _F, _G, _H = range(len(SHAPES))
+_HALF = SMOOTH_FRAMES // 2
+
+# Cached keyframes depend on the shape mapping and every analysis parameter
+_CACHE_VERSION = table_version(
+    _SHAPE_BS, RULES_VERSION, FRAME_MS, HOP_MS, SMOOTH_FRAMES, MIN_CUE_FRAMES,
+    SILENCE_DBFS, SILENCE_REL_DB, PEAK_FLOOR_DB, UNVOICED_ZCR_HZ, UNVOICED_HIGH,
+)
+
+
+class VisemeAnalyzer:
+    """
+    Streaming analyzer for one utterance.
+
+    feed() takes PCM chunks (int16 bytes or a NumPy array) and returns the
+    cues that became final; flush() ends the utterance and returns the rest
+    including the closing X. Cue times lag the input by about 50 ms (frame
+    length plus filter look-ahead).
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 1):
+        self.sample_rate = sample_rate
+        self.channels    = channels
+        self.win = max(16, int(sample_rate * FRAME_MS / 1000))
+        self.hop = max(1, int(sample_rate * HOP_MS / 1000))
+
+        self._window  = np.hanning(self.win).astype(np.float32)
+        freqs         = np.fft.rfftfreq(self.win, 1.0 / sample_rate)
+        self._freqs   = freqs.astype(np.float32)
+        self._low     = freqs < 1000.0
+        self._high    = freqs >= 3000.0
+
+        self._samples = np.zeros(0, dtype=np.float32)  # not yet framed
+        self._odd     = b""                             # split int16 sample
+        self._total   = 0                               # samples fed
+        self._peak_db = PEAK_FLOOR_DB
+        self._raw     = np.full(_HALF, _X, dtype=np.int8)  # labels awaiting smoothing
+        self._frames  = 0                               # smoothed frames so far
+        self._shape   = None                            # shape of the last cue
+        self._cand    = None                            # [shape, start frame, length]
+        self._done    = False
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self._total * 1000 / self.sample_rate)
+
+    # ------------------------------------------------------------------
+    # Input
+    # ------------------------------------------------------------------
+
+    def _to_mono(self, pcm) -> np.ndarray:
+        if isinstance(pcm, (bytes, bytearray, memoryview)):
+            data = self._odd + bytes(pcm)
+            cut  = len(data) - len(data) % (2 * self.channels)
+            self._odd = data[cut:]
+            x = np.frombuffer(data[:cut], dtype="<i2").astype(np.float32) / 32768.0
+        else:
+            x = np.asarray(pcm)
+            x = (x.astype(np.float32) / 32768.0 if x.dtype.kind == "i"
+                 else x.astype(np.float32))
+        if self.channels > 1:
+            x = x.reshape(-1, self.channels).mean(axis=1)
+        return x.ravel()
+
+    def feed(self, pcm) -> list[tuple[int, str]]:
+        """Add PCM; return the cues that are now final."""
+        if self._done:
+            raise RuntimeError("VisemeAnalyzer.feed() after flush()")
+        x = self._to_mono(pcm)
+        self._total += len(x)
+        self._samples = np.concatenate((self._samples, x)) if len(self._samples) else x
+
+        n = 0 if len(self._samples) < self.win else 1 + (len(self._samples) - self.win) // self.hop
+        if n == 0:
+            return []
+        frames = np.lib.stride_tricks.sliding_window_view(self._samples, self.win)[::self.hop][:n]
+        labels = self._classify(frames)
+        self._samples = self._samples[n * self.hop:].copy()
+        return self._segment(self._smooth(labels))
+
+    def flush(self) -> list[tuple[int, str]]:
+        """End of input: analyze the tail and return the remaining cues (ending in X)."""
+        if self._done:
+            return []
+        self._done = True
+
+        labels = np.zeros(0, dtype=np.int8)
+        if len(self._samples) and (len(self._samples) > self.win - self.hop or self._total < self.win):
+            tail = np.zeros(self.win, dtype=np.float32)
+            tail[:min(self.win, len(self._samples))] = self._samples[:self.win]
+            labels = self._classify(tail[None, :])
+        self._samples = np.zeros(0, dtype=np.float32)
+
+        cues = self._segment(self._smooth(np.concatenate((labels, np.full(_HALF, _X, dtype=np.int8)))))
+        end_ms = self.duration_ms
+        if self._shape is None or self._shape != "X":
+            if cues and cues[-1][0] >= end_ms:
+                cues[-1] = (cues[-1][0], "X")
+            else:
+                cues.append((end_ms, "X"))
+            self._shape = "X"
+        return cues
+
+    # ------------------------------------------------------------------
+    # Analysis
+    # ------------------------------------------------------------------
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        """Per-frame shape indices for an (n, win) frame matrix."""
+        power  = np.einsum("ij,ij->i", frames, frames) / self.win
+        db     = 10.0 * np.log10(power + 1e-10)
+        peak   = np.maximum.accumulate(np.concatenate(([self._peak_db], db)))[1:]
+        self._peak_db = float(peak[-1])
+        rel    = db - peak
+
+        signs  = np.signbit(frames)
+        zcr_hz = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) * (self.sample_rate / self.win)
+
+        spec     = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2
+        total    = spec.sum(axis=1) + 1e-12
+        centroid = spec @ self._freqs / total
+        low      = spec[:, self._low].sum(axis=1) / total
+        high     = spec[:, self._high].sum(axis=1) / total
+
+        silent   = (db < SILENCE_DBFS) | (rel < SILENCE_REL_DB)
+        unvoiced = ~silent & ((zcr_hz > UNVOICED_ZCR_HZ) | (high > UNVOICED_HIGH))
+        voiced   = ~silent & ~unvoiced
+
+        # First matching condition wins
+        return np.select(
+            [
+                silent,
+                unvoiced & (rel < -28.0),
+                unvoiced & (centroid >= 4500.0),
+                unvoiced,
+                voiced & (rel < -24.0) & (centroid < 700.0),
+                voiced & (low > 0.8) & (centroid < 800.0),
+                voiced & (rel > -9.0) & (centroid >= 800.0),
+                voiced & (centroid > 2000.0),
+                voiced & (rel < -16.0),
+            ],
+            [_X, _F, _B, _C, _A, _E, _D, _B, _G],
+            default=_H,
+        ).astype(np.int8)
+
+    def _smooth(self, labels: np.ndarray) -> np.ndarray:
+        """Majority filter with _HALF frames of context carried between calls."""
+        buf = np.concatenate((self._raw, labels))
+        count = len(buf) - 2 * _HALF
+        if count <= 0:
+            self._raw = buf
+            return np.zeros(0, dtype=np.int8)
+        self._raw = buf[-2 * _HALF:]
+
+        onehot = np.zeros((len(buf) + 1, len(SHAPES)), dtype=np.float32)
+        onehot[np.arange(1, len(buf) + 1), buf] = 1.0
+        csum   = np.cumsum(onehot, axis=0)
+        votes  = csum[SMOOTH_FRAMES:SMOOTH_FRAMES + count] - csum[:count]
+        center = buf[_HALF:_HALF + count]
+        votes[np.arange(count), center] += 0.5   # ties keep the frame's own label
+        return votes.argmax(axis=1).astype(np.int8)
+
+    def _segment(self, labels: np.ndarray) -> list[tuple[int, str]]:
+        """Turn smoothed frame labels into cues, absorbing runs shorter than MIN_CUE_FRAMES."""
+        cues  = []
+        start = self._frames
+        self._frames += len(labels)
+        if not len(labels):
+            return cues
+
+        bounds = np.flatnonzero(np.diff(labels)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends   = np.concatenate((bounds, [len(labels)]))
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            shape = SHAPES[labels[s]]
+            if self._shape is None:
+                self._shape = shape
+                cues.append((0, shape))
+                continue
+            if shape == self._shape:
+                self._cand = None
+                continue
+            if self._cand is not None and self._cand[0] == shape and self._cand[1] + self._cand[2] == start + s:
+                self._cand[2] += e - s
+            else:
+                self._cand = [shape, start + s, e - s]
+            if self._cand[2] >= MIN_CUE_FRAMES:
+                cues.append((self._cand[1] * HOP_MS, shape))
+                self._shape, self._cand = shape, None
+        return cues
+
+
+def analyze(pcm, sample_rate: int, channels: int = 1) -> list[tuple[int, str]]:
+    """Whole-buffer analysis: all cues for one utterance."""
+    analyzer = VisemeAnalyzer(sample_rate, channels)
+    return analyzer.feed(pcm) + analyzer.flush()
+
+
+def _clip_input(audio) -> tuple:
+    """(AudioClip, content digest), or (None, None) when the audio cannot be read."""
+    try:
+        clip = as_clip(audio)
+    except ValueError as e:
+        print(f"[Viseme] cannot read WAV: {e}")
+        return None, None
+    if clip is None:
+        return None, None
+    return clip, content_hash(*clip.wav_parts())
+
+
+def _analyze_clip(clip, digest: str) -> tuple[KeyframeTrack, int]:
+    analyzer = VisemeAnalyzer(clip.samplerate, clip.channels)
+    track = shape_track(analyzer.feed(clip.samples) + analyzer.flush())
+    keyframe_cache().put("native", _CACHE_VERSION, digest, track, analyzer.duration_ms)
+    return track, analyzer.duration_ms
+
+
+def extract_track(audio) -> tuple[KeyframeTrack, int] | tuple[None, int]:
+    """
+    Drop-in for rhubarb_lipsync.extract_track(): (track, duration_ms), or
+    (None, 0) when the audio (an AudioClip or WAV bytes) cannot be read.
+    Results are cached by audio content (keyframe_cache, kind "native").
+    """
+    clip, digest = _clip_input(audio)
+    if clip is None:
+        return None, 0
+    hit = keyframe_cache().get("native", _CACHE_VERSION, digest)
+    if hit is not None:
+        return hit
+    return _analyze_clip(clip, digest)
+
+
+async def extract_track_async(audio) -> tuple[KeyframeTrack, int] | tuple[None, int]:
+    """
+    extract_track() for event-loop callers: a memory-tier hit returns inline;
+    disk reads, the analysis and the cache write run in a thread.
+    """
+    clip, digest = _clip_input(audio)
+    if clip is None:
+        return None, 0
+    hit = await keyframe_cache().get_async("native", _CACHE_VERSION, digest)
+    if hit is not None:
+        return hit
+    return await asyncio.to_thread(_analyze_clip, clip, digest)
+
+
+def extract_keyframes(audio) -> tuple[list[dict], int] | tuple[None, int]:
+    """extract_track() in the {"time_ms", "blendshapes"} dict-list format."""
+    track, duration_ms = extract_track(audio)
+    return (track.to_keyframes(), duration_ms) if track is not None else (None, 0)
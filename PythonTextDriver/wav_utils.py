@@ -0,0 +1,53 @@
+"""
+WAV helpers shared by the TTS engines.
+
+Both ISI (in streaming mode) and CosyVoice deliver raw 16-bit PCM; this wraps
+it in a RIFF header so sessions, Rhubarb and the browser can use it as a WAV;
+parse_wav() goes the other way for the in-process viseme analyzer.
+wav_header() alone lets AudioClip hash or write a WAV without joining the
+header and the samples into a new buffer.
+"""
+
+import io
+import struct
+import wave
+
+
+def wav_header(data_size: int, sample_rate: int, channels: int = 1, bits: int = 16,
+               audio_format: int = 1) -> bytes:
+    """The standard 44-byte WAV/RIFF header for data_size bytes of samples (format 1 PCM, 3 float)."""
+    byte_rate   = sample_rate * channels * bits // 8
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size,
+        b"WAVE",
+        b"fmt ", 16,
+        audio_format,
+        channels,
+        sample_rate,
+        byte_rate,
+        block_align,
+        bits,
+        b"data", data_size,
+    )
+
+
+def build_wav(pcm_bytes: bytes, sample_rate: int, channels: int = 1, bits: int = 16) -> bytes:
+    """Wrap raw PCM bytes in a standard 44-byte WAV/RIFF header."""
+    return wav_header(len(pcm_bytes), sample_rate, channels, bits) + pcm_bytes
+
+
+def parse_wav(wav_bytes: bytes) -> tuple[bytes, int, int]:
+    """
+    Split a 16-bit PCM WAV into (pcm_bytes, sample_rate, channels).
+
+    Raises ValueError for anything that is not 16-bit PCM.
+    """
+    try:
+        with wave.open(io.BytesIO(wav_bytes), "rb") as w:
+            if w.getsampwidth() != 2:
+                raise ValueError(f"unsupported sample width {w.getsampwidth() * 8} bit")
+            return w.readframes(w.getnframes()), w.getframerate(), w.getnchannels()
+    except (wave.Error, EOFError) as e:
+        raise ValueError(str(e)) from None
@@ -1,6 +1,7 @@
 using System;
 using System.Collections.Concurrent;
 using System.Collections.Generic;
+using System.Globalization;
 using System.Net;
 using System.Net.Sockets;
 using System.Text;
@@ -19,6 +20,17 @@ namespace VibeVtuber.FaceTracking
     /// After resetDelay seconds without incoming data the component stops
     /// overriding parameters, allowing face-capture to resume naturally.
     ///
+    /// Track protocol (playback.lipsync_protocol = "track"): instead of one
+    /// "lip_sync" packet per keyframe, SpeechPlayer sends the whole keyframe
+    /// track up front as "lip_track" parts stamped with startTime (sender
+    /// clock of time_ms 0). Each datagram is timestamped on arrival; startTime
+    /// is mapped onto the local Stopwatch clock via the smallest
+    /// (arrival - monoTime) seen for the track, and the track is sampled
+    /// locally every frame, so sender jitter never reaches the mouth. While
+    /// a track plays the mouth is held without the resetDelay release;
+    /// "lip_clock" moves its start, and a "reset" with a trackId only drops
+    /// that track and older ones (a chained successor keeps playing).
+    ///
     /// Setup:
     ///   1. Attach this component to the same GameObject as Live2DFaceController.
     ///   2. Configure mouthMappings to match your Live2D model's parameter IDs
@@ -50,6 +62,11 @@ namespace VibeVtuber.FaceTracking
         [Tooltip("Seconds of silence before face-capture resumes control")]
         [SerializeField] private float resetDelay = 0.3f;
 
+        [BoxGroup("Timing")]
+        [LabelText("Track Lead (ms)")]
+        [Tooltip("Sample lip_track tracks this far ahead to offset rendering latency")]
+        [SerializeField] private float trackLeadMs = 0f;
+
         // ── Parameter Mappings ────────────────────────────────────────────────
 
         [Title("Mouth Parameter Mappings",
@@ -90,10 +107,15 @@ namespace VibeVtuber.FaceTracking
         [ReadOnly]
         [SerializeField] private int totalMessages = 0;
 
+        [FoldoutGroup("Status")]
+        [LabelText("Active Track")]
+        [ReadOnly]
+        [SerializeField] private int activeTrackId = -1;
+
         // ── Internals ─────────────────────────────────────────────────────────
 
         private Live2DFaceController faceController;
-        private ConcurrentQueue<string> messageQueue = new ConcurrentQueue<string>();
+        private ConcurrentQueue<Datagram> messageQueue = new ConcurrentQueue<Datagram>();
         private UdpClient udpClient;
         private Thread receiveThread;
         private bool isRunning = false;
@@ -105,6 +127,10 @@ namespace VibeVtuber.FaceTracking
 
         private float lastDataTime = -999f;
 
+        // lip_track tracks by trackId (the playing one and any chained successor)
+        private Dictionary<int, LipTrack> lipTracks = new Dictionary<int, LipTrack>();
+        private List<int> staleTrackIds = new List<int>();
+
         // ARKit keys that this component cares about (determines which incoming
         // blendshapes to accept and which to pass through)
         private HashSet<string> watchedKeys;
@@ -173,8 +199,13 @@ namespace VibeVtuber.FaceTracking
                 udpClient = null;
             }
             while (messageQueue.TryDequeue(out _)) { }
+            lipTracks.Clear();
         }
 
+        /// <summary>Local monotonic clock (seconds) used to map lip_track start times.</summary>
+        private static double LocalClock() =>
+            System.Diagnostics.Stopwatch.GetTimestamp() / (double)System.Diagnostics.Stopwatch.Frequency;
+
         private void ReceiveLoop()
         {
             IPEndPoint remote = new IPEndPoint(IPAddress.Any, 0);
@@ -183,7 +214,10 @@ namespace VibeVtuber.FaceTracking
                 try
                 {
                     byte[] data = udpClient.Receive(ref remote);
-                    messageQueue.Enqueue(Encoding.UTF8.GetString(data));
+                    // Timestamp here, not in LateUpdate, so the clock mapping
+                    // is not off by up to a frame
+                    double arrival = LocalClock();
+                    messageQueue.Enqueue(new Datagram { json = Encoding.UTF8.GetString(data), arrival = arrival });
                 }
                 catch (SocketException e)
                 {
@@ -205,12 +239,16 @@ namespace VibeVtuber.FaceTracking
             if (faceController == null) return;
 
             // Process all queued messages
-            while (messageQueue.TryDequeue(out string json))
+            while (messageQueue.TryDequeue(out Datagram datagram))
             {
-                ProcessMessage(json);
+                ProcessMessage(datagram.json, datagram.arrival);
                 totalMessages++;
             }
 
+            // A playing lip_track keeps the data fresh until its last keyframe
+            if (SampleLipTrack())
+                lastDataTime = Time.time;
+
             // Apply overrides only while data is fresh
             float timeSinceData = Time.time - lastDataTime;
             if (timeSinceData < resetDelay && pendingBlendshapes.Count > 0)
@@ -264,17 +302,121 @@ namespace VibeVtuber.FaceTracking
                 faceController.SetParameter(id, 0f);
         }
 
+        // ── lip_track sampling ────────────────────────────────────────────────
+
+        /// <summary>
+        /// Samples the newest started lip_track at the current local time into
+        /// pendingBlendshapes. Returns false when no track covers this frame.
+        /// </summary>
+        private bool SampleLipTrack()
+        {
+            activeTrackId = -1;
+            if (lipTracks.Count == 0) return false;
+
+            double now = LocalClock() + trackLeadMs / 1000.0;
+            LipTrack active = null;
+            foreach (var track in lipTracks.Values)
+            {
+                if (track.HasStart && track.StartLocal <= now &&
+                    (active == null || track.StartLocal > active.StartLocal))
+                    active = track;
+            }
+
+            // Tracks superseded by a newer one, or long finished, are dropped
+            staleTrackIds.Clear();
+            foreach (var track in lipTracks.Values)
+            {
+                if (active != null && track != active && track.StartLocal < active.StartLocal)
+                    staleTrackIds.Add(track.id);
+                else if (track.HasStart &&
+                         (now - track.StartLocal) * 1000.0 > track.EndMs + resetDelay * 1000.0 + 5000.0)
+                    staleTrackIds.Add(track.id);
+            }
+            foreach (int id in staleTrackIds)
+                lipTracks.Remove(id);
+
+            if (active == null || !lipTracks.ContainsKey(active.id)) return false;
+            if (!active.TrySample((now - active.StartLocal) * 1000.0, out TrackPart part, out int row))
+                return false;
+
+            int n = active.channels.Length;
+            for (int c = 0; c < n; c++)
+            {
+                if (watchedKeys.Contains(active.channels[c]))
+                    pendingBlendshapes[active.channels[c]] = part.values[row * n + c] / 255f;
+            }
+            activeTrackId = active.id;
+            return true;
+        }
+
+        private void ProcessLipTrack(string json, double arrival)
+        {
+            int id = (int)ExtractNumberField(json, "trackId");
+            if (!lipTracks.TryGetValue(id, out LipTrack track))
+            {
+                track = new LipTrack
+                {
+                    id       = id,
+                    channels = ExtractStringArray(json, "channels"),
+                    parts    = (int)ExtractNumberField(json, "parts"),
+                };
+                lipTracks[id] = track;
+            }
+            track.Observe(ExtractNumberField(json, "startTime"), arrival - ExtractNumberField(json, "monoTime"));
+
+            int index = (int)ExtractNumberField(json, "part");
+            if (track.received.ContainsKey(index)) return;
+            byte[] timeBytes = Convert.FromBase64String(ExtractStringField(json, "times"));
+            var times = new int[timeBytes.Length / 4];
+            Buffer.BlockCopy(timeBytes, 0, times, 0, times.Length * 4);   // little-endian int32
+            track.received[index] = new TrackPart
+            {
+                times  = times,
+                values = Convert.FromBase64String(ExtractStringField(json, "values")),
+            };
+        }
+
         // ── Message parsing ───────────────────────────────────────────────────
 
-        private void ProcessMessage(string json)
+        private void ProcessMessage(string json, double arrival)
         {
             try
             {
                 string msgType = ExtractStringField(json, "type");
                 lastMsgType = msgType;
 
+                if (msgType == "lip_track")
+                {
+                    ProcessLipTrack(json, arrival);
+                    return;
+                }
+
+                if (msgType == "lip_clock")
+                {
+                    if (lipTracks.TryGetValue((int)ExtractNumberField(json, "trackId"), out LipTrack track))
+                        track.Observe(ExtractNumberField(json, "startTime"),
+                                      arrival - ExtractNumberField(json, "monoTime"));
+                    return;
+                }
+
                 if (msgType == "reset")
                 {
+                    double upTo = ExtractNumberField(json, "trackId");
+                    if (double.IsNaN(upTo))
+                    {
+                        lipTracks.Clear();
+                    }
+                    else
+                    {
+                        staleTrackIds.Clear();
+                        foreach (int id in lipTracks.Keys)
+                            if (id <= (int)upTo) staleTrackIds.Add(id);
+                        foreach (int id in staleTrackIds)
+                            lipTracks.Remove(id);
+                        // A chained successor track already received keeps the mouth
+                        if (lipTracks.Count > 0) return;
+                    }
+
                     // Explicitly zero all mouth params before releasing override,
                     // so the model doesn't freeze at the last non-zero value.
                     ApplyZeros();
@@ -314,6 +456,38 @@ namespace VibeVtuber.FaceTracking
             return json.Substring(qs + 1, qe - qs - 1);
         }
 
+        private static double ExtractNumberField(string json, string fieldName)
+        {
+            int idx = json.IndexOf($"\"{fieldName}\":", StringComparison.Ordinal);
+            if (idx < 0) return double.NaN;
+            int vs = idx + fieldName.Length + 3;
+            int ve = vs;
+            while (ve < json.Length && json[ve] != ',' && json[ve] != '}') ve++;
+            return double.TryParse(json.Substring(vs, ve - vs).Trim(),
+                NumberStyles.Float, CultureInfo.InvariantCulture, out double val) ? val : double.NaN;
+        }
+
+        private static string[] ExtractStringArray(string json, string fieldName)
+        {
+            var items = new List<string>();
+            int idx = json.IndexOf($"\"{fieldName}\":", StringComparison.Ordinal);
+            if (idx < 0) return items.ToArray();
+            int open  = json.IndexOf('[', idx);
+            int close = open < 0 ? -1 : json.IndexOf(']', open);
+            if (close < 0) return items.ToArray();
+            int pos = open + 1;
+            while (true)
+            {
+                int qs = json.IndexOf('"', pos);
+                if (qs < 0 || qs > close) break;
+                int qe = json.IndexOf('"', qs + 1);
+                if (qe < 0 || qe > close) break;
+                items.Add(json.Substring(qs + 1, qe - qs - 1));
+                pos = qe + 1;
+            }
+            return items.ToArray();
+        }
+
         private static Dictionary<string, float> ParseBlendshapes(string json)
         {
             var dict = new Dictionary<string, float>();
@@ -365,6 +539,78 @@ namespace VibeVtuber.FaceTracking
         }
     }
 
+    /// <summary>A received datagram and its local arrival time (LocalClock seconds).</summary>
+    internal struct Datagram
+    {
+        public string json;
+        public double arrival;
+    }
+
+    /// <summary>One part of a lip_track: keyframe times (ms) and uint8 values, row-major.</summary>
+    internal sealed class TrackPart
+    {
+        public int[]  times;
+        public byte[] values;
+    }
+
+    /// <summary>
+    /// A lip_track reassembled from its parts. Parts are split by time, so
+    /// in part order their keyframes are in time order.
+    /// </summary>
+    internal sealed class LipTrack
+    {
+        public int      id;
+        public string[] channels;
+        public int      parts;                        // 0 = open-ended (streamed)
+        public readonly SortedList<int, TrackPart> received = new SortedList<int, TrackPart>();
+
+        private double startTime = double.NaN;        // sender clock of time_ms 0
+        private double offset    = double.MaxValue;   // min(local arrival - sender monoTime)
+
+        public bool   HasStart   => !double.IsNaN(startTime);
+        public double StartLocal => startTime + offset;
+
+        public int EndMs
+        {
+            get
+            {
+                for (int i = received.Count - 1; i >= 0; i--)
+                {
+                    var times = received.Values[i].times;
+                    if (times.Length > 0) return times[times.Length - 1];
+                }
+                return 0;
+            }
+        }
+
+        public void Observe(double start, double arrivalOffset)
+        {
+            if (double.IsNaN(start) || double.IsNaN(arrivalOffset)) return;
+            startTime = start;
+            if (arrivalOffset < offset) offset = arrivalOffset;
+        }
+
+        /// <summary>The keyframe showing at tMs: the latest one at or before it, until the last.</summary>
+        public bool TrySample(double tMs, out TrackPart part, out int row)
+        {
+            part = null;
+            row  = -1;
+            if (tMs > EndMs) return false;
+            int key = (int)Math.Floor(tMs);
+            foreach (var candidate in received.Values)
+            {
+                if (candidate.times.Length == 0 || candidate.times[0] > key) break;
+                part = candidate;
+            }
+            if (part == null) return false;
+            row = Array.BinarySearch(part.times, key);
+            if (row < 0) row = ~row - 1;
+            // Several keyframes can share a time; the last one wins, as with lip_sync packets
+            while (row + 1 < part.times.Length && part.times[row + 1] <= key) row++;
+            return true;
+        }
+    }
+
     /// <summary>
     /// Configures one ARKit blendshape key → Live2D parameter ID mapping
     /// for the TextDrivenController.
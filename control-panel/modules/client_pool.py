@@ -0,0 +1,195 @@
+"""
+Process-wide registry of pooled upstream HTTP clients.
+
+Each slot ("qwen" OpenAI client, "dashscope" REST client, ...) holds one
+keep-alive client built for a (base URL, credential) fingerprint. Callers ask
+for a slot with the current config values on every request; the existing
+client is reused while the fingerprint matches and rebuilt when the API key or
+base URL changes, so DNS / TCP / TLS setup is paid once per config instead of
+once per request.
+
+Connection reuse is measured with httpcore's trace extension: every request
+with a response counts, and only those that had to open a TCP connection
+count as "connects".
+"""
+
+import asyncio
+import hashlib
+import threading
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60.0)
+
+
+def _fingerprint(base_url: str, credential: str) -> tuple:
+    # The credential only enters the key as a short digest so stats/logs never hold it
+    digest = hashlib.sha256(credential.encode("utf-8")).hexdigest()[:12] if credential else ""
+    return base_url.rstrip("/"), digest
+
+
+class _Slot:
+    """One pooled client plus its reuse counters."""
+
+    def __init__(self, name: str, fingerprint: tuple, client, http):
+        self.name        = name
+        self.fingerprint = fingerprint
+        self.warm_url    = fingerprint[0]
+        self.client      = client   # what callers use (OpenAI or httpx client)
+        self.http        = http     # the underlying httpx client
+        self.requests    = 0
+        self.connects    = 0
+        self.tls         = 0
+        self._lock       = threading.Lock()
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            self._count("connects")
+        elif event == "connection.start_tls.complete":
+            self._count("tls")
+
+    async def atrace(self, event: str, info: dict):
+        self.trace(event, info)
+
+    def stats(self) -> dict:
+        reused = max(0, self.requests - self.connects)
+        return {
+            "base_url":   self.fingerprint[0],
+            "requests":   self.requests,
+            "connects":   self.connects,
+            "tls":        self.tls,
+            "reused":     reused,
+            "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+class ClientPool:
+    """Shared keep-alive clients keyed by slot name and (base URL, credential)."""
+
+    def __init__(self, limits: httpx.Limits = DEFAULT_LIMITS):
+        self.limits   = limits
+        self.rebuilds = 0
+        self._slots: dict[str, _Slot] = {}
+        self._retired: list = []   # replaced httpx clients, closed on aclose()
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, base_url: str, credential: str, build) -> _Slot:
+        fingerprint = _fingerprint(base_url, credential)
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is not None and slot.fingerprint == fingerprint:
+                return slot
+            if slot is not None:
+                # Config changed: in-flight requests finish on the old client
+                self._retired.append(slot.http)
+                self.rebuilds += 1
+                print(f"[ClientPool] {name}: config changed, rebuilding client")
+            slot = build(name, fingerprint)
+            self._slots[name] = slot
+            return slot
+
+    def openai(self, base_url: str, api_key: str, name: str = "qwen") -> OpenAI:
+        """Sync OpenAI-compatible client (thread-safe; used from executor threads)."""
+        def build(name, fingerprint):
+            slot = _Slot(name, fingerprint, None, None)
+            slot.http = httpx.Client(
+                limits=self.limits,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                event_hooks={"request":  [lambda request: self._on_request(slot, request)],
+                             "response": [lambda response: slot._count("requests")]},
+            )
+            slot.client = OpenAI(api_key=api_key, base_url=base_url, http_client=slot.http)
+            return slot
+
+        return self._get(name, base_url, api_key, build).client
+
+    def openai_async(self, base_url: str, api_key: str, name: str = "qwen_async") -> AsyncOpenAI:
+        """AsyncOpenAI client for event-loop callers (no executor thread per request)."""
+        def build(name, fingerprint):
+            slot = _Slot(name, fingerprint, None, None)
+
+            async def on_request(request):
+                self._on_request(slot, request, asynchronous=True)
+
+            async def on_response(response):
+                slot._count("requests")
+
+            slot.http = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                event_hooks={"request": [on_request], "response": [on_response]},
+            )
+            slot.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=slot.http)
+            return slot
+
+        return self._get(name, base_url, api_key, build).client
+
+    def http(self, base_url: str, api_key: str = "", name: str = "dashscope") -> httpx.AsyncClient:
+        """Async httpx client for REST calls; sends a Bearer header when api_key is set."""
+        def build(name, fingerprint):
+            slot = _Slot(name, fingerprint, None, None)
+
+            async def on_request(request):
+                self._on_request(slot, request, asynchronous=True)
+
+            async def on_response(response):
+                slot._count("requests")
+
+            headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+            slot.http = slot.client = httpx.AsyncClient(
+                base_url=base_url,
+                headers=headers,
+                limits=self.limits,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                event_hooks={"request": [on_request], "response": [on_response]},
+            )
+            return slot
+
+        return self._get(name, base_url, api_key, build).client
+
+    @staticmethod
+    def _on_request(slot: _Slot, request: httpx.Request, asynchronous: bool = False):
+        request.extensions["trace"] = slot.atrace if asynchronous else slot.trace
+
+    async def warm(self, name: str):
+        """
+        Open a connection for a slot ahead of the first real request. Any HTTP
+        response (even 404) leaves a TCP + TLS connection in the keep-alive pool.
+        """
+        slot = self._slots.get(name)
+        if slot is None:
+            return
+        try:
+            if isinstance(slot.http, httpx.AsyncClient):
+                await slot.http.head(slot.warm_url)
+            else:
+                await asyncio.get_running_loop().run_in_executor(None, slot.http.head, slot.warm_url)
+        except httpx.HTTPError as e:
+            print(f"[ClientPool] {name}: warm-up failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            slots = dict(self._slots)
+        return {
+            "clients":  {name: slot.stats() for name, slot in slots.items()},
+            "rebuilds": self.rebuilds,
+        }
+
+    async def aclose(self):
+        with self._lock:
+            clients = self._retired + [slot.http for slot in self._slots.values()]
+            self._slots.clear()
+            self._retired = []
+        for client in clients:
+            try:
+                if isinstance(client, httpx.AsyncClient):
+                    await client.aclose()
+                else:
+                    client.close()
+            except Exception:
+                pass
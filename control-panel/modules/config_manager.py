@@ -13,6 +13,13 @@ PANEL_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..
 
 _PANEL_DEFAULTS = {
     "unity_app_path": "",
+    "face_preview_hz": 10,
+    "tts_cache_memory_mb": 32,
+    "tts_cache_disk_mb": 256,
+    "analysis_cache_entries": 512,
+    "analysis_cache_ttl_s": 3600,
+    "keyframe_cache_entries": 1024,
+    "keyframe_cache_disk_entries": 8192,
 }
 
 
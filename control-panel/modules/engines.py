@@ -0,0 +1,394 @@
+"""
+Async-native TTS engines for the control panel.
+
+The PythonTextDriver modules hold the protocol details (tts_isi, tts_cosyvoice);
+the engines here drive them on the server's event loop:
+
+  IsiEngine        — the NLS SpeechSynthesizer protocol over `websockets`,
+                     token and concurrency cap from isi_session
+  CosyVoiceEngine  — DashScope duplex tasks over pooled `websockets`
+                     connections (AsyncSessionPool), one reader task per socket.
+                     Binary PCM frames carry no task_id, so a socket runs one
+                     task at a time; the pool opens another when all are busy
+                     (sentence lookahead) and keeps up to max_idle warm.
+
+Both expose `sample_rate` and
+
+    await engine.synthesize(text, on_audio=None, on_phonemes=None) -> dict
+
+returning {ok, audio (AudioClip), audio_size, phoneme_flat, phoneme_count,
+elapsed_s, first_chunk_s, streamed, request} or {ok: False, error, request}.
+on_audio / on_phonemes are coroutine functions and are awaited, so a full
+playback ring applies back-pressure without blocking the loop. Cancelling
+the caller (e.g. a request deadline via asyncio.wait_for) closes the
+affected socket.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+
+from websockets.asyncio.client import connect as ws_connect
+from websockets.exceptions import WebSocketException
+
+from isi_session import session_manager as isi_session_manager
+from tts_isi import NLS_URL, STREAM_SAMPLE_RATE as ISI_SAMPLE_RATE, _subtitles_to_phonemes
+from tts_cosyvoice import (SAMPLE_RATE as COSY_SAMPLE_RATE, TASK_TIMEOUT_S, WS_URL as COSY_WS_URL,
+                           _SynthesisTask, _extract_model)
+from audio_clip import AudioClip
+
+CONNECT_TIMEOUT_S = 10.0
+PING_INTERVAL_S   = 20
+PING_TIMEOUT_S    = 10
+MAX_IDLE_SESSIONS = 2
+ISI_TIMEOUT_S     = 30.0
+
+
+def _failure(error: str, request_info: dict, t0: float) -> dict:
+    return {"ok": False, "error": error, "request": request_info,
+            "elapsed_s": round(time.time() - t0, 3)}
+
+
+# ---------------------------------------------------------------------------
+# ISI
+# ---------------------------------------------------------------------------
+
+class IsiEngine:
+    """Aliyun ISI synthesis with phoneme timestamps, one gateway socket per task."""
+
+    sample_rate = ISI_SAMPLE_RATE
+
+    def __init__(self, appkey: str, ak_id: str, ak_secret: str,
+                 voice: str = "siyue", url: str = NLS_URL):
+        self.appkey  = appkey
+        self.voice   = voice
+        self.url     = url
+        self.session = isi_session_manager(ak_id, ak_secret)
+
+    def _start_message(self, text: str, streaming: bool) -> dict:
+        return {
+            "header": {
+                "message_id": uuid.uuid4().hex,
+                "task_id":    uuid.uuid4().hex,
+                "namespace":  "SpeechSynthesizer",
+                "name":       "StartSynthesis",
+                "appkey":     self.appkey,
+            },
+            "payload": {
+                "text":        text,
+                "voice":       self.voice,
+                "format":      "pcm" if streaming else "wav",
+                "sample_rate": ISI_SAMPLE_RATE,
+                "volume":      50,
+                "speech_rate": 0,
+                "pitch_rate":  0,
+                "enable_subtitle":          True,
+                "enable_phoneme_timestamp": True,
+            },
+            "context": {"sdk": {"name": "nls-python-sdk", "version": "0.0.1", "language": "python"}},
+        }
+
+    async def synthesize(self, text: str, on_audio=None, on_phonemes=None,
+                         timeout: float = ISI_TIMEOUT_S) -> dict:
+        t0 = time.time()
+        streaming = on_audio is not None
+        request_info = {"voice": self.voice, "text": text, "text_length": len(text), "url": self.url}
+
+        try:
+            token = await self.session.atoken()
+        except Exception as e:
+            return _failure(f"获取 Token 失败: {e}", request_info, t0)
+
+        audio_chunks: list[bytes] = []
+        subtitles: list[dict]     = []
+        emitted: set  = set()     # (begin_ms, phoneme) already passed to on_phonemes
+        first_chunk_t = None
+        completed     = False
+
+        async def emit_phonemes(subs):
+            if on_phonemes is None or not subs:
+                return
+            fresh = []
+            for ph in _subtitles_to_phonemes(subs):
+                key = (ph["begin_ms"], ph["phoneme"])
+                if key not in emitted:
+                    emitted.add(key)
+                    fresh.append(ph)
+            if fresh:
+                await on_phonemes(fresh)
+
+        try:
+            async with self.session.aslot():
+                async with ws_connect(self.url, additional_headers={"X-NLS-Token": token},
+                                      open_timeout=CONNECT_TIMEOUT_S, max_size=None) as ws:
+                    await ws.send(json.dumps(self._start_message(text, streaming)))
+                    async with asyncio.timeout(timeout):
+                        async for message in ws:
+                            if isinstance(message, bytes):
+                                if first_chunk_t is None:
+                                    first_chunk_t = time.time()
+                                audio_chunks.append(message)
+                                if streaming:
+                                    await on_audio(message)
+                                continue
+
+                            data   = json.loads(message)
+                            header = data.get("header", {})
+                            name   = header.get("name")
+                            subs   = data.get("payload", {}).get("subtitles", [])
+                            if name == "MetaInfo":
+                                subtitles.extend(subs)
+                                await emit_phonemes(subs)
+                            elif name == "SynthesisCompleted":
+                                if subs:
+                                    subtitles.extend(subs)
+                                    await emit_phonemes(subs)
+                                completed = True
+                                break
+                            elif name == "TaskFailed":
+                                return _failure(header.get("status_text") or message, request_info, t0)
+        except TimeoutError as e:
+            return _failure(str(e) or f"ISI 合成超时（{timeout:g}s）", request_info, t0)
+        except (OSError, WebSocketException) as e:
+            return _failure(str(e), request_info, t0)
+
+        audio_bytes = b"".join(audio_chunks)
+        if not completed:
+            return _failure("连接被服务器关闭，未收到音频。请检查：① AppKey 是否正确 ② ISI 项目是否已开通 TTS 服务 ③ AccessKey 是否有 ISI 权限",
+                            request_info, t0)
+        if not audio_bytes:
+            return _failure("合成完成但未收到音频数据", request_info, t0)
+
+        phoneme_flat = _subtitles_to_phonemes(subtitles)
+        try:
+            audio = (AudioClip.from_pcm(audio_bytes, ISI_SAMPLE_RATE) if streaming
+                     else AudioClip.from_wav(audio_bytes))
+        except ValueError as e:
+            return _failure(f"无法解析合成音频: {e}", request_info, t0)
+
+        return {
+            "ok":            True,
+            "request":       request_info,
+            "audio":         audio,
+            "audio_size":    audio.wav_size,
+            "subtitles":     subtitles,
+            "phoneme_flat":  phoneme_flat,
+            "phoneme_count": len(phoneme_flat),
+            "elapsed_s":     round(time.time() - t0, 3),
+            "first_chunk_s": round(first_chunk_t - t0, 3) if first_chunk_t else None,
+            "streamed":      streaming,
+        }
+
+
+# ---------------------------------------------------------------------------
+# CosyVoice
+# ---------------------------------------------------------------------------
+
+class AsyncCosyVoiceSession:
+    """
+    One DashScope inference socket: a reader task routing JSON events to the
+    owning _SynthesisTask by task_id (binary frames go to the active task)
+    and a writer task so handlers can send() synchronously.
+    """
+
+    def __init__(self, ws):
+        self.connected = True
+        self.tasks_run = 0
+        self._ws      = ws
+        self._tasks   = {}      # task_id -> handler
+        self._active  = None
+        self._out     = asyncio.Queue()
+        self._reader  = asyncio.ensure_future(self._read_loop())
+        self._writer  = asyncio.ensure_future(self._write_loop())
+
+    @classmethod
+    async def connect(cls, api_key: str, url: str = COSY_WS_URL) -> "AsyncCosyVoiceSession":
+        ws = await ws_connect(
+            url,
+            additional_headers={"Authorization": f"Bearer {api_key}"},
+            open_timeout=CONNECT_TIMEOUT_S,
+            ping_interval=PING_INTERVAL_S,
+            ping_timeout=PING_TIMEOUT_S,
+            max_size=None,
+        )
+        return cls(ws)
+
+    async def _read_loop(self):
+        message_error = "connection closed"
+        try:
+            async for message in self._ws:
+                if isinstance(message, bytes):
+                    if self._active is not None:
+                        self._active.on_audio_frame(message)
+                    continue
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    continue
+                header  = data.get("header", {})
+                handler = self._tasks.get(header.get("task_id"))
+                if handler is not None:
+                    handler.on_event(self, header.get("event", ""), data)
+        except WebSocketException as e:
+            message_error = str(e)
+        finally:
+            self._drop(message_error)
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._ws.send(await self._out.get())
+        except WebSocketException as e:
+            self._drop(str(e))
+
+    def _drop(self, message: str):
+        self.connected = False
+        handlers, self._tasks, self._active = list(self._tasks.values()), {}, None
+        for handler in handlers:
+            handler.on_disconnect(message)
+
+    def begin(self, task_id: str, handler, run_task: dict):
+        self._tasks[task_id] = handler
+        self._active = handler
+        self.tasks_run += 1
+        self.send(run_task)
+
+    def end(self, task_id: str):
+        handler = self._tasks.pop(task_id, None)
+        if handler is not None and self._active is handler:
+            self._active = None
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._tasks)
+
+    def send(self, message: dict):
+        self._out.put_nowait(json.dumps(message))
+
+    async def close(self):
+        self.connected = False
+        self._writer.cancel()
+        await self._ws.close()
+
+
+class AsyncSessionPool:
+    """Warm AsyncCosyVoiceSessions for one API key; dropped sockets are replaced on acquire."""
+
+    def __init__(self, api_key: str, url: str = COSY_WS_URL, max_idle: int = MAX_IDLE_SESSIONS):
+        self.api_key  = api_key
+        self.url      = url
+        self.max_idle = max_idle
+        self._idle: list[AsyncCosyVoiceSession] = []
+
+        self.connects = 0
+        self.reuses   = 0
+        self.dropped  = 0
+        self.connect_ms_total = 0.0
+
+    async def acquire(self) -> AsyncCosyVoiceSession:
+        while self._idle:
+            session = self._idle.pop()
+            if session.connected:
+                self.reuses += 1
+                return session
+            self.dropped += 1
+
+        t0 = time.perf_counter()
+        self.connects += 1
+        session = await AsyncCosyVoiceSession.connect(self.api_key, self.url)
+        self.connect_ms_total += (time.perf_counter() - t0) * 1000.0
+        return session
+
+    def release(self, session: AsyncCosyVoiceSession, reusable: bool = True):
+        if reusable and session.connected and not session.busy and len(self._idle) < self.max_idle:
+            self._idle.append(session)
+        else:
+            asyncio.ensure_future(session.close())
+
+    async def warm(self):
+        if not any(s.connected for s in self._idle):
+            self.release(await self.acquire())
+
+    async def close(self):
+        sessions, self._idle = self._idle, []
+        for session in sessions:
+            await session.close()
+
+    def stats(self) -> dict:
+        return {
+            "connects":       self.connects,
+            "reuses":         self.reuses,
+            "dropped":        self.dropped,
+            "idle":           sum(1 for s in self._idle if s.connected),
+            "avg_connect_ms": round(self.connect_ms_total / self.connects, 1) if self.connects else 0.0,
+        }
+
+
+_cosy_pools: dict[tuple, AsyncSessionPool] = {}
+
+
+def cosyvoice_pool(api_key: str, url: str = COSY_WS_URL) -> AsyncSessionPool:
+    """Loop-wide pool for (url, api_key); pools for a replaced key are closed."""
+    pool = _cosy_pools.get((url, api_key))
+    if pool is None:
+        for key in [k for k in _cosy_pools if k[0] == url]:
+            asyncio.ensure_future(_cosy_pools.pop(key).close())
+        pool = _cosy_pools[(url, api_key)] = AsyncSessionPool(api_key, url)
+    return pool
+
+
+class CosyVoiceEngine:
+    """CosyVoice custom-voice synthesis on pooled asyncio sockets."""
+
+    sample_rate = COSY_SAMPLE_RATE
+
+    def __init__(self, api_key: str, voice_id: str):
+        self.api_key  = api_key
+        self.voice_id = voice_id
+        self.model    = _extract_model(voice_id)
+
+    async def synthesize(self, text: str, on_audio=None, on_phonemes=None,
+                         timeout: float = TASK_TIMEOUT_S) -> dict:
+        t0 = time.time()
+        request_info = {"voice_id": self.voice_id, "model": self.model,
+                        "text": text, "text_length": len(text)}
+        if not self.api_key:
+            return {"ok": False, "error": "Qwen API Key 未配置", "request": request_info}
+
+        pool = cosyvoice_pool(self.api_key)
+        for _ in range(2):
+            # The task's sync callbacks only enqueue; awaiting the caller's
+            # callbacks happens here so the socket reader never blocks
+            items = asyncio.Queue()
+            task  = _SynthesisTask(
+                text, self.voice_id, self.model,
+                on_audio=(lambda pcm: items.put_nowait(("audio", pcm))) if on_audio else None,
+                on_phonemes=(lambda ph: items.put_nowait(("phonemes", ph))) if on_phonemes else None,
+            )
+            task.finished.add_done_callback(lambda _: items.put_nowait(None))
+
+            try:
+                session = await pool.acquire()
+            except (OSError, WebSocketException, TimeoutError) as e:
+                task.error = f"连接 CosyVoice 失败: {e}"
+                break
+
+            reusable = False
+            try:
+                session.begin(task.task_id, task, task.run_task_message())
+                async with asyncio.timeout(timeout):
+                    while (item := await items.get()) is not None:
+                        kind, value = item
+                        await (on_audio(value) if kind == "audio" else on_phonemes(value))
+                reusable = not task.error
+            except TimeoutError:
+                task._finish("CosyVoice 合成超时")
+            finally:
+                session.end(task.task_id)
+                pool.release(session, reusable)
+
+            if not task.retryable:
+                break
+
+        return task.result(t0, request_info)
@@ -0,0 +1,144 @@
+"""
+Live face-data preview tap.
+
+Listens on the face tracker's UDP mirror port (network.mirror_port in
+PythonFaceTracker/config.json), keeps only the latest packet, and at a fixed
+low rate pushes a compact binary frame to the WebSocket clients that
+subscribed to it. The tracker → Unity path on port 11111 is untouched.
+
+Binary frame layout (little-endian):
+  B   version (1)
+  B   flags   (bit 0 = faceDetected)
+  H   channel count N
+  d   tracker timestamp (seconds)
+  N×B blendshape values quantized to 0..255, in PREVIEW_KEYS order
+  3×h head yaw / pitch / roll in 0.1 degree units
+"""
+
+import asyncio
+import json
+import struct
+
+from fastapi import WebSocket
+
+FRAME_VERSION = 1
+_HEADER = struct.Struct("<BBHd")
+_HEAD   = struct.Struct("<hhh")
+
+# MediaPipe blendshape categories (without "_neutral"), fixed wire order
+PREVIEW_KEYS = [
+    "browDownLeft", "browDownRight", "browInnerUp", "browOuterUpLeft", "browOuterUpRight",
+    "cheekPuff", "cheekSquintLeft", "cheekSquintRight",
+    "eyeBlinkLeft", "eyeBlinkRight",
+    "eyeLookDownLeft", "eyeLookDownRight", "eyeLookInLeft", "eyeLookInRight",
+    "eyeLookOutLeft", "eyeLookOutRight", "eyeLookUpLeft", "eyeLookUpRight",
+    "eyeSquintLeft", "eyeSquintRight", "eyeWideLeft", "eyeWideRight",
+    "jawForward", "jawLeft", "jawOpen", "jawRight",
+    "mouthClose", "mouthDimpleLeft", "mouthDimpleRight", "mouthFrownLeft", "mouthFrownRight",
+    "mouthFunnel", "mouthLeft", "mouthLowerDownLeft", "mouthLowerDownRight",
+    "mouthPressLeft", "mouthPressRight", "mouthPucker", "mouthRight",
+    "mouthRollLower", "mouthRollUpper", "mouthShrugLower", "mouthShrugUpper",
+    "mouthSmileLeft", "mouthSmileRight", "mouthStretchLeft", "mouthStretchRight",
+    "mouthUpperUpLeft", "mouthUpperUpRight", "noseSneerLeft", "noseSneerRight",
+]
+
+
+def encode_frame(message: dict) -> bytes:
+    """Encode one tracker JSON message into a compact binary preview frame."""
+    bs = message.get("blendshapes") or {}
+    detected = bool(message.get("faceDetected"))
+    values = bytes(
+        max(0, min(255, int(round(float(bs.get(k, 0.0)) * 255))))
+        for k in PREVIEW_KEYS
+    )
+    head = _HEAD.pack(*(
+        max(-32768, min(32767, int(round(float(bs.get(k, 0.0)) * 10))))
+        for k in ("headYaw", "headPitch", "headRoll")
+    ))
+    header = _HEADER.pack(FRAME_VERSION, 1 if detected else 0,
+                          len(PREVIEW_KEYS), float(message.get("timestamp", 0.0)))
+    return header + values + head
+
+
+class _TapProtocol(asyncio.DatagramProtocol):
+    def __init__(self, tap: "FacePreviewTap"):
+        self.tap = tap
+
+    def datagram_received(self, data: bytes, addr):
+        # Only keep a reference — parsing happens at the (lower) push rate
+        self.tap._latest = data
+        self.tap._received += 1
+
+
+class FacePreviewTap:
+    """Downsampled face-data preview pushed to subscribed WebSocket clients."""
+
+    TOPIC = "face_preview"
+
+    def __init__(self, port: int = 11121, rate_hz: float = 10.0, host: str = "127.0.0.1"):
+        self.host    = host
+        self.port    = port
+        self.rate_hz = max(0.5, float(rate_hz))
+        self.subscribers: set[WebSocket] = set()
+
+        self._transport = None
+        self._task      = None
+        self._latest: bytes | None = None
+        self._received  = 0
+        self._pushed_at = -1   # value of _received at the last push
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        try:
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _TapProtocol(self), local_addr=(self.host, self.port))
+        except OSError as e:
+            print(f"[FacePreview] cannot bind UDP {self.host}:{self.port}: {e}")
+            return
+        self._task = asyncio.create_task(self._push_loop())
+        print(f"[FacePreview] listening on UDP {self.host}:{self.port} ({self.rate_hz:g} Hz push)")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    def schema(self) -> dict:
+        """JSON message sent to a client when it subscribes, describing the frame layout."""
+        return {
+            "type":    "face_preview_schema",
+            "version": FRAME_VERSION,
+            "keys":    PREVIEW_KEYS,
+            "rate_hz": self.rate_hz,
+        }
+
+    async def subscribe(self, websocket: WebSocket):
+        self.subscribers.add(websocket)
+        await websocket.send_json(self.schema())
+
+    def unsubscribe(self, websocket: WebSocket):
+        self.subscribers.discard(websocket)
+
+    async def _push_loop(self):
+        interval = 1.0 / self.rate_hz
+        while True:
+            await asyncio.sleep(interval)
+            if not self.subscribers or self._latest is None:
+                continue
+            if self._received == self._pushed_at:
+                continue  # no new packet since last push
+            self._pushed_at = self._received
+
+            try:
+                frame = encode_frame(json.loads(self._latest))
+            except Exception:
+                continue
+
+            for ws in list(self.subscribers):
+                try:
+                    await ws.send_bytes(frame)
+                except Exception:
+                    self.subscribers.discard(ws)
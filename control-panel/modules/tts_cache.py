@@ -0,0 +1,207 @@
+"""
+Content-addressed TTS result cache.
+
+Keys are a SHA-256 of (engine, voice, model, normalized text); values hold the
+WAV audio and phoneme_flat, so a repeated line skips TTS. Its keyframes are
+re-derived through keyframe_cache, which checks the lip-sync table versions.
+
+Two tiers, both LRU:
+  - memory: OrderedDict bounded by memory_mb of audio
+  - disk:   <key>.wav + <key>.json under the cache directory, bounded by
+            disk_quota_mb; access order survives restarts via file mtimes
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for keys: NFKC, collapsed whitespace, trimmed."""
+    return _WS.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def make_key(engine: str, voice: str, model: str, text: str) -> str:
+    raw = json.dumps([engine, voice, model, normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_size(entry: dict) -> int:
+    return len(entry.get("audio") or b"")
+
+
+class TTSCache:
+    """Two-tier (memory + disk) LRU cache of TTS results."""
+
+    def __init__(self, directory: str, memory_mb: float = 32, disk_quota_mb: float = 256):
+        self.directory    = directory
+        self.memory_limit = int(memory_mb * 1024 * 1024)
+        self.disk_quota   = int(disk_quota_mb * 1024 * 1024)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock       = threading.Lock()
+        self._mem        = OrderedDict()   # key -> entry (oldest first)
+        self._mem_bytes  = 0
+        self._disk       = OrderedDict()   # key -> bytes on disk (oldest first)
+        self._disk_bytes = 0
+
+        self.hits_memory = 0
+        self.hits_disk   = 0
+        self.misses      = 0
+        self.stores      = 0
+        self.evictions   = 0
+        self.bytes_saved = 0               # audio bytes served instead of synthesized
+
+        self._load_index()
+
+    # -- disk layout -------------------------------------------------------
+
+    def _paths(self, key: str) -> tuple:
+        return (os.path.join(self.directory, f"{key}.wav"),
+                os.path.join(self.directory, f"{key}.json"))
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            wav_path, meta_path = self._paths(key)
+            try:
+                size  = os.path.getsize(wav_path) + os.path.getsize(meta_path)
+                mtime = os.path.getmtime(meta_path)
+            except OSError:
+                continue
+            found.append((mtime, key, size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key: str):
+        wav_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(wav_path, "rb") as f:
+                entry["audio"] = f.read()
+            now = time.time()
+            os.utime(meta_path, (now, now))   # persist LRU order
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: dict) -> int:
+        wav_path, meta_path = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k != "audio"}
+        for path, data, mode in ((wav_path, entry["audio"], "wb"),
+                                 (meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"), "wb")):
+            tmp = path + ".tmp"
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return os.path.getsize(wav_path) + os.path.getsize(meta_path)
+
+    def _remove_disk(self, key: str):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # -- memory tier -------------------------------------------------------
+
+    def _remember(self, key: str, entry: dict):
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= _entry_size(old)
+        size = _entry_size(entry)
+        if size > self.memory_limit:
+            return
+        self._mem[key] = entry
+        self._mem_bytes += size
+        while self._mem_bytes > self.memory_limit:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= _entry_size(evicted)
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, key: str):
+        """Return the cached entry dict (audio bytes, phoneme_flat, …) or None."""
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.hits_memory += 1
+                self.bytes_saved += _entry_size(entry)
+                return entry
+            on_disk = key in self._disk
+
+        entry = self._read_disk(key) if on_disk else None
+        with self._lock:
+            if entry is None:
+                if on_disk:   # files vanished or corrupt
+                    self._disk_bytes -= self._disk.pop(key, 0)
+                self.misses += 1
+                return None
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, entry)
+            self.hits_disk += 1
+            self.bytes_saved += _entry_size(entry)
+            return entry
+
+    def put(self, key: str, entry: dict):
+        """Store an entry; "audio" must be the WAV bytes, everything else JSON-serializable."""
+        if not entry.get("audio"):
+            return
+        entry = dict(entry, cached_at=time.time())
+        with self._lock:
+            self._remember(key, entry)
+            self.stores += 1
+
+        try:
+            size = self._write_disk(key, entry)
+        except OSError as e:
+            print(f"[TTSCache] write failed: {e}")
+            return
+
+        evict = []
+        with self._lock:
+            self._disk_bytes += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            while self._disk_bytes > self.disk_quota and self._disk:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                self.evictions += 1
+                evict.append(old_key)
+        for old_key in evict:
+            self._remove_disk(old_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits    = self.hits_memory + self.hits_disk
+            lookups = hits + self.misses
+            return {
+                "hits":           hits,
+                "hits_memory":    self.hits_memory,
+                "hits_disk":      self.hits_disk,
+                "misses":         self.misses,
+                "hit_rate":       round(hits / lookups, 4) if lookups else 0.0,
+                "stores":         self.stores,
+                "evictions":      self.evictions,
+                "bytes_saved":    self.bytes_saved,
+                "memory_entries": len(self._mem),
+                "memory_bytes":   self._mem_bytes,
+                "disk_entries":   len(self._disk),
+                "disk_bytes":     self._disk_bytes,
+                "disk_quota":     self.disk_quota,
+            }
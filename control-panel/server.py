@@ -5,25 +5,30 @@ Then open http://localhost:7777 in your browser.
 """
 
 import asyncio
-import base64
 import datetime
 import json
 import os
+import queue
 import sys
 import time
 import uuid
+from concurrent.futures import Future
 
 import httpx
 import uvicorn
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 sys.path.insert(0, os.path.dirname(__file__))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "PythonTextDriver"))
 
 from modules.process_manager import ProcessManager, discover_apps, PROJECT_ROOT
+from modules.face_preview import FacePreviewTap
+from modules.tts_cache import TTSCache, make_key as _tts_cache_make_key
+from modules.client_pool import ClientPool
+from modules.engines import IsiEngine, CosyVoiceEngine, cosyvoice_pool
 from modules.config_manager import (
     read_tracker_config,
     write_tracker_config,
@@ -33,16 +38,48 @@ from modules.config_manager import (
     write_text_driver_config,
 )
 from text_analyzer import TextAnalyzer
-from tts_isi import synthesize as _tts_synthesize_isi, VOICES as TTS_VOICES
-from tts_cosyvoice import synthesize as _tts_synthesize_cosy
-from lip_sync import phonemes_to_keyframes
-from rhubarb_lipsync import extract_keyframes as _rhubarb_extract
-from speech_player import SpeechPlayer
+from analysis_cache import AnalysisCache
+from keyframe_cache import configure_keyframe_cache, keyframe_cache
+from isi_session import session_manager as _isi_session_manager
+from tts_isi import VOICES as TTS_VOICES
+from tts_cosyvoice import _extract_model as _cosy_model
+from audio_clip import AudioClip
+from keyframe_track import KeyframeTrack, as_track
+from lip_sync import phonemes_to_track, IncrementalKeyframes
+from lip_curve import curve_params, resample_track
+from text_chunker import split_sentences
+from speech_pipeline import synthesize_chunked_async
+from rhubarb_lipsync import extract_track_async as _rhubarb_extract, rhubarb_service, shape_keyframes
+from viseme_analyzer import VisemeAnalyzer, extract_track_async as _viseme_extract
+from audio_output import OUTPUT_BLOCKSIZE, OUTPUT_RATE, configure_output_engine, output_engine
+from playback_queue import PlaybackQueue
+from speech_player import (
+    SpeechPlayer,
+    PcmStream,
+    STREAM_PREBUFFER_MS,
+    STREAM_MAX_PREBUFFER_MS,
+)
 
 _speech_player = SpeechPlayer()
 
 proc_manager = ProcessManager()
 _clients: list[WebSocket] = []
+_face_preview: FacePreviewTap | None = None
+_tts_cache: TTSCache | None = None
+_analysis_cache: AnalysisCache | None = None
+_client_pool = ClientPool()
+
+# Engines, analysis and Rhubarb run natively on the event loop; playback is
+# serialized on the queue's own worker thread (one utterance at a time,
+# with barge-in and gapless prefetch of the next one)
+_playback_queue: PlaybackQueue | None = None
+
+# Upper bound on one TTS synthesis (all chunks); the engines are cancelled
+TTS_DEADLINE_MS = 30000
+
+# Streamed audio analysed before committing to audio-derived keyframes when
+# the engine has sent no timestamps (cloned CosyVoice voices)
+VISEME_GRACE_MS = 200
 
 STATIC_DIR   = os.path.join(os.path.dirname(__file__), "static")
 UPLOADS_DIR  = os.path.join(STATIC_DIR, "uploads")
@@ -51,8 +88,12 @@ os.makedirs(UPLOADS_DIR, exist_ok=True)
 DATA_DIR     = os.path.join(os.path.dirname(__file__), "data")
 SESSIONS_DIR = os.path.join(DATA_DIR, "sessions")
 os.makedirs(SESSIONS_DIR, exist_ok=True)
+TTS_CACHE_DIR = os.path.join(DATA_DIR, "tts_cache")
+KEYFRAME_CACHE_DIR = os.path.join(DATA_DIR, "keyframe_cache")
 
-COSYVOICE_API = "https://dashscope.aliyuncs.com/api/v1/services/audio/tts/customization"
+DASHSCOPE_API = "https://dashscope.aliyuncs.com"
+COSYVOICE_API = DASHSCOPE_API + "/api/v1/services/audio/tts/customization"
+QWEN_BASE_URL = DASHSCOPE_API + "/compatible-mode/v1"
 
 
 # ---------------------------------------------------------------------------
@@ -67,6 +108,14 @@ async def _broadcast(message: dict):
             _clients.remove(client)
 
 
+def _broadcast_playback(loop: asyncio.AbstractEventLoop):
+    """PlaybackQueue.on_change callback: push queue state to the WebSocket clients."""
+    def on_change(state: dict):
+        loop.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(_broadcast({"type": "playback", **state})))
+    return on_change
+
+
 async def _status_loop():
     """Periodically push process status and buffered logs to all clients."""
     while True:
@@ -88,8 +137,53 @@ async def _status_loop():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global _face_preview, _tts_cache, _analysis_cache, _playback_queue
     asyncio.create_task(_status_loop())
+
+    panel = read_panel_config()
+    _tts_cache = TTSCache(
+        TTS_CACHE_DIR,
+        memory_mb=panel.get("tts_cache_memory_mb", 32),
+        disk_quota_mb=panel.get("tts_cache_disk_mb", 256),
+    )
+    _analysis_cache = AnalysisCache(
+        max_entries=panel.get("analysis_cache_entries", 512),
+        ttl_s=panel.get("analysis_cache_ttl_s", 3600),
+    )
+    configure_keyframe_cache(
+        KEYFRAME_CACHE_DIR,
+        max_entries=panel.get("keyframe_cache_entries", 1024),
+        max_disk_entries=panel.get("keyframe_cache_disk_entries", 8192),
+    )
+
+    # Keep the audio device open and warm so no utterance pays for opening it
+    playback = _startup_text_driver_config().get("playback", {})
+    await asyncio.to_thread(
+        configure_output_engine,
+        samplerate=playback.get("output_rate", OUTPUT_RATE),
+        blocksize=playback.get("output_blocksize", OUTPUT_BLOCKSIZE),
+    )
+    # "stream": one lip_sync datagram per keyframe; "track": the whole track up front
+    _speech_player.protocol = playback.get("lipsync_protocol", "stream")
+    _playback_queue = PlaybackQueue(_speech_player, _broadcast_playback(asyncio.get_running_loop()))
+
+    mirror_port = read_tracker_config().get("network", {}).get("mirror_port", 0)
+    if mirror_port:
+        _face_preview = FacePreviewTap(
+            port=mirror_port,
+            rate_hz=panel.get("face_preview_hz", 10),
+        )
+        await _face_preview.start()
+
+    # Open upstream connections before the first request needs them
+    asyncio.create_task(_warm_clients())
+
     yield
+    await _client_pool.aclose()
+    await asyncio.to_thread(_playback_queue.close)
+    output_engine().close()
+    if _face_preview:
+        _face_preview.stop()
     proc_manager.stop("face_tracker")
     proc_manager.stop("unity")
 
@@ -119,6 +213,67 @@ async def get_config():
     }
 
 
+def _startup_text_driver_config() -> dict:
+    """The text-driver config for startup tasks; {} while config.json does not exist yet."""
+    try:
+        return read_text_driver_config()
+    except FileNotFoundError:
+        return {}
+
+
+async def _warm_clients():
+    """Build and connect the pooled Qwen / DashScope clients for the current config."""
+    cfg = _startup_text_driver_config()
+
+    # Starts the ISI token prefetch / refresh timer for the configured AccessKey
+    isi = _isi_credentials(cfg)
+    if isi:
+        _isi_session_manager(*isi)
+
+    qwen = cfg.get("qwen", {})
+    if not qwen.get("api_key", "").strip():
+        return
+    _qwen_analyzer(qwen)
+    _dashscope_client()
+    await asyncio.gather(
+        _client_pool.warm("qwen_async"),
+        _client_pool.warm("dashscope"),
+        _warm_cosyvoice(),
+    )
+
+
+async def _warm_cosyvoice():
+    """Open one CosyVoice inference socket so the first custom-voice line skips the handshake."""
+    try:
+        await cosyvoice_pool(_cosyvoice_api_key()).warm()
+    except Exception as e:
+        print(f"[CosyVoice] warm-up failed: {e}")
+
+
+def _isi_credentials(cfg: dict) -> tuple | None:
+    isi = cfg.get("isi", {})
+    ak_id, ak_secret = isi.get("ak_id", "").strip(), isi.get("ak_secret", "").strip()
+    return (ak_id, ak_secret) if ak_id and ak_secret else None
+
+
+def _qwen_analyzer(qwen: dict) -> TextAnalyzer:
+    """TextAnalyzer sharing the pooled OpenAI client for the configured key / base URL."""
+    api_key  = qwen.get("api_key", "").strip()
+    base_url = qwen.get("base_url", QWEN_BASE_URL)
+    return TextAnalyzer(
+        api_key=api_key,
+        model=qwen.get("model", "qwen-turbo"),
+        base_url=base_url,
+        cache=_analysis_cache,
+        client=_client_pool.openai(base_url, api_key),
+        async_client=_client_pool.openai_async(base_url, api_key),
+    )
+
+
+def _dashscope_client() -> httpx.AsyncClient:
+    return _client_pool.http(DASHSCOPE_API, _cosyvoice_api_key())
+
+
 @app.post("/api/config")
 async def update_config(body: dict):
     if "tracker" in body:
@@ -127,6 +282,9 @@ async def update_config(body: dict):
         write_panel_config(body["panel"])
     if "text_driver" in body:
         write_text_driver_config(body["text_driver"])
+        # Clients whose key / base URL changed are rebuilt here rather than
+        # on the next speak request
+        asyncio.create_task(_warm_clients())
     return {"ok": True}
 
 
@@ -151,6 +309,38 @@ async def face_tracker_restart():
     return {"ok": ok}
 
 
+@app.get("/api/face-tracker/preview")
+async def face_tracker_preview():
+    """Relay the face tracker's MJPEG preview (debug.preview in the tracker config)."""
+    preview = read_tracker_config().get("debug", {}).get("preview", {})
+    if not preview.get("enabled"):
+        return {"ok": False, "error": "面部捕捉预览未启用（debug.preview.enabled）"}
+    url = f"http://{preview.get('host', '127.0.0.1')}:{preview.get('port', 8090)}/stream.mjpg"
+
+    client = httpx.AsyncClient(timeout=httpx.Timeout(5.0, read=None))
+    try:
+        upstream = await client.send(client.build_request("GET", url), stream=True)
+    except httpx.HTTPError as e:
+        await client.aclose()
+        return {"ok": False, "error": f"无法连接预览服务: {e}"}
+
+    async def _relay():
+        # Closing the upstream stream when the browser disconnects lets the
+        # tracker stop encoding once nobody is watching
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        _relay(),
+        media_type=upstream.headers.get("content-type", "multipart/x-mixed-replace"),
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 # Text driver — runs inline in the control panel process, no subprocess
 @app.post("/api/text-driver/speak")
 async def text_driver_speak(body: dict):
@@ -164,15 +354,9 @@ async def text_driver_speak(body: dict):
     if not api_key:
         return {"ok": False, "error": "请先填写 Qwen API Key"}
 
-    analyzer = TextAnalyzer(
-        api_key=api_key,
-        model=qwen.get("model", "qwen-turbo"),
-        base_url=qwen.get("base_url",
-                           "https://dashscope.aliyuncs.com/compatible-mode/v1"),
-    )
-    loop = asyncio.get_event_loop()
+    analyzer = _qwen_analyzer(qwen)
     try:
-        result = await loop.run_in_executor(None, analyzer.analyze, text)
+        result = await analyzer.analyze_async(text)
         return {"ok": True, **result}
     except Exception as e:
         return {"ok": False, "error": str(e)}
@@ -187,12 +371,11 @@ async def tts_meta():
     api_key = _cosyvoice_api_key()
     if api_key:
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.post(
-                    COSYVOICE_API,
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={"model": "voice-enrollment", "input": {"action": "list_voice", "page_index": 0, "page_size": 100}},
-                )
+            resp = await _dashscope_client().post(
+                COSYVOICE_API,
+                json={"model": "voice-enrollment", "input": {"action": "list_voice", "page_index": 0, "page_size": 100}},
+                timeout=10,
+            )
             if resp.status_code == 200:
                 data = resp.json()
                 for v in (data.get("output") or {}).get("voice_list", []):
@@ -209,126 +392,441 @@ async def tts_meta():
     return {"voices": voices}
 
 
-@app.post("/api/tts/synthesize")
-async def tts_synthesize(body: dict):
-    text = (body.get("text") or "").strip()
-    if not text:
-        return {"ok": False, "error": "text 不能为空"}
+def _tts_cache_key(voice: str, text: str) -> str:
+    if str(voice).startswith("cosyvoice-"):
+        return _tts_cache_make_key("cosyvoice", voice, _cosy_model(voice), text)
+    return _tts_cache_make_key("isi", voice, "", text)
 
-    voice = body.get("voice", "siyue")
 
-    # Route custom CosyVoice voices to CosyVoice synthesis
+def _cached_tts_result(entry: dict) -> dict:
+    """Rebuild an engine-style result dict from a cache entry (the clip views the cached WAV)."""
+    phoneme_flat = entry.get("phoneme_flat") or []
+    return {
+        "ok":            True,
+        "audio":         AudioClip.from_wav(entry["audio"]),
+        "audio_size":    len(entry["audio"]),
+        "phoneme_flat":  phoneme_flat,
+        "phoneme_count": len(phoneme_flat),
+        "elapsed_s":     0.0,
+        "cached":        True,
+    }
+
+
+def _store_tts_result(key: str, tts_result: dict):
+    """
+    Cache the audio and phonemes only: keyframes are re-derived on a hit
+    through keyframe_cache, so lip-sync table or engine changes apply to
+    cached texts too.
+    """
+    audio = tts_result.get("audio")
+    if not tts_result.get("ok") or audio is None:
+        return
+    _tts_cache.put(key, {
+        "audio":        audio.wav_bytes(),
+        "phoneme_flat": tts_result.get("phoneme_flat", []),
+    })
+
+
+def _http_result(tts_result: dict, include_audio: bool = True) -> dict:
+    """An engine result for a JSON response: the AudioClip becomes audio_base64, if asked for."""
+    out = {k: v for k, v in tts_result.items() if k != "audio"}
+    if include_audio and tts_result.get("audio") is not None:
+        out["audio_base64"] = tts_result["audio"].to_base64()
+    return out
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {"tts": _tts_cache.stats(), "analysis": _analysis_cache.stats(),
+            "keyframes": keyframe_cache().stats()}
+
+
+@app.get("/api/clients/stats")
+async def clients_stats():
+    stats = _client_pool.stats()
+    api_key = _cosyvoice_api_key()
+    if api_key:
+        stats["cosyvoice_ws"] = cosyvoice_pool(api_key).stats()
+    isi = _isi_credentials(read_text_driver_config())
+    if isi:
+        stats["isi"] = _isi_session_manager(*isi).stats()
+    return stats
+
+
+@app.get("/api/lipsync/stats")
+async def lipsync_stats():
+    """Rhubarb worker usage and per-stage timings."""
+    return {"rhubarb": rhubarb_service().stats()}
+
+
+@app.get("/api/audio/stats")
+async def audio_stats():
+    """Output engine state and measured start latency (enqueue to audible)."""
+    return output_engine().stats()
+
+
+def _tts_engine(voice: str, cfg: dict):
+    """(engine, error) for a voice: CosyVoice custom voices or ISI built-in voices."""
     if str(voice).startswith("cosyvoice-"):
         api_key = _cosyvoice_api_key()
         if not api_key:
-            return {"ok": False, "error": "请先在文本驱动模块填写 Qwen API Key"}
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _tts_synthesize_cosy, text, voice, api_key)
+            return None, "请先在文本驱动模块填写 Qwen API Key（用于 CosyVoice 合成）"
+        return CosyVoiceEngine(api_key, voice), None
 
-    # ISI TTS for built-in voices
-    cfg = read_text_driver_config()
-    isi = cfg.get("isi", {})
+    isi       = cfg.get("isi", {})
     appkey    = isi.get("appkey",    "").strip()
     ak_id     = isi.get("ak_id",     "").strip()
     ak_secret = isi.get("ak_secret", "").strip()
     if not appkey or not ak_id or not ak_secret:
-        return {"ok": False, "error": "请先填写 ISI AppKey、AccessKey ID 和 AccessKey Secret"}
-
+        return None, "请先填写 ISI AppKey、AccessKey ID 和 AccessKey Secret"
     url = isi.get("url", "wss://nls-gateway-cn-shanghai.aliyuncs.com/ws/v1")
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _tts_synthesize_isi, text, appkey, ak_id, ak_secret, voice, url)
+    return IsiEngine(appkey, ak_id, ak_secret, voice, url), None
 
 
-# Speak + animate: combines emotion analysis + TTS + lip-sync + audio playback
-@app.post("/api/speak-animate")
-async def speak_animate(body: dict):
+def _tts_deadline_s(body: dict, cfg: dict) -> float:
+    return body.get("deadline_ms", cfg.get("playback", {}).get("tts_deadline_ms", TTS_DEADLINE_MS)) / 1000.0
+
+
+async def _with_deadline(coro, deadline_s: float) -> dict:
+    """Await an engine call; on expiry it is cancelled and an error result returned."""
+    try:
+        return await asyncio.wait_for(coro, deadline_s)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"TTS 合成超时（{deadline_s:g}s）"}
+
+
+async def _audio_track(audio: AudioClip, cfg: dict) -> tuple:
+    """
+    Lip-sync track from the audio: (KeyframeTrack, duration_ms, source).
+
+    lipsync.engine "native" (default) runs the in-process viseme analyzer;
+    "rhubarb" tries the binary first and falls back to the analyzer.
+    The track is None when neither could read the audio.
+    """
+    if cfg.get("lipsync", {}).get("engine", "native") == "rhubarb":
+        track, duration_ms = await _rhubarb_extract(audio)
+        if track is not None:
+            return track, duration_ms, "rhubarb"
+    track, duration_ms = await _viseme_extract(audio)
+    return track, duration_ms, "native"
+
+
+def _playable(track: KeyframeTrack, cfg: dict):
+    """
+    What SpeechPlayer sends for a track: the keyframes themselves, or with
+    lipsync.curve.enabled a fixed-rate curve with attack/release and
+    coarticulation applied.
+    """
+    curve_cfg = cfg.get("lipsync", {}).get("curve", {})
+    if not curve_cfg.get("enabled", False):
+        return track
+    return resample_track(track, curve_params(curve_cfg))
+
+
+@app.post("/api/tts/synthesize")
+async def tts_synthesize(body: dict):
     text = (body.get("text") or "").strip()
     if not text:
         return {"ok": False, "error": "text 不能为空"}
 
     voice = body.get("voice", "siyue")
-    cfg   = read_text_driver_config()
+    loop  = asyncio.get_event_loop()
+    # Clients that only want phonemes / timings can skip the base64 audio
+    include_audio = bool(body.get("include_audio", True))
 
-    # 1. Emotion analysis (optional — skipped if no API key)
-    emotion    = "neutral"
-    intensity  = 0.5
-    emotion_bs = {}
+    cache_key = _tts_cache_key(voice, text)
+    cached    = await loop.run_in_executor(None, _tts_cache.get, cache_key)
+    if cached is not None:
+        return _http_result(_cached_tts_result(cached), include_audio)
+
+    cfg = read_text_driver_config()
+    engine, error = _tts_engine(voice, cfg)
+    if engine is None:
+        return {"ok": False, "error": error}
+
+    result = await _with_deadline(engine.synthesize(text), _tts_deadline_s(body, cfg))
+    loop.run_in_executor(None, _store_tts_result, cache_key, result)
+    return _http_result(result, include_audio)
+
+
+# Speak + animate: combines emotion analysis + TTS + lip-sync + audio playback
+def _make_pcm_stream(samplerate: int, t_request: float, cfg: dict) -> PcmStream:
+    """PcmStream sized from the text-driver config's "playback" section."""
+    playback = cfg.get("playback", {})
+    return PcmStream(
+        samplerate,
+        prebuffer_ms=playback.get("prebuffer_ms", STREAM_PREBUFFER_MS),
+        max_prebuffer_ms=playback.get("max_prebuffer_ms", STREAM_MAX_PREBUFFER_MS),
+        t_request=t_request,
+    )
+
+
+async def _speak_streaming(synthesize, stream: PcmStream, emotion_bs, **queue_opts):
+    """
+    Run a streaming TTS engine and play while synthesis is still running:
+    PCM chunks go straight into the player's ring buffer and timestamped
+    phonemes become keyframes as they arrive.
+
+    synthesize(on_audio, on_phonemes) is a coroutine function returning the
+    engine's result dict; its callbacks are awaited. The PCM also runs
+    through the native viseme analyzer: if no timestamps have arrived after
+    VISEME_GRACE_MS of audio, keyframes come from the audio instead. If
+    synthesis fails or is cancelled (deadline), the stream is aborted and
+    playback stops. queue_opts go to PlaybackQueue.submit_stream.
+
+    Returns (tts_result, keyframes, stream stats, lipsync source, playback
+    item) once synthesis has finished; playback continues in the background.
+    """
+    kf_queue  = queue.Queue()
+    kf_incr   = IncrementalKeyframes()
+    visemes   = VisemeAnalyzer(stream.samplerate, stream.channels)
+    held      = []      # audio keyframes while the source is undecided
+    source    = None    # "phonemes" or "native" once decided
+    keyframes = []
+
+    def emit(batch):
+        keyframes.extend(batch)
+        kf_queue.put(batch)
+
+    async def on_audio(pcm):
+        nonlocal source
+        await stream.afeed(pcm)
+        if source == "phonemes":
+            return
+        batch = shape_keyframes(visemes.feed(pcm))
+        if source == "native":
+            emit(batch)
+        else:
+            held.extend(batch)
+            if visemes.duration_ms >= VISEME_GRACE_MS:
+                source = "native"
+                emit(held)
+
+    async def on_phonemes(phonemes):
+        nonlocal source
+        if source == "native":
+            return
+        source = "phonemes"
+        emit(kf_incr.feed(phonemes))
+
+    item   = _playback_queue.submit_stream(stream, kf_queue, emotion_bs, **queue_opts)
+    result = {}
+    try:
+        result = await synthesize(on_audio, on_phonemes)
+    finally:
+        if source == "phonemes":
+            tail = kf_incr.finish()
+        else:
+            tail = (held if source is None else []) + shape_keyframes(visemes.flush())
+            source = "native"
+        keyframes.extend(tail)
+        kf_queue.put(tail)
+        kf_queue.put(None)
+        if result.get("ok"):
+            stream.close()
+        else:
+            stream.abort()
+
+    # Synthesis usually outlasts the first audio; give a slow device a moment
+    for _ in range(100):
+        if stream.started.is_set():
+            break
+        await asyncio.sleep(0.02)
+    return result, keyframes, stream.stats(), source, item
+
+
+def _queue_opts(body: dict, label: str) -> dict:
+    """PlaybackQueue submit options from a request body ("priority", "interrupt", "clear")."""
+    return {
+        "label":     label[:40],
+        "priority":  int(body.get("priority", 0)),
+        "interrupt": bool(body.get("interrupt")),
+        "clear":     bool(body.get("clear")),
+    }
+
+
+async def _analyze_emotion(cfg: dict, text: str) -> dict:
+    """Emotion analysis stage; only cancellation escapes (neutral when Qwen is unconfigured or fails)."""
+    t0 = time.perf_counter()
+    result = {"emotion": "neutral", "intensity": 0.5, "blendshapes": {}}
 
     qwen    = cfg.get("qwen", {})
     api_key = qwen.get("api_key", "").strip()
     if api_key:
-        analyzer = TextAnalyzer(
-            api_key=api_key,
-            model=qwen.get("model", "qwen-turbo"),
-            base_url=qwen.get("base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1"),
-        )
-        loop = asyncio.get_event_loop()
+        analyzer = _qwen_analyzer(qwen)
         try:
-            result     = await loop.run_in_executor(None, analyzer.analyze, text)
-            emotion    = result.get("emotion", "neutral")
-            intensity  = result.get("intensity", 0.5)
-            emotion_bs = result.get("blendshapes", {})
+            result = await analyzer.analyze_async(text)
         except Exception as e:
             print(f"[speak-animate] emotion analysis error: {e}")
 
-    # 2. TTS synthesis — route CosyVoice custom voices or ISI built-in voices
-    loop = asyncio.get_event_loop()
-    if str(voice).startswith("cosyvoice-"):
-        cosy_api_key = _cosyvoice_api_key()
-        if not cosy_api_key:
-            return {"ok": False, "error": "请先在文本驱动模块填写 Qwen API Key（用于 CosyVoice 合成）"}
-        tts_result = await loop.run_in_executor(None, _tts_synthesize_cosy, text, voice, cosy_api_key)
-    else:
-        isi       = cfg.get("isi", {})
-        appkey    = isi.get("appkey",    "").strip()
-        ak_id     = isi.get("ak_id",     "").strip()
-        ak_secret = isi.get("ak_secret", "").strip()
-        if not appkey or not ak_id or not ak_secret:
-            return {"ok": False, "error": "请先填写 ISI AppKey、AccessKey ID 和 AccessKey Secret"}
-        url = isi.get("url", "wss://nls-gateway-cn-shanghai.aliyuncs.com/ws/v1")
-        tts_result = await loop.run_in_executor(
-            None, _tts_synthesize_isi, text, appkey, ak_id, ak_secret, voice, url
-        )
-    if not tts_result.get("ok"):
-        return {"ok": False, "error": tts_result.get("error", "TTS 合成失败")}
+    result["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+    return result
 
-    # 3. Generate lip-sync keyframes
-    # Always try Rhubarb first (audio-based, works for ISI and CosyVoice alike).
-    # Fall back to phoneme_flat (ISI) or estimation (CosyVoice) when unavailable.
-    audio_b64    = tts_result.get("audio_base64", "")
-    phoneme_flat = tts_result.get("phoneme_flat", [])
 
-    rhubarb_kfs, rhubarb_dur = await loop.run_in_executor(
-        None, _rhubarb_extract, base64.b64decode(audio_b64)
-    )
+def _blendshapes_future(task: asyncio.Task) -> Future:
+    """Thread-safe Future of the emotion blendshapes, for SpeechPlayer."""
+    out = Future()
 
-    if rhubarb_kfs is not None:
-        keyframes   = rhubarb_kfs
-        duration_ms = rhubarb_dur
-    else:
-        keyframes   = tts_result.get("keyframes") or phonemes_to_keyframes(phoneme_flat)
-        duration_ms = (tts_result.get("duration_ms")
-                       or (phoneme_flat[-1]["end_ms"] if phoneme_flat else 0))
+    def _done(t: asyncio.Task):
+        out.set_result({} if t.cancelled() else t.result().get("blendshapes", {}))
 
-    # 4. Play audio + send UDP animation frames in a background thread (non-blocking)
-    audio_b64 = tts_result.get("audio_base64", "")
+    task.add_done_callback(_done)
+    return out
 
-    def _play():
-        _speech_player.play(audio_b64, keyframes, emotion_bs)
 
-    loop.run_in_executor(None, _play)
+@app.post("/api/speak-animate")
+async def speak_animate(body: dict):
+    t_request = time.perf_counter()
+    text = (body.get("text") or "").strip()
+    if not text:
+        return {"ok": False, "error": "text 不能为空"}
+
+    voice    = body.get("voice", "siyue")
+    cfg      = read_text_driver_config()
+    playback = cfg.get("playback", {})
+    loop     = asyncio.get_event_loop()
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - t_request) * 1000.0, 1)
+
+    # Stage graph:
+    #   emotion ─────────────────────────────┐
+    #   tts (cache) ──→ lip-sync ──→ playback ┴→ session / response
+    # Emotion runs concurrently with TTS + lip-sync. Playback waits for it
+    # only until emotion_timeout_ms after the request; a later result is
+    # still applied mid-utterance by SpeechPlayer.
+    emotion_timeout_s = body.get("emotion_timeout_ms",
+                                 playback.get("emotion_timeout_ms", 1500)) / 1000.0
+    emotion_task = asyncio.create_task(_analyze_emotion(cfg, text))
+    emotion_bs   = _blendshapes_future(emotion_task)
+    timings_ms   = {}
+    deadline_s   = _tts_deadline_s(body, cfg)
+
+    # 1. TTS synthesis — a cache hit skips TTS (its keyframes come from
+    #    keyframe_cache); otherwise route CosyVoice custom voices or ISI voices.
+    #    With body.stream, playback starts with the first PCM chunk; long texts
+    #    are split into sentences and synthesized with lookahead
+    #    A streamed request that would have to wait behind other playback is
+    #    synthesized buffered instead: its audio could not start anyway
+    queue_opts   = _queue_opts(body, text)
+    streamed     = bool(body.get("stream")) and (queue_opts["interrupt"] or not _playback_queue.busy)
+    keyframes: KeyframeTrack | None = None
+    ttfa_ms      = None
+    stream_stats = None
+    tts_result   = None
+    lipsync      = None
+
+    cache_key = _tts_cache_key(voice, text)
+    cached    = await loop.run_in_executor(None, _tts_cache.get, cache_key)
+    if cached is not None:
+        tts_result = _cached_tts_result(cached)
+        streamed   = False
+    else:
+        engine, error = _tts_engine(voice, cfg)
+        if engine is None:
+            emotion_task.cancel()
+            return {"ok": False, "error": error}
+        if not streamed:
+            tts_result = await _with_deadline(engine.synthesize(text), deadline_s)
+
+    if streamed:
+        chunks = (split_sentences(text, playback.get("max_chunk_chars", 80))
+                  if playback.get("chunk_sentences", True) else [text])
+        if len(chunks) > 1:
+            lookahead = body.get("lookahead", playback.get("lookahead", 1))
+
+            def synthesize(on_audio, on_phonemes):
+                return synthesize_chunked_async(chunks, engine.synthesize, engine.sample_rate,
+                                                on_audio, on_phonemes, lookahead)
+        else:
+            def synthesize(on_audio, on_phonemes):
+                return engine.synthesize(text, on_audio, on_phonemes)
+
+        # Streaming never waits for emotion: it is sent whenever it resolves
+        tts_result, keyframes, stream_stats, lipsync, item = await _speak_streaming(
+            lambda on_audio, on_phonemes: _with_deadline(synthesize(on_audio, on_phonemes), deadline_s),
+            _make_pcm_stream(engine.sample_rate, t_request, cfg), emotion_bs, **queue_opts)
+
+    timings_ms["tts"] = elapsed_ms()
+    if not tts_result.get("ok"):
+        emotion_task.cancel()
+        return {"ok": False, "error": tts_result.get("error", "TTS 合成失败")}
 
-    # Save session to disk
+    audio        = tts_result["audio"]
+    phoneme_flat = tts_result.get("phoneme_flat", [])
+
+    if streamed:
+        # Already playing; keyframes were built incrementally from timestamps or audio
+        ttfa_ms     = stream_stats["ttfa_ms"]
+        duration_ms = stream_stats["audio_ms"] or (phoneme_flat[-1]["end_ms"] if phoneme_flat else 0)
+        keyframes   = as_track(keyframes)
+    else:
+        # 2. Generate lip-sync keyframes
+        # Audio-based first (native analyzer or Rhubarb; works for ISI and CosyVoice alike).
+        # Fall back to phoneme_flat (ISI) or estimation (CosyVoice) when the audio is unreadable.
+        t_lipsync = time.perf_counter()
+        audio_track, audio_dur, lipsync = await _audio_track(audio, cfg)
+
+        if audio_track is not None:
+            keyframes   = audio_track
+            duration_ms = audio_dur
+        else:
+            lipsync     = "phonemes"
+            keyframes   = (as_track(tts_result["keyframes"]) if tts_result.get("keyframes")
+                           else phonemes_to_track(phoneme_flat))
+            duration_ms = (tts_result.get("duration_ms")
+                           or (phoneme_flat[-1]["end_ms"] if phoneme_flat else 0))
+        timings_ms["lipsync"] = round((time.perf_counter() - t_lipsync) * 1000.0, 1)
+
+    emotion_late = False
+    if not streamed:
+        # 3. Wait for emotion up to the deadline, then play (neutral if still pending)
+        t_wait    = time.perf_counter()
+        remaining = emotion_timeout_s - (t_wait - t_request)
+        if not emotion_task.done() and remaining > 0:
+            await asyncio.wait([emotion_task], timeout=remaining)
+        timings_ms["emotion_wait"] = round((time.perf_counter() - t_wait) * 1000.0, 1)
+        emotion_late = not emotion_task.done()
+        if emotion_late:
+            print(f"[speak-animate] emotion not ready after {emotion_timeout_s:g}s — starting neutral")
+
+        # 4. Queue audio + UDP animation frames on the playback worker (non-blocking)
+        queued = _playback_queue.busy and not queue_opts["interrupt"]
+        item   = _playback_queue.submit_clip(audio, _playable(keyframes, cfg), emotion_bs,
+                                             **queue_opts)
+        # Buffered playback is audible one engine start latency after enqueue,
+        # unless it waits behind other utterances
+        if not queued:
+            ttfa_ms = round(elapsed_ms() + output_engine().expected_start_latency_ms(), 1)
+
+    if cached is None:
+        loop.run_in_executor(None, _store_tts_result, cache_key, tts_result)
+
+    if ttfa_ms is not None:
+        source = "cache" if cached is not None else ("stream" if streamed else "buffered")
+        print(f"[speak-animate] time-to-first-audio: {ttfa_ms} ms ({source})")
+
+    # Playback is under way; the session and response need the final emotion
+    analysis   = await emotion_task
+    emotion    = analysis.get("emotion", "neutral")
+    intensity  = analysis.get("intensity", 0.5)
+    timings_ms.update(emotion=analysis.get("elapsed_ms"), first_audio=ttfa_ms, total=elapsed_ms())
+
+    # Save session to disk: metadata JSON plus the audio as <id>.wav, written
+    # straight from the clip's buffers
     session_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
     session_data = {
         "id": session_id, "text": text, "voice": voice,
         "emotion": emotion, "intensity": intensity,
-        "duration_ms": duration_ms,
+        "duration_ms": duration_ms, "ttfa_ms": ttfa_ms,
         "audio_size": tts_result.get("audio_size", 0),
         "phoneme_count": len(phoneme_flat), "keyframe_count": len(keyframes),
         "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "audio_base64": audio_b64, "keyframes": keyframes, "emotion_bs": emotion_bs,
+        "keyframes": keyframes.dedup().to_json(),
+        "emotion_bs": analysis.get("blendshapes", {}),
     }
+    with open(os.path.join(SESSIONS_DIR, f"{session_id}.wav"), "wb") as f:
+        f.writelines(audio.wav_parts())
     with open(os.path.join(SESSIONS_DIR, f"{session_id}.json"), "w", encoding="utf-8") as f:
         json.dump(session_data, f, ensure_ascii=False)
 
@@ -337,11 +835,20 @@ async def speak_animate(body: dict):
         "session_id":    session_id,
         "emotion":       emotion,
         "intensity":     intensity,
+        "emotion_late":  emotion_late,
         "phoneme_count": len(phoneme_flat),
         "keyframe_count": len(keyframes),
         "audio_size":    tts_result.get("audio_size", 0),
         "duration_ms":   duration_ms,
         "voice":         voice,
+        "streamed":      streamed,
+        "lipsync":       lipsync,
+        "ttfa_ms":       ttfa_ms,
+        "playback_id":   item.id,
+        "stream_stats":  stream_stats,
+        "chunk_count":   len(tts_result.get("chunks") or []) or 1,
+        "cached":        cached is not None,
+        "timings_ms":    timings_ms,
     }
 
 
@@ -358,24 +865,91 @@ async def list_sessions():
     return {"sessions": sessions}
 
 
+def _session_audio(session_id: str, session: dict) -> AudioClip | None:
+    """A session's audio: <id>.wav, or audio_base64 in sessions saved before it was split out."""
+    path = os.path.join(SESSIONS_DIR, f"{session_id}.wav")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return AudioClip.from_wav(f.read())
+    if session.get("audio_base64"):
+        return AudioClip.from_base64(session["audio_base64"])
+    return None
+
+
 @app.post("/api/sessions/{session_id}/replay")
-async def replay_session(session_id: str):
+async def replay_session(session_id: str, body: dict = None):
+    path = os.path.join(SESSIONS_DIR, f"{session_id}.json")
+    if not os.path.exists(path):
+        return {"ok": False, "error": "会话不存在"}
+    with open(path, encoding="utf-8") as f:
+        d = json.load(f)
+    audio = _session_audio(session_id, d)
+    if audio is None:
+        return {"ok": False, "error": "会话音频不存在"}
+    item = _playback_queue.submit_clip(audio,
+                                       _playable(as_track(d["keyframes"]), read_text_driver_config()),
+                                       d["emotion_bs"], **_queue_opts(body or {}, d.get("text", "")))
+    return {"ok": True, "session_id": session_id, "duration_ms": d.get("duration_ms", 0),
+            "playback_id": item.id}
+
+
+@app.get("/api/playback")
+async def playback_state():
+    """Playing item, queued items (chained one first) and recently finished ones."""
+    return _playback_queue.state()
+
+
+@app.post("/api/playback/interrupt")
+async def playback_interrupt(body: dict = None):
+    """Barge-in: cut the current utterance; {"clear": true} also drops the queue."""
+    _playback_queue.interrupt(clear=bool((body or {}).get("clear")))
+    return {"ok": True}
+
+
+@app.delete("/api/playback/{item_id}")
+async def playback_cancel(item_id: str):
+    if not _playback_queue.cancel(item_id):
+        return {"ok": False, "error": "播放项不存在"}
+    return {"ok": True}
+
+
+@app.get("/api/sessions/{session_id}/audio")
+async def session_audio(session_id: str):
+    """A session's audio as a WAV file (binary; no base64)."""
+    path = os.path.join(SESSIONS_DIR, f"{session_id}.wav")
+    if os.path.exists(path):
+        return FileResponse(path, media_type="audio/wav")
+    meta = os.path.join(SESSIONS_DIR, f"{session_id}.json")
+    if not os.path.exists(meta):
+        return {"ok": False, "error": "会话不存在"}
+    with open(meta, encoding="utf-8") as f:
+        audio = _session_audio(session_id, json.load(f))
+    if audio is None:
+        return {"ok": False, "error": "会话音频不存在"}
+    return Response(audio.wav_bytes(), media_type="audio/wav")
+
+
+@app.get("/api/sessions/{session_id}/curve")
+async def session_curve(session_id: str, rate_hz: float | None = None):
+    """A session's lip sync as a fixed-rate curve (lipsync.curve parameters), for exporters."""
     path = os.path.join(SESSIONS_DIR, f"{session_id}.json")
     if not os.path.exists(path):
         return {"ok": False, "error": "会话不存在"}
     with open(path, encoding="utf-8") as f:
         d = json.load(f)
-    loop = asyncio.get_event_loop()
-    loop.run_in_executor(None, lambda: _speech_player.play(
-        d["audio_base64"], d["keyframes"], d["emotion_bs"]))
-    return {"ok": True, "session_id": session_id, "duration_ms": d.get("duration_ms", 0)}
+    params = curve_params(read_text_driver_config().get("lipsync", {}).get("curve"))
+    if rate_hz:
+        params["rate_hz"] = rate_hz
+    curve = resample_track(as_track(d["keyframes"]), params)
+    return {"ok": True, "session_id": session_id, "curve": curve.to_json()}
 
 
 @app.delete("/api/sessions/{session_id}")
 async def delete_session(session_id: str):
-    path = os.path.join(SESSIONS_DIR, f"{session_id}.json")
-    if os.path.exists(path):
-        os.remove(path)
+    for ext in ("json", "wav"):
+        path = os.path.join(SESSIONS_DIR, f"{session_id}.{ext}")
+        if os.path.exists(path):
+            os.remove(path)
     return {"ok": True}
 
 
@@ -407,15 +981,7 @@ async def voice_clone_action(body: dict):
     api_key = _cosyvoice_api_key()
     if not api_key:
         return {"ok": False, "error": "请先在文本驱动模块填写 Qwen API Key"}
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(
-            COSYVOICE_API,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json=body,
-        )
+    resp = await _dashscope_client().post(COSYVOICE_API, json=body, timeout=60)
     data = resp.json()
     if resp.status_code != 200:
         return {"ok": False, "error": data.get("message", f"HTTP {resp.status_code}"), "raw": data}
@@ -450,10 +1016,27 @@ async def websocket_endpoint(websocket: WebSocket):
     _clients.append(websocket)
     try:
         while True:
-            await websocket.receive_text()
+            await _handle_ws_message(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
         if websocket in _clients:
             _clients.remove(websocket)
+        if _face_preview:
+            _face_preview.unsubscribe(websocket)
+
+
+async def _handle_ws_message(websocket: WebSocket, text: str):
+    """Handle client → server messages: {"type": "subscribe"|"unsubscribe", "topic": ...}"""
+    try:
+        msg = json.loads(text)
+    except ValueError:
+        return
+    if msg.get("topic") == FacePreviewTap.TOPIC:
+        if not _face_preview:
+            await websocket.send_json({"type": "error", "error": "面部预览未启用（未配置 network.mirror_port）"})
+        elif msg.get("type") == "subscribe":
+            await _face_preview.subscribe(websocket)
+        elif msg.get("type") == "unsubscribe":
+            _face_preview.unsubscribe(websocket)
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,397 @@
+"""
+Reference receiver for the 11112 track protocol (playback.lipsync_protocol
+"track"), the behaviour TextDrivenController implements in Unity.
+
+It reassembles "lip_track" parts, maps each track's startTime onto the local
+clock (startTime + min over the track's datagrams of arrival - monoTime;
+"lip_clock" datagrams move it) and renders at --fps: every frame shows the
+latest keyframe at or before now - start of the newest track that has
+started, holding its last keyframe for HOLD_MS. A "reset" with a trackId drops that
+track and older ones; without one it drops all. Reported per track:
+  - parts received / expected and duplicates
+  - lead: how long before its first keyframe was due each part arrived
+    (first part, and the smallest over all parts)
+  - clock offset: local start - startTime (the one-way delay when sender and
+    receiver share time.perf_counter, i.e. on the same host)
+  - display error: first frame showing each keyframe - its due time
+    (at most one frame period when the track arrived on time)
+
+Usage:
+  python tools/lip_track_receiver.py --port 11112 --duration 30
+  python tools/lip_track_receiver.py --self-test       # drive the real encoder (CI)
+
+--self-test sends a keyframe track, a lip curve and two chained tracks through
+speech_player.encode_track / _send_track, then checks the reconstruction
+against the source values (within the uint8 quantization) and the timings.
+Exit status is 1 when a check fails.
+"""
+
+import argparse
+import base64
+import json
+import math
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from udp_probe import _percentiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SELF_TEST_TAIL_S = 0.05      # audio after the last keyframe before SpeechPlayer resets
+
+QUANT_STEP = 1.0 / 255.0     # lip_track values are uint8
+HOLD_MS    = 300             # TextDrivenController.resetDelay: last keyframe is held this long
+
+
+class ReceivedTrack:
+    """One lip_track as reassembled from its parts."""
+
+    def __init__(self, track_id: int, channels: list, parts: int):
+        self.track_id      = track_id
+        self.channels      = list(channels)
+        self.parts         = parts            # 0 = open-ended (streamed)
+        self.received      = {}               # part -> (times, values)
+        self.duplicates    = 0
+        self.start_time    = None             # sender perf_counter of time_ms 0
+        self.offset        = math.inf         # min(arrival - monoTime)
+        self.leads         = []               # (part, arrival, first time_ms)
+        self.clock_updates = 0
+        self.cut_at        = None             # local time of a reset covering it
+        self.shown         = {}               # keyframe index -> first frame showing it
+        self._columns      = None
+
+    def observe(self, msg: dict, arrival: float):
+        self.start_time = msg["startTime"]
+        self.offset     = min(self.offset, arrival - msg["monoTime"])
+
+    def add_part(self, msg: dict, arrival: float):
+        if msg["part"] in self.received:
+            self.duplicates += 1
+            return
+        times  = np.frombuffer(base64.b64decode(msg["times"]), dtype="<i4")
+        values = np.frombuffer(base64.b64decode(msg["values"]), dtype=np.uint8)
+        self.received[msg["part"]] = (times, values.reshape(len(times), len(self.channels)) / 255.0)
+        if len(times):
+            self.leads.append((msg["part"], arrival, int(times[0])))
+        self._columns      = None
+
+    @property
+    def start_local(self) -> float:
+        return self.start_time + self.offset
+
+    @property
+    def complete(self) -> bool:
+        return self.parts > 0 and len(self.received) == self.parts
+
+    def columns(self) -> tuple:
+        """(times, values) of all parts received so far, in part order."""
+        if self._columns is None:
+            parts = [self.received[k] for k in sorted(self.received)]
+            self._columns = (
+                np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, np.int32),
+                np.concatenate([p[1] for p in parts]) if parts else np.zeros((0, len(self.channels))),
+            )
+        return self._columns
+
+    def row_at(self, now: float):
+        """Index of the keyframe showing at local time now; None before the first or once released."""
+        times, _ = self.columns()
+        t_ms = (now - self.start_local) * 1000.0
+        if not len(times) or t_ms < times[0] or t_ms > times[-1] + HOLD_MS or self.cut_at is not None:
+            return None
+        return int(np.searchsorted(times, t_ms, side="right")) - 1
+
+    def blendshapes(self, row: int) -> dict:
+        _, values = self.columns()
+        return dict(zip(self.channels, values[row].tolist()))
+
+    def report(self) -> dict:
+        times, _ = self.columns()
+        due = self.start_local + times / 1000.0
+        errors = [float(t - due[i]) * 1000.0 for i, t in self.shown.items()]
+        expected = [i for i in range(len(times)) if self.cut_at is None or due[i] < self.cut_at]
+        leads = {part: (self.start_local + first_ms / 1000.0 - arrival) * 1000.0
+                 for part, arrival, first_ms in self.leads}
+        return {
+            "track_id":         self.track_id,
+            "parts":            len(self.received),
+            "expected_parts":   self.parts or None,
+            "duplicates":       self.duplicates,
+            "keyframes":        len(times),
+            "end_ms":           int(times[-1]) if len(times) else 0,
+            "lead_ms":          {"first": round(leads[min(leads)], 3) if leads else None,
+                                 "min":   round(min(leads.values()), 3) if leads else None},
+            "clock_offset_ms":  round(self.offset * 1000.0, 3),
+            "clock_updates":    self.clock_updates,
+            "shown":            len(self.shown),
+            "skipped":          len([i for i in expected if i not in self.shown]),
+            "cut":              self.cut_at is not None,
+            "display_error_ms": _percentiles(errors),
+        }
+
+
+class TrackReceiver:
+    """Collects lip_track / lip_clock / reset datagrams and renders the active track."""
+
+    def __init__(self):
+        self.tracks: dict[int, ReceivedTrack] = {}
+        self.types: dict[str, int] = {}
+
+    def feed(self, msg: dict, arrival: float):
+        mtype = msg.get("type", "")
+        self.types[mtype] = self.types.get(mtype, 0) + 1
+        if mtype == "lip_track":
+            track = self.tracks.get(msg["trackId"])
+            if track is None:
+                track = self.tracks[msg["trackId"]] = ReceivedTrack(msg["trackId"], msg["channels"], msg["parts"])
+            track.observe(msg, arrival)
+            track.add_part(msg, arrival)
+        elif mtype == "lip_clock":
+            track = self.tracks.get(msg["trackId"])
+            if track is not None:
+                track.observe(msg, arrival)
+                track.clock_updates += 1
+        elif mtype == "reset":
+            upto = msg.get("trackId")
+            for track in self.tracks.values():
+                if track.cut_at is None and (upto is None or track.track_id <= upto):
+                    track.cut_at = arrival
+
+    def render(self, now: float):
+        """One frame: the active (track, keyframe index), recorded as shown; None when idle."""
+        live = [t for t in self.tracks.values() if t.start_time is not None and t.start_local <= now]
+        for track in sorted(live, key=lambda t: t.start_local, reverse=True):
+            row = track.row_at(now)
+            if row is not None:
+                track.shown.setdefault(row, now)
+                return track, row
+            if track.cut_at is None:
+                # The newest started track owns the mouth even between keyframes
+                return None
+        return None
+
+    @property
+    def pending(self) -> bool:
+        """True while some track has not finished playing."""
+        now = time.perf_counter()
+        for track in self.tracks.values():
+            times, _ = track.columns()
+            if (track.cut_at is None and len(times)
+                    and now <= track.start_local + (times[-1] + HOLD_MS) / 1000.0):
+                return True
+        return False
+
+    def report(self) -> dict:
+        return {"types": self.types, "tracks": [t.report() for t in self.tracks.values()]}
+
+
+def listen(host: str, port: int, duration: float, fps: float, ready: threading.Event = None,
+           idle_timeout: float = 0.0) -> TrackReceiver:
+    """
+    Receive on host:port and render at fps for `duration` seconds (or until
+    `idle_timeout` seconds pass without a packet and no track is playing).
+    """
+    receiver = TrackReceiver()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    if ready:
+        ready.set()
+
+    period      = 1.0 / fps
+    deadline    = time.perf_counter() + duration
+    next_frame  = time.perf_counter()
+    last_packet = None
+    try:
+        while time.perf_counter() < deadline:
+            now = time.perf_counter()
+            if now >= next_frame:
+                receiver.render(now)
+                next_frame = max(next_frame + period, now)
+                if (idle_timeout and last_packet and now - last_packet > idle_timeout
+                        and not receiver.pending):
+                    break
+                continue
+            readable, _, _ = select.select([sock], [], [], next_frame - now)
+            if not readable:
+                continue
+            data = sock.recv(65536)
+            arrival = last_packet = time.perf_counter()
+            try:
+                msg = json.loads(data)
+            except ValueError:
+                continue
+            receiver.feed(msg, arrival)
+    finally:
+        sock.close()
+    return receiver
+
+
+def print_report(name: str, report: dict):
+    print("=" * 70)
+    print(f"[Receiver] {name}")
+    print("=" * 70)
+    print(f"  types            {report['types']}")
+    for t in report["tracks"]:
+        parts = f"{t['parts']}/{t['expected_parts'] or '?'}"
+        print(f"  track {t['track_id']:<4} parts {parts:<7} keyframes {t['keyframes']:<5} "
+              f"end {t['end_ms']} ms  shown {t['shown']} (skipped {t['skipped']})"
+              + ("  [reset]" if t["cut"] else ""))
+        print(f"    lead           first part {t['lead_ms']['first']} ms, min {t['lead_ms']['min']} ms")
+        print(f"    clock offset   {t['clock_offset_ms']} ms ({t['clock_updates']} updates)")
+        print(f"    display error  {t['display_error_ms']}")
+
+
+# ---------------------------------------------------------------------------
+# Self-test: drive the real encoder / sender against a private port
+# ---------------------------------------------------------------------------
+
+def _drive_tracks(port: int, sources: dict) -> dict:
+    """Send each source as a track (the last two chained); returns track id -> source name."""
+    sys.path.insert(0, os.path.join(ROOT, "PythonTextDriver"))
+    import speech_player
+
+    sock   = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr   = ("127.0.0.1", port)
+    player = speech_player.SpeechPlayer("127.0.0.1", port, protocol="track")
+    names  = {}
+    encoded = []
+    for name, source in sources.items():
+        track_id = next(speech_player._track_ids)
+        names[track_id] = name
+        encoded.append((track_id, *speech_player.encode_track(source, track_id)))
+
+    # Stand-alone tracks: sent 100 ms ahead, played out, then reset
+    for track_id, tails, end_ms in encoded[:-2]:
+        start_t = time.perf_counter() + 0.1
+        speech_player._send_track(sock, track_id, tails, end_ms, lambda: start_t, addr)
+        time.sleep(SELF_TEST_TAIL_S)
+        player._send_reset(sock, track_id)
+
+    # Chained: the second track is sent while the first plays; the first
+    # one's reset must not cut it
+    (id_a, tails_a, end_a), (id_b, tails_b, end_b) = encoded[-2:]
+    start_a = time.perf_counter() + 0.1
+    start_b = start_a + end_a / 1000.0 + 0.02
+    clock_a = speech_player._TrackClock(sock, id_a, lambda: start_a, addr)
+    clock_a.send_parts(tails_a)
+    time.sleep(max(0.0, start_b - time.perf_counter() - 0.05))
+    clock_b = speech_player._TrackClock(sock, id_b, lambda: start_b, addr)
+    clock_b.send_parts(tails_b)
+    clock_a.hold(end_a)
+    player._send_reset(sock, id_a)
+    clock_b.hold(end_b)
+    time.sleep(SELF_TEST_TAIL_S)
+    player._send_reset(sock, id_b)
+    sock.close()
+    return names
+
+
+def self_test(port: int, fps: float, max_display_error_ms: float) -> tuple:
+    sys.path.insert(0, os.path.join(ROOT, "PythonTextDriver"))
+    from keyframe_track import as_track
+    from lip_curve import resample_track
+    from lip_sync import phonemes_to_keyframes
+
+    phonemes = [{"phoneme": "a" if i % 2 else "j_in", "begin_ms": i * 60, "end_ms": i * 60 + 40}
+                for i in range(40)]
+    track   = as_track(phonemes_to_keyframes(phonemes))
+    sources = {
+        "keyframe track": track,
+        "lip curve":      resample_track(track),
+        "chained 1":      track.slice(0, 600),
+        "chained 2":      track.slice(600).shifted(-600),
+    }
+
+    ready = threading.Event()
+    box = {}
+    t = threading.Thread(target=lambda: box.setdefault(
+        "receiver", listen("127.0.0.1", port, 30.0, fps, ready, idle_timeout=0.5)))
+    t.start()
+    ready.wait(5)
+    names = _drive_tracks(port, sources)
+    t.join()
+
+    receiver = box["receiver"]
+    report   = receiver.report()
+    print_report(f"self-test ({fps:g} fps)", report)
+    failures = []
+    for track_id, name in names.items():
+        got = receiver.tracks.get(track_id)
+        if got is None:
+            failures.append(f"{name}: track {track_id} not received")
+            continue
+        failures += [f"{name}: {f}" for f in _check_track(got, sources[name], max_display_error_ms)]
+    return report, failures
+
+
+def _check_track(got: ReceivedTrack, source, max_display_error_ms: float) -> list:
+    import speech_player
+
+    failures = []
+    if not got.complete:
+        return [f"{len(got.received)}/{got.parts} parts received"]
+    channels, times, values = speech_player._track_columns(source)
+    got_times, got_values = got.columns()
+    if list(channels) != got.channels or not np.array_equal(np.asarray(times), got_times):
+        failures.append("channels or keyframe times differ from the source")
+    else:
+        error = np.abs(np.clip(np.asarray(values), 0.0, 1.0) - got_values).max(initial=0.0)
+        if error > QUANT_STEP / 2 + 1e-6:
+            failures.append(f"value error {error:.5f} exceeds the uint8 quantization")
+    report = got.report()
+    if report["lead_ms"]["min"] <= 0:
+        failures.append(f"a part arrived {-report['lead_ms']['min']} ms after its first keyframe was due")
+    if report["display_error_ms"] and report["display_error_ms"]["p99"] > max_display_error_ms:
+        failures.append(f"display error p99 {report['display_error_ms']['p99']} ms > {max_display_error_ms} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference receiver for the 11112 lip_track protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11112)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to listen")
+    parser.add_argument("--fps", type=float, default=60.0, help="render rate")
+    parser.add_argument("--json", help="write the report as JSON to this path")
+    parser.add_argument("--max-display-error-ms", type=float, default=None,
+                        help="fail when the p99 display error exceeds this "
+                             "(default: one frame + 10 ms in --self-test, no check otherwise)")
+    parser.add_argument("--self-test", action="store_true",
+                        help="drive speech_player's track sender against a private port")
+    parser.add_argument("--self-test-port", type=int, default=19112)
+    args = parser.parse_args()
+
+    max_error = args.max_display_error_ms
+    if args.self_test:
+        report, failures = self_test(args.self_test_port, args.fps,
+                                     max_error if max_error is not None else 1000.0 / args.fps + 10.0)
+    else:
+        print(f"[Receiver] listening on {args.host}:{args.port} for {args.duration:g}s …")
+        report = listen(args.host, args.port, args.duration, args.fps).report()
+        print_report(f"udp {args.port}", report)
+        failures = []
+        for t in report["tracks"]:
+            if t["expected_parts"] and t["parts"] < t["expected_parts"]:
+                failures.append(f"track {t['track_id']}: {t['parts']}/{t['expected_parts']} parts")
+            if max_error is not None and t["display_error_ms"] and t["display_error_ms"]["p99"] > max_error:
+                failures.append(f"track {t['track_id']}: display error p99 "
+                                f"{t['display_error_ms']['p99']} ms > {max_error} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"report": report, "failures": failures}, f, indent=2)
+
+    for failure in failures:
+        print(f"[Receiver] FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+UDP stream probe for the face-tracking (11111) and text-driven (11112) streams.
+
+Binds in place of Unity (or on a mirror port, e.g. network.mirror_port) and
+reports, per stream:
+  - loss, duplicates and reordering from the "seq" field
+  - inter-arrival time histogram and RFC 3550 jitter from the "monoTime" field
+  - one-way delay (sender and probe on the same host share time.perf_counter)
+  - keyframe-schedule error (monoTime - scheduledTime) for lip_sync packets
+
+Usage:
+  python tools/udp_probe.py --port 11111 --duration 10
+  python tools/udp_probe.py --port 11112 --duration 30 --json report.json
+  python tools/udp_probe.py --self-test          # drive the real senders (CI)
+
+Exit status is 1 when --max-loss or --max-schedule-error-ms is exceeded.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Inter-arrival histogram bucket upper bounds (ms)
+_BUCKETS_MS = [1, 2, 5, 10, 20, 34, 50, 100, 250, 1000]
+
+
+def _percentiles(values: list, ps=(50, 95, 99)) -> dict:
+    if not values:
+        return {}
+    s = sorted(values)
+    out = {}
+    for p in ps:
+        idx = min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))
+        out[f"p{p}"] = round(s[idx], 3)
+    out["max"] = round(s[-1], 3)
+    return out
+
+
+class StreamStats:
+    """Accumulates loss / reorder / jitter statistics for one UDP stream."""
+
+    def __init__(self):
+        self.received     = 0
+        self.unsequenced  = 0
+        self.duplicates   = 0
+        self.reordered    = 0
+        self.seen: set[int] = set()
+        self.min_seq      = None
+        self.max_seq      = None
+        self.types: dict[str, int] = {}
+
+        self._last_arrival = None
+        self._last_transit = None
+        self.jitter_ms     = 0.0
+        self.interarrival_ms: list[float] = []
+        self.delay_ms: list[float]        = []
+        self.schedule_error_ms: list[float] = []
+
+    def add(self, msg: dict, arrival: float):
+        self.received += 1
+        mtype = msg.get("type", "face")
+        self.types[mtype] = self.types.get(mtype, 0) + 1
+
+        if self._last_arrival is not None:
+            self.interarrival_ms.append((arrival - self._last_arrival) * 1000.0)
+        self._last_arrival = arrival
+
+        seq = msg.get("seq")
+        if seq is None:
+            self.unsequenced += 1
+        elif seq in self.seen:
+            self.duplicates += 1
+        else:
+            if self.max_seq is not None and seq < self.max_seq:
+                self.reordered += 1
+            self.seen.add(seq)
+            self.min_seq = seq if self.min_seq is None else min(self.min_seq, seq)
+            self.max_seq = seq if self.max_seq is None else max(self.max_seq, seq)
+
+        sent = msg.get("monoTime")
+        if sent is not None:
+            transit = arrival - sent
+            self.delay_ms.append(transit * 1000.0)
+            # RFC 3550 interarrival jitter estimator
+            if self._last_transit is not None:
+                d = abs(transit - self._last_transit) * 1000.0
+                self.jitter_ms += (d - self.jitter_ms) / 16.0
+            self._last_transit = transit
+
+        scheduled = msg.get("scheduledTime")
+        if sent is not None and scheduled is not None:
+            self.schedule_error_ms.append((sent - scheduled) * 1000.0)
+
+    @property
+    def expected(self) -> int:
+        if self.max_seq is None:
+            return 0
+        return self.max_seq - self.min_seq + 1
+
+    @property
+    def lost(self) -> int:
+        return max(0, self.expected - len(self.seen))
+
+    def histogram(self) -> dict:
+        counts = {}
+        for v in self.interarrival_ms:
+            label = next((f"<{b}ms" for b in _BUCKETS_MS if v < b), f">={_BUCKETS_MS[-1]}ms")
+            counts[label] = counts.get(label, 0) + 1
+        order = [f"<{b}ms" for b in _BUCKETS_MS] + [f">={_BUCKETS_MS[-1]}ms"]
+        return {k: counts[k] for k in order if k in counts}
+
+    def report(self) -> dict:
+        expected = self.expected
+        return {
+            "received":          self.received,
+            "unsequenced":       self.unsequenced,
+            "expected":          expected,
+            "lost":              self.lost,
+            "loss_ratio":        round(self.lost / expected, 5) if expected else 0.0,
+            "duplicates":        self.duplicates,
+            "reordered":         self.reordered,
+            "types":             self.types,
+            "jitter_ms":         round(self.jitter_ms, 3),
+            "interarrival_ms":   _percentiles(self.interarrival_ms),
+            "interarrival_hist": self.histogram(),
+            "delay_ms":          _percentiles(self.delay_ms),
+            "schedule_error_ms": _percentiles(self.schedule_error_ms),
+        }
+
+
+def probe(host: str, port: int, duration: float, ready: threading.Event = None,
+          idle_timeout: float = 0.0) -> StreamStats:
+    """
+    Receive on host:port for `duration` seconds (or until `idle_timeout`
+    seconds pass without a packet after the first one) and return stats.
+    """
+    stats = StreamStats()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.settimeout(0.2)
+    if ready:
+        ready.set()
+
+    deadline = time.perf_counter() + duration
+    last_packet = None
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                data, _ = sock.recvfrom(65536)
+            except socket.timeout:
+                if idle_timeout and last_packet and time.perf_counter() - last_packet > idle_timeout:
+                    break
+                continue
+            arrival = time.perf_counter()
+            last_packet = arrival
+            try:
+                msg = json.loads(data)
+            except ValueError:
+                continue
+            stats.add(msg, arrival)
+    finally:
+        sock.close()
+    return stats
+
+
+def print_report(name: str, report: dict):
+    print("=" * 70)
+    print(f"[Probe] {name}")
+    print("=" * 70)
+    print(f"  received {report['received']}  expected {report['expected']}  "
+          f"lost {report['lost']} ({report['loss_ratio'] * 100:.2f}%)  "
+          f"dup {report['duplicates']}  reordered {report['reordered']}  "
+          f"unsequenced {report['unsequenced']}")
+    print(f"  types            {report['types']}")
+    print(f"  jitter (RFC3550) {report['jitter_ms']} ms")
+    print(f"  inter-arrival    {report['interarrival_ms']}")
+    print(f"  one-way delay    {report['delay_ms']}")
+    if report["schedule_error_ms"]:
+        print(f"  schedule error   {report['schedule_error_ms']}")
+    if report["interarrival_hist"]:
+        total = sum(report["interarrival_hist"].values())
+        for label, count in report["interarrival_hist"].items():
+            bar = "#" * max(1, int(40 * count / total))
+            print(f"    {label:>9} {count:6d} {bar}")
+
+
+# ---------------------------------------------------------------------------
+# Self-test: drive the real senders against a private probe port
+# ---------------------------------------------------------------------------
+
+def _drive_face(port: int, frames: int, fps: float):
+    sys.path.insert(0, os.path.join(ROOT, "PythonFaceTracker"))
+    from network_sender import NetworkSender
+
+    sender = NetworkSender(host="127.0.0.1", port=port)
+    period = 1.0 / fps
+    t0 = time.perf_counter()
+    for i in range(frames):
+        face = None if i % 10 == 9 else {
+            "blendshapes": {"jawOpen": (i % 30) / 30.0, "eyeBlinkLeft": 0.1},
+            "head_rotation": {"yaw": 1.0, "pitch": 2.0, "roll": 3.0},
+        }
+        sender.send_face_data(face)
+        delay = t0 + (i + 1) * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sender.close()
+
+
+def _drive_speech(port: int, keyframes_count: int):
+    sys.path.insert(0, os.path.join(ROOT, "PythonTextDriver"))
+    import speech_player
+    from lip_sync import phonemes_to_keyframes
+
+    phonemes = [{"phoneme": "a" if i % 2 else "j_in", "begin_ms": i * 60, "end_ms": i * 60 + 40}
+                for i in range(keyframes_count)]
+    keyframes = phonemes_to_keyframes(phonemes)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = ("127.0.0.1", port)
+    speech_player._send_udp(sock, {"type": "text_emotion", "blendshapes": {"mouthSmileLeft": 0.5}}, addr)
+    speech_player._send_keyframes(sock, keyframes, time.perf_counter() + 0.05, addr)
+    speech_player._send_udp(sock, {"type": "reset", "blendshapes": {}}, addr)
+    sock.close()
+
+
+def self_test(port: int, max_loss: float, max_schedule_error_ms: float) -> tuple:
+    failures = []
+    results = {}
+    for name, driver, args in (
+        ("face (NetworkSender)", _drive_face, (port, 90, 30.0)),
+        ("speech (SpeechPlayer)", _drive_speech, (port, 40)),
+    ):
+        ready = threading.Event()
+        box = {}
+        t = threading.Thread(target=lambda: box.setdefault(
+            "stats", probe("127.0.0.1", port, 30.0, ready, idle_timeout=1.0)))
+        t.start()
+        ready.wait(5)
+        driver(*args)
+        t.join()
+
+        report = box["stats"].report()
+        results[name] = report
+        print_report(name, report)
+        failures += _check(name, report, max_loss, max_schedule_error_ms)
+        if report["unsequenced"] or report["received"] == 0:
+            failures.append(f"{name}: packets missing seq/monoTime or none received")
+
+    return results, failures
+
+
+def _check(name: str, report: dict, max_loss: float, max_schedule_error_ms: float) -> list:
+    failures = []
+    if report["loss_ratio"] > max_loss:
+        failures.append(f"{name}: loss {report['loss_ratio']:.4f} > {max_loss}")
+    sched = report["schedule_error_ms"]
+    if sched and max_schedule_error_ms and sched["p99"] > max_schedule_error_ms:
+        failures.append(f"{name}: schedule error p99 {sched['p99']} ms > {max_schedule_error_ms} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP loss / jitter probe for VibeVtuber streams")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11111,
+                        help="port to bind (11111 face, 11112 speech, or a mirror port)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to listen")
+    parser.add_argument("--json", help="write the report as JSON to this path")
+    parser.add_argument("--max-loss", type=float, default=0.0,
+                        help="fail when the loss ratio exceeds this value")
+    parser.add_argument("--max-schedule-error-ms", type=float, default=0.0,
+                        help="fail when the p99 keyframe-schedule error exceeds this (0 = no check)")
+    parser.add_argument("--self-test", action="store_true",
+                        help="drive NetworkSender and SpeechPlayer against a private port")
+    parser.add_argument("--self-test-port", type=int, default=19111)
+    args = parser.parse_args()
+
+    if args.self_test:
+        results, failures = self_test(args.self_test_port, args.max_loss, args.max_schedule_error_ms)
+    else:
+        print(f"[Probe] listening on {args.host}:{args.port} for {args.duration:g}s …")
+        report = probe(args.host, args.port, args.duration).report()
+        results = {f"udp {args.port}": report}
+        print_report(f"udp {args.port}", report)
+        failures = _check(f"udp {args.port}", report, args.max_loss, args.max_schedule_error_ms)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "failures": failures}, f, indent=2)
+
+    for failure in failures:
+        print(f"[Probe] FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
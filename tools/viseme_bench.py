@@ -0,0 +1,226 @@
+"""
+Benchmark the native viseme analyzer against Rhubarb.
+
+For every input utterance it reports:
+  - native analysis time, whole-buffer and streamed in --chunk-ms chunks,
+    as milliseconds and real-time factor (streamed cues must equal the
+    whole-buffer cues)
+  - Rhubarb time when --rhubarb runs the bundled binary
+  - agreement with Rhubarb's cues on a 10 ms grid: exact shape match,
+    open/closed match (X/A vs the rest) and mean jawOpen error
+
+Inputs are WAV files, control-panel session JSON files (audio in <id>.wav
+beside them, or audio_base64 in older sessions), or directories of either. Reference cues come from Rhubarb JSON exports
+(rhubarb --exportFormat json) named <input stem>.json in --cues, or from
+running the binary with --rhubarb.
+
+Usage:
+  python tools/viseme_bench.py control-panel/data/sessions --rhubarb
+  python tools/viseme_bench.py speech.wav --cues rhubarb_out/ --json report.json
+  python tools/viseme_bench.py --synthetic 30     # speed only, no reference
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "PythonTextDriver"))
+
+from rhubarb_lipsync import _SHAPE_BS, rhubarb_service      # noqa: E402
+from viseme_analyzer import VisemeAnalyzer, analyze, HOP_MS  # noqa: E402
+from wav_utils import build_wav, parse_wav                  # noqa: E402
+
+_CLOSED = set("XA")
+
+
+def _load(path: str) -> bytes:
+    """WAV bytes from a .wav file or a session JSON."""
+    if path.endswith(".json"):
+        wav_path = path[:-5] + ".wav"
+        if os.path.isfile(wav_path):
+            path = wav_path
+        else:
+            with open(path, encoding="utf-8") as f:
+                return base64.b64decode(json.load(f).get("audio_base64", ""))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _inputs(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = set(os.listdir(path))
+            # A session's <id>.json and <id>.wav are one input
+            files += sorted(os.path.join(path, n) for n in names
+                            if n.endswith(".wav")
+                            or (n.endswith(".json") and n[:-5] + ".wav" not in names))
+        else:
+            files.append(path)
+    return files
+
+
+def _synthetic(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Speech-like test signal: harmonic vowels, fricative noise and pauses."""
+    rng = np.random.default_rng(0)
+    parts = []
+    while sum(len(p) for p in parts) < seconds * sample_rate:
+        n = int(sample_rate * rng.uniform(0.08, 0.3))
+        kind = rng.integers(3)
+        if kind == 0:
+            parts.append(np.zeros(n))
+        elif kind == 1:
+            parts.append(0.2 * np.diff(rng.standard_normal(n + 1)))
+        else:
+            t  = np.arange(n) / sample_rate
+            f0 = rng.uniform(110, 220)
+            parts.append(sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(1, 12)) * rng.uniform(0.05, 0.4))
+    x = np.clip(np.concatenate(parts), -1.0, 1.0)
+    return build_wav((x * 32767).astype("<i2").tobytes(), sample_rate)
+
+
+def _reference_cues(path: str, cues_dir: str) -> list | None:
+    if not cues_dir:
+        return None
+    ref = os.path.join(cues_dir, os.path.splitext(os.path.basename(path))[0] + ".json")
+    if not os.path.isfile(ref):
+        return None
+    with open(ref, encoding="utf-8") as f:
+        data = json.load(f)
+    return [(int(round(c["start"] * 1000)), c.get("value", "X")) for c in data.get("mouthCues", [])]
+
+
+def _run_rhubarb(wav_bytes: bytes) -> tuple[list | None, float]:
+    """(cues, elapsed_ms) from the bundled binary, or (None, 0) when unavailable."""
+    service = rhubarb_service()
+    if not service.available:
+        return None, 0.0
+    t0 = time.perf_counter()
+    cues, _ = service.extract_cues(wav_bytes, timeout=120)
+    return cues, (time.perf_counter() - t0) * 1000.0
+
+
+def _grid(cues: list, duration_ms: int) -> list:
+    """Shape per HOP_MS step over the audio."""
+    out, i = [], 0
+    for t in range(0, max(duration_ms, 1), HOP_MS):
+        while i + 1 < len(cues) and cues[i + 1][0] <= t:
+            i += 1
+        out.append(cues[i][1] if cues else "X")
+    return out
+
+
+def compare(native: list, reference: list, duration_ms: int) -> dict:
+    a, b = _grid(native, duration_ms), _grid(reference, duration_ms)
+    n = len(a)
+    jaw_a = np.array([_SHAPE_BS[s]["jawOpen"] for s in a])
+    jaw_b = np.array([_SHAPE_BS.get(s, _SHAPE_BS["X"])["jawOpen"] for s in b])
+    return {
+        "shape_agreement":    round(sum(x == y for x, y in zip(a, b)) / n, 3),
+        "open_agreement":     round(sum((x in _CLOSED) == (y in _CLOSED) for x, y in zip(a, b)) / n, 3),
+        "jaw_mae":            round(float(np.abs(jaw_a - jaw_b).mean()), 3),
+        "reference_cues":     len(reference),
+    }
+
+
+def bench(name: str, wav_bytes: bytes, chunk_ms: int, repeat: int,
+          reference: list | None, run_rhubarb: bool) -> dict:
+    pcm, sample_rate, channels = parse_wav(wav_bytes)
+    audio_ms = len(pcm) * 1000 / (2 * channels * sample_rate)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        cues = analyze(pcm, sample_rate, channels)
+    whole_ms = (time.perf_counter() - t0) * 1000.0 / repeat
+
+    step = max(2 * channels, int(sample_rate * chunk_ms / 1000) * 2 * channels)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        analyzer = VisemeAnalyzer(sample_rate, channels)
+        streamed = []
+        for i in range(0, len(pcm), step):
+            streamed += analyzer.feed(pcm[i:i + step])
+        streamed += analyzer.flush()
+    stream_ms = (time.perf_counter() - t0) * 1000.0 / repeat
+
+    result = {
+        "input":          name,
+        "audio_ms":       round(audio_ms),
+        "cues":           len(cues),
+        "native_ms":      round(whole_ms, 2),
+        "native_rtf":     round(whole_ms / audio_ms, 5) if audio_ms else 0.0,
+        "stream_ms":      round(stream_ms, 2),
+        "stream_matches": streamed == cues,
+    }
+    if run_rhubarb:
+        rhubarb_cues, rhubarb_ms = _run_rhubarb(wav_bytes)
+        if rhubarb_cues is not None:
+            result["rhubarb_ms"] = round(rhubarb_ms, 1)
+            result["rhubarb_timings_ms"] = rhubarb_service().last_timings
+            result["speedup"]    = round(rhubarb_ms / whole_ms, 1) if whole_ms else None
+            reference = reference or rhubarb_cues
+    if reference:
+        result.update(compare(cues, reference, int(audio_ms)))
+    return result
+
+
+def print_result(r: dict):
+    line = (f"{r['input']:<32} {r['audio_ms']:>7} ms audio  {r['cues']:>4} cues  "
+            f"native {r['native_ms']:>7.2f} ms (rtf {r['native_rtf']:.4f})  "
+            f"stream {r['stream_ms']:>7.2f} ms {'=' if r['stream_matches'] else '≠'}")
+    if "rhubarb_ms" in r:
+        line += f"  rhubarb {r['rhubarb_ms']:>7.1f} ms (x{r['speedup']})"
+    if "shape_agreement" in r:
+        line += (f"  shape {r['shape_agreement']:.0%}  open/closed {r['open_agreement']:.0%}"
+                 f"  jaw MAE {r['jaw_mae']:.3f}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Native viseme analyzer vs Rhubarb")
+    parser.add_argument("inputs", nargs="*", help="WAV / session JSON files or directories")
+    parser.add_argument("--cues", help="directory of Rhubarb JSON exports named <stem>.json")
+    parser.add_argument("--rhubarb", action="store_true", help="also time the bundled rhubarb binary")
+    parser.add_argument("--synthetic", type=float, default=0.0, metavar="SECONDS",
+                        help="add a synthetic utterance of this length")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="chunk size for streamed analysis")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per input")
+    parser.add_argument("--json", help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    work = [(os.path.basename(p), p) for p in _inputs(args.inputs)]
+    if args.synthetic > 0 or not work:
+        work.append((f"synthetic {args.synthetic or 10:g}s", None))
+
+    results = []
+    for name, path in work:
+        try:
+            wav_bytes = _load(path) if path else _synthetic(args.synthetic or 10)
+            reference = _reference_cues(path, args.cues) if path else None
+            result = bench(name, wav_bytes, args.chunk_ms, args.repeat, reference, args.rhubarb)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Bench] skipping {name}: {e}")
+            continue
+        print_result(result)
+        results.append(result)
+
+    compared = [r for r in results if "shape_agreement" in r]
+    if compared:
+        print(f"[Bench] mean shape agreement {np.mean([r['shape_agreement'] for r in compared]):.1%}, "
+              f"open/closed {np.mean([r['open_agreement'] for r in compared]):.1%}, "
+              f"jaw MAE {np.mean([r['jaw_mae'] for r in compared]):.3f} over {len(compared)} inputs")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2, ensure_ascii=False)
+    sys.exit(0 if all(r["stream_matches"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()